@@ -5,6 +5,9 @@ from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
 import sentry_sdk
 from firebase_config import initialize_firebase
+from utils.json_provider import FirestoreJSONProvider
+from utils.compression import init_compression
+from utils.email_service import init_email_queue
 
 import os
 
@@ -32,6 +35,12 @@ from routes.cleanup import cleanup_bp
 from routes.notifications import notifications_bp
 
 app = Flask(__name__)
+# orjson-backed JSON that encodes Firestore timestamps, GeoPoints and sentinels
+app.json = FirestoreJSONProvider(app)
+# gzip/brotli negotiated per request; cached responses reuse stored variants
+init_compression(app)
+# Email workers start with the process and resume anything left queued
+init_email_queue(app)
 # Restrict CORS to frontend origin
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5173", "https://krishna-properties-f396d.web.app"]}})
 
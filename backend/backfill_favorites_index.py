@@ -0,0 +1,63 @@
+from firebase_config import initialize_firebase
+from utils.favorites import BATCH_FAVORITES, favorite_refs
+import os
+import sys
+
+# Builds the reverse favorites index (properties/{id}/favoritedBy/{uid})
+# from every existing users/{uid}/favorites/{id} document, so price-drop
+# notifications reach favorites made before the index existed.
+#
+# Usage: python backfill_favorites_index.py [--restart]
+#
+# Writes are idempotent sets. Progress is checkpointed after every committed
+# batch, so an interrupted run picks up where it stopped.
+
+db, _ = initialize_firebase()
+
+PAGE_SIZE = BATCH_FAVORITES # one reverse entry per favorite, well within 500 writes
+CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), '.backfill_favorites_index.checkpoint')
+
+def read_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE) as f:
+            return f.read().strip() or None
+    return None
+
+def write_checkpoint(last_path):
+    with open(CHECKPOINT_FILE, 'w') as f:
+        f.write(last_path)
+
+def backfill(restart=False):
+    last_path = None if restart else read_checkpoint()
+    if last_path:
+        print(f"Resuming after {last_path}")
+
+    scanned = 0
+    while True:
+        query = db.collection_group('favorites').order_by('__name__').limit(PAGE_SIZE)
+        if last_path:
+            query = query.start_after({'__name__': db.document(last_path)})
+        docs = list(query.stream())
+        if not docs:
+            break
+
+        batch = db.batch()
+        for doc in docs:
+            user_ref = doc.reference.parent.parent
+            if user_ref is None or user_ref.parent.id != 'users':
+                continue
+            _, reverse_ref = favorite_refs(db, user_ref.id, doc.id)
+            batch.set(reverse_ref, {'userId': user_ref.id, 'addedAt': (doc.to_dict() or {}).get('addedAt')})
+        batch.commit()
+
+        scanned += len(docs)
+        last_path = docs[-1].reference.path
+        write_checkpoint(last_path)
+        print(f"Indexed {scanned} favorites")
+
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    print(f"Backfill complete. Indexed {scanned} favorites.")
+
+if __name__ == "__main__":
+    backfill(restart='--restart' in sys.argv)
@@ -0,0 +1,66 @@
+from firebase_config import initialize_firebase
+from routes.properties import parse_price
+import os
+import sys
+
+# Writes the canonical integer 'priceValue' onto every property so price
+# filters and sorts can run inside Firestore.
+#
+# Usage: python backfill_price_value.py [--restart]
+#
+# Progress is checkpointed after every committed batch, so an interrupted
+# run picks up where it stopped.
+
+db, _ = initialize_firebase()
+
+PAGE_SIZE = 400 # Firestore batches are capped at 500 writes
+CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), '.backfill_price_value.checkpoint')
+
+def read_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE) as f:
+            return f.read().strip() or None
+    return None
+
+def write_checkpoint(last_id):
+    with open(CHECKPOINT_FILE, 'w') as f:
+        f.write(last_id)
+
+def backfill(restart=False):
+    last_id = None if restart else read_checkpoint()
+    if last_id:
+        print(f"Resuming after document {last_id}")
+
+    scanned = 0
+    updated = 0
+    while True:
+        query = db.collection('properties').order_by('__name__').limit(PAGE_SIZE)
+        if last_id:
+            query = query.start_after({'__name__': last_id})
+        docs = list(query.stream())
+        if not docs:
+            break
+
+        batch = db.batch()
+        pending = 0
+        for doc in docs:
+            data = doc.to_dict()
+            value = parse_price(data.get('price'))
+            if data.get('priceValue') != value:
+                batch.update(doc.reference, {'priceValue': value})
+                pending += 1
+        if pending:
+            batch.commit()
+
+        scanned += len(docs)
+        updated += pending
+        last_id = docs[-1].id
+        write_checkpoint(last_id)
+        print(f"Scanned {scanned} properties, updated {updated}")
+
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    print(f"Backfill complete. Scanned {scanned}, updated {updated}.")
+
+if __name__ == "__main__":
+    backfill(restart='--restart' in sys.argv)
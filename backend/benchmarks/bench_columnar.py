@@ -0,0 +1,130 @@
+"""
+Filtering and top-k sorting over the columnar property store compared with
+the per-dict Python loop it replaced, plus the memory of each layout.
+
+    python -m benchmarks.bench_columnar [listings]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.property_catalog import price_value, created_timestamp
+from utils.property_store import ColumnarStore
+from benchmarks.fake_data import PROPERTY_TYPES, AMENITIES, LOCALITIES
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+FILTERS = {'min_price': 5000000, 'max_price': 90000000, 'bedrooms': 3, 'prop_types': ["Villa's"]}
+# "3+ BHK villas with pool and gym"
+BITMAP_FILTERS = {'bedrooms': 3, 'prop_types': ["Villa's"], 'amenities': ['pool', 'gym']}
+
+
+def make_rows(n, seed=7):
+    """Listing fields the store indexes (descriptions/images omitted to fit 1M in RAM)."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = {}
+    for i in range(n):
+        price = rng.randint(50, 2000) * 100000
+        rows[f"prop{i:07d}"] = {
+            "id": f"prop{i:07d}",
+            "priceValue": price,
+            "bedrooms": rng.randint(1, 5),
+            "bathrooms": rng.randint(1, 6),
+            "area": rng.randint(500, 5000),
+            "type": rng.choice(PROPERTY_TYPES),
+            "location": rng.choice(LOCALITIES),
+            "status": rng.choice(["available", "sold"]),
+            "amenities": rng.sample(AMENITIES, 3),
+            "coordinates": {"lat": 28.4 + rng.random() * 0.4, "lng": 77.0 + rng.random() * 0.6},
+            "createdAt": start + timedelta(seconds=i),
+        }
+    return rows
+
+
+def dict_loop(docs):
+    matches = []
+    for p in docs:
+        if p['type'] not in FILTERS['prop_types'] or p['bedrooms'] < FILTERS['bedrooms']:
+            continue
+        price = price_value(p)
+        if price < FILTERS['min_price'] or price > FILTERS['max_price']:
+            continue
+        matches.append(p)
+    matches.sort(key=lambda p: (price_value(p), p['id']))
+    return matches[:9]
+
+
+def columnar(store):
+    rows = store.filter_rows(**FILTERS)
+    return store.select(rows, store.columns['price'][rows], descending=False, limit=9)
+
+
+# ~5 km around central Noida
+NEAR = (28.57, 77.32, 5.0)
+
+
+def nearest(store):
+    rows = store.filter_rows(near=NEAR)
+    return store.select(rows, store.distances(rows, NEAR[0], NEAR[1]), descending=False)
+
+
+def facets(store):
+    rows = store.filter_rows(**FILTERS)
+    return (store.counts(rows, 'type'), store.counts(rows, 'bedrooms'),
+            store.counts(rows, 'locality'), store.price_histogram(rows))
+
+
+def median_ms(fn, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    tracemalloc.start()
+    docs = make_rows(SIZE)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store = ColumnarStore(price_value, created_timestamp)
+    started = time.perf_counter()
+    store.rebuild(docs)
+    rebuild_ms = (time.perf_counter() - started) * 1000
+    column_bytes = sum(c.nbytes for c in store.columns.values())
+
+    doc_list = list(docs.values())
+    slow = [p['id'] for p in dict_loop(doc_list)]
+    rows, _, _ = columnar(store)
+    assert slow == [store.id_of(r) for r in rows]
+
+    print(f"listings:                {SIZE}")
+    print(f"list of dicts:           {dict_bytes / 2**20:8.1f} MiB")
+    print(f"columns:                 {column_bytes / 2**20:8.1f} MiB")
+    print(f"filter only:             {median_ms(lambda: store.filter_rows(**FILTERS)):8.2f} ms")
+    print(f"filter + top-9:          {median_ms(lambda: columnar(store)):8.2f} ms")
+    print(f"bitmap-only filter:      {median_ms(lambda: store.filter_rows(**BITMAP_FILTERS)):8.2f} ms")
+    print(f"filter + facets:         {median_ms(lambda: facets(store)):8.2f} ms")
+    print(f"5 km radius, nearest 9:  {median_ms(lambda: nearest(store)):8.2f} ms")
+    print(f"clusters, zoom 11 view:  {median_ms(lambda: store.cluster_view((28.4, 77.0, 28.8, 77.6), 11)):8.2f} ms")
+    print(f"clusters, whole map:     {median_ms(lambda: store.cluster_view((-85, -180, 85, 180), 3)):8.2f} ms")
+    moved = dict(docs['prop0000000'])
+
+    def move():
+        moved['coordinates'] = {'lat': 28.4 + random.random() * 0.4, 'lng': 77.0 + random.random() * 0.6}
+        store.upsert(moved['id'], moved)
+    print(f"upsert (moves a pin):    {median_ms(move, repeat=101):8.2f} ms")
+    print(f"store rebuild:           {rebuild_ms:8.0f} ms")
+    print(f"dict loop + sort:        {median_ms(lambda: dict_loop(doc_list), repeat=3):8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
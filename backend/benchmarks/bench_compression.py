@@ -0,0 +1,75 @@
+"""
+Bytes on the wire and CPU per request for representative payloads, served
+uncompressed, compressed per request, and from a cached entry holding
+precompressed variants.
+
+    python -m benchmarks.bench_compression [count]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify
+
+from utils.compression import ENCODINGS, init_compression
+from utils.property_fields import parse_fields
+from utils.response_cache import ResponseCache
+from benchmarks.fake_data import make_listings
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+REPEAT = 50
+
+
+def payloads():
+    listings = []
+    for pid, prop in make_listings(SIZE).items():
+        prop['id'] = pid
+        listings.append(prop)
+    card = parse_fields('card')
+    return {
+        f"list ({SIZE} full)": {"properties": listings, "total": SIZE},
+        f"list ({SIZE} card)": {"properties": [card.project(p) for p in listings], "total": SIZE},
+        "property detail": listings[0],
+    }
+
+
+def cpu_ms(fn):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.process_time()
+        fn()
+        timings.append((time.process_time() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    app = Flask(__name__)
+    init_compression(app)
+    cache = ResponseCache(enabled=True, ttl=3600)
+    data = payloads()
+
+    for i, payload in enumerate(data.values()):
+        app.add_url_rule(f'/plain/{i}', f'plain{i}', lambda payload=payload: jsonify(payload))
+        app.add_url_rule(f'/cached/{i}', f'cached{i}',
+                         cache.cached(['bench'])(lambda payload=payload: jsonify(payload)))
+    client = app.test_client()
+
+    print(f"encodings available: {', '.join(ENCODINGS)}")
+    print(f"{'payload':20} {'encoding':9} {'bytes':>9} {'ratio':>6} {'per request':>12} {'cached hit':>11}")
+    for i, name in enumerate(data):
+        for encoding in ('identity',) + ENCODINGS:
+            headers = {'Accept-Encoding': encoding}
+            body = client.get(f'/plain/{i}', headers=headers).data
+            raw = len(client.get(f'/plain/{i}', headers={'Accept-Encoding': 'identity'}).data)
+            client.get(f'/cached/{i}', headers=headers)
+            dynamic = cpu_ms(lambda: client.get(f'/plain/{i}', headers=headers).data)
+            cached = cpu_ms(lambda: client.get(f'/cached/{i}', headers=headers).data)
+            print(f"{name:20} {encoding:9} {len(body):9d} {raw / len(body):5.1f}x "
+                  f"{dynamic:9.2f} ms {cached:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
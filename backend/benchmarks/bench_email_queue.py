@@ -0,0 +1,58 @@
+"""
+Time a request handler spends on email: sending through the provider in the
+request thread (simulated with a fixed delay) against enqueueing to the
+durable SQLite queue, plus how long the worker pool takes to drain.
+
+    python -m benchmarks.bench_email_queue [messages] [provider_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.email_queue import EmailQueue
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PROVIDER_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 250
+
+
+def provider_send(to_email, subject, body):
+    time.sleep(PROVIDER_MS / 1000)
+    return True
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.99)] * 1000
+
+
+def main():
+    sync = []
+    for i in range(min(MESSAGES, 20)):
+        start = time.perf_counter()
+        provider_send(f'user{i}@example.com', 'Hello', 'body')
+        sync.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = EmailQueue(provider_send, path=os.path.join(tmp, 'queue.sqlite3'))
+        queued = []
+        drain_start = time.perf_counter()
+        for i in range(MESSAGES):
+            start = time.perf_counter()
+            queue.enqueue(f'user{i}@example.com', 'Hello', 'body')
+            queued.append(time.perf_counter() - start)
+        while queue.stats()['queued']['sent'] < MESSAGES:
+            time.sleep(0.01)
+        drain = time.perf_counter() - drain_start
+        queue.stop()
+
+    print(f"messages: {MESSAGES}  provider latency: {PROVIDER_MS:.0f} ms  workers: {queue.workers}")
+    print("in request thread:  median %8.2f ms   p99 %8.2f ms" % percentiles(sync))
+    print("enqueue:            median %8.2f ms   p99 %8.2f ms" % percentiles(queued))
+    print(f"drain:              {drain:8.2f} s  ({MESSAGES / drain:.1f} messages/s)")
+
+
+if __name__ == '__main__':
+    main()
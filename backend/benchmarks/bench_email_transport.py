@@ -0,0 +1,58 @@
+"""
+Messages per second against a local Resend stub: the old per-message
+requests.post (a new connection each time), the pooled session sending one
+message per request, and batch requests of up to 100. The last line shows
+what each path delivers under the provider's request quota.
+
+    python -m benchmarks.bench_email_transport [messages] [stub_latency_ms]
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.email_service import RATE_LIMIT, ResendTransport
+from benchmarks.stub_resend import StubResend
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+LATENCY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def unpooled(url, messages):
+    for to_email, subject, body in messages:
+        requests.post(f"{url}/emails", json={"from": "a@example.com", "to": [to_email], "subject": subject, "html": body},
+                      headers={"Authorization": "Bearer key"})
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    messages = [(f'user{i}@example.com', 'New Match for your search', 'Hello,\nA new property...') for i in range(MESSAGES)]
+    print(f"messages: {MESSAGES}  stub latency: {LATENCY_MS:.0f} ms")
+    print(f"{'path':>16} {'requests':>9} {'connections':>12} {'msg/s':>10} {'msg/s at quota':>15}")
+    for name in ('unpooled', 'pooled', 'batched'):
+        with StubResend(latency=LATENCY_MS / 1000) as stub:
+            transport = ResendTransport('key', base_url=stub.url, rate_limit=0)
+            if name == 'unpooled':
+                elapsed = timed(lambda: unpooled(stub.url, messages))
+            elif name == 'pooled':
+                elapsed = timed(lambda: [transport.send(*m) for m in messages])
+            else:
+                elapsed = timed(lambda: transport.send_batch(messages))
+            assert stub.messages == MESSAGES
+            per_request = MESSAGES / len(stub.requests)
+            print(f"{name:>16} {len(stub.requests):>9} {len(stub.connections):>12} {MESSAGES / elapsed:>10.0f} "
+                  f"{min(MESSAGES / elapsed, per_request * RATE_LIMIT):>15.0f}")
+
+
+if __name__ == '__main__':
+    import logging
+    logging.getLogger("EmailService").setLevel(logging.WARNING)
+    main()
@@ -0,0 +1,89 @@
+"""
+Bulk import throughput for an NDJSON file of synthetic listings against a
+fake Firestore whose batch commits take a fixed round-trip time.
+
+    python -m benchmarks.bench_import [count] [commit_ms]
+"""
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.property_import import BATCH_ROWS, PropertyImporter, read_rows
+from benchmarks.fake_data import make_listings
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+COMMIT_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 150
+
+
+def validate(data):
+    # Same checks as routes.properties.validate_property_data, without importing Firebase
+    for field in ('title', 'price', 'type'):
+        if not data.get(field):
+            return False, f"Missing required field: {field}"
+    return True, None
+
+
+class FakeRef:
+    counter = 0
+
+    def __init__(self, doc_id=None):
+        FakeRef.counter += 1
+        self.id = doc_id or f"auto{FakeRef.counter}"
+
+    def collection(self, name):
+        return FakeCollection()
+
+    def document(self, doc_id=None):
+        return FakeRef(doc_id)
+
+
+class FakeCollection(FakeRef):
+    pass
+
+
+class FakeBatch:
+    def __init__(self):
+        self.ops = 0
+
+    def set(self, ref, data):
+        self.ops += 1
+
+    def commit(self):
+        assert self.ops <= 500
+        time.sleep(COMMIT_MS / 1000)
+
+
+class FakeDb:
+    def collection(self, name):
+        return FakeCollection()
+
+    def batch(self):
+        return FakeBatch()
+
+
+def ndjson(n):
+    lines = []
+    for prop in make_listings(n).values():
+        prop.pop('createdAt')
+        lines.append(json.dumps(prop))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def main():
+    body = ndjson(SIZE)
+    print(f"rows: {SIZE}  payload: {len(body) / 2**20:.1f} MiB  commit: {COMMIT_MS:.0f} ms/batch of {BATCH_ROWS}")
+    for workers in (1, 8, 16):
+        importer = PropertyImporter(FakeDb(), validate, workers=workers)
+        start = time.perf_counter()
+        report = importer.run(read_rows(io.BytesIO(body), 'ndjson'))
+        elapsed = time.perf_counter() - start
+        print(f"workers {workers:2d}: {elapsed:7.1f} s  {report['imported'] / elapsed:8.0f} rows/s  "
+              f"{report['batches']} batches")
+
+
+if __name__ == '__main__':
+    main()
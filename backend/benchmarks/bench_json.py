@@ -0,0 +1,63 @@
+"""
+Serialisation time for a /api/properties-style payload of 1,000 listings,
+Flask's default JSON provider against the orjson-backed FirestoreJSONProvider.
+
+Timestamps are DatetimeWithNanoseconds, as Firestore returns them.
+
+    python -m benchmarks.bench_json [count]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+from utils.json_provider import FirestoreJSONProvider
+from benchmarks.fake_data import make_listings
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+
+def firestore_listings(n):
+    listings = []
+    for pid, prop in make_listings(n).items():
+        created = prop['createdAt']
+        prop['createdAt'] = DatetimeWithNanoseconds(created.year, created.month, created.day, created.hour,
+                                                    created.minute, created.second, nanosecond=123456789,
+                                                    tzinfo=created.tzinfo)
+        prop['id'] = pid
+        listings.append(prop)
+    return listings
+
+
+def median_ms(fn, repeat=15):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    payload = {"properties": firestore_listings(SIZE), "page": 1, "next_cursor": None, "total": SIZE}
+    app = Flask(__name__)
+    providers = [("flask default", DefaultJSONProvider(app)), ("orjson provider", FirestoreJSONProvider(app))]
+
+    print(f"listings: {SIZE}")
+    with app.app_context():
+        baseline = None
+        for name, provider in providers:
+            body = provider.response(payload).get_data()
+            elapsed = median_ms(lambda: provider.response(payload).get_data())
+            baseline = baseline or elapsed
+            print(f"{name:16} {elapsed:8.2f} ms  {len(body) / 1024:8.1f} KiB  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
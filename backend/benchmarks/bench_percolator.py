@@ -0,0 +1,74 @@
+"""
+Matching a listing against 100,000 standing queries (property requests and
+saved searches): the percolator against evaluating every query in turn,
+which is what streaming property_requests per new listing amounted to.
+
+    python -m benchmarks.bench_percolator [queries] [listings]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.percolator import Percolator, StandingQuery
+from benchmarks.fake_data import LOCALITIES, PROPERTY_TYPES, WORDS, make_listings
+
+QUERIES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+LISTINGS = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+LOCATION_WORDS = sorted({part.strip().split(' ')[-1].lower() for loc in LOCALITIES for part in loc.split(',')})
+
+
+def make_queries(n, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        low = rng.randint(0, 1500) * 100000
+        high = low + rng.randint(10, 800) * 100000
+        if rng.random() < 0.7:
+            queries.append(StandingQuery.from_request(f"r{i}", {"user_id": f"u{i}", "criteria": {
+                "minPrice": low, "maxPrice": high, "bedrooms": rng.randint(0, 4),
+                "type": rng.choice(PROPERTY_TYPES + ["any"]),
+                # A fifth of requests name no location
+                "location": rng.choice(LOCATION_WORDS) if rng.random() < 0.8 else ""}}))
+        else:
+            queries.append(StandingQuery.from_saved_search(f"u{i}", f"s{i}", {"name": "Search", "filters": {
+                "minPrice": low, "maxPrice": high, "bedrooms": rng.randint(0, 3),
+                "propertyType": rng.choice(PROPERTY_TYPES + ["all"]),
+                "searchQuery": rng.choice(WORDS + LOCATION_WORDS) if rng.random() < 0.8 else ""}}))
+    return queries
+
+
+def main():
+    queries = make_queries(QUERIES)
+    listings = list(make_listings(LISTINGS).values())
+
+    percolator = Percolator()
+    start = time.perf_counter()
+    percolator.load(queries)
+    # Group arrays are built on first use
+    for listing in listings[:50]:
+        percolator.match(listing)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matched = sum(len(percolator.match(listing)) for listing in listings)
+    indexed = (time.perf_counter() - start) / len(listings)
+
+    sample = listings[:max(1, LISTINGS // 20)]
+    start = time.perf_counter()
+    for listing in sample:
+        [q for q in queries if q.matches(listing)]
+    scan = (time.perf_counter() - start) / len(sample)
+
+    stats = percolator.stats()
+    print(f"standing queries: {QUERIES}  groups: {stats['groups']}  largest group: {stats['largest_group']}")
+    print(f"build:          {build * 1000:8.1f} ms")
+    print(f"scan all:       {scan * 1000:8.2f} ms per listing")
+    print(f"percolator:     {indexed * 1000:8.2f} ms per listing  ({scan / indexed:.0f}x)")
+    print(f"matches:        {matched / len(listings):8.1f} per listing")
+
+
+if __name__ == '__main__':
+    main()
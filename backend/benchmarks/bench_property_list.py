@@ -0,0 +1,77 @@
+"""
+Compares GET /api/properties served from the in-memory catalog with the
+original implementation, which streamed and parsed the whole collection on
+every request.
+
+    python -m benchmarks.bench_property_list
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+import extensions
+from utils.property_catalog import PropertyCatalog
+from benchmarks.fake_data import make_listings, FakeCollection
+
+SIZES = [1000, 10000, 100000]
+QUERY = '/api/properties?min_price=5000000&sort=price_asc&page=2'
+
+
+def full_stream_list(collection, min_price=5000000, page=2, limit=9):
+    """The pre-catalog list path: stream everything, parse, filter, sort, slice."""
+    properties = []
+    for doc in collection.stream():
+        prop_data = doc.to_dict()
+        prop_data['id'] = doc.id
+        try:
+            price = int(prop_data.get('price', '0').replace('₹', '').replace(',', '').strip())
+        except:
+            price = 0
+        if price < min_price:
+            continue
+        properties.append(prop_data)
+    properties.sort(key=lambda x: int(str(x.get('price', '0')).replace('₹', '').replace(',', '').strip()) if x.get('price') else 0)
+    app_module.app.json.dumps({"properties": properties[(page - 1) * limit:page * limit], "total": len(properties)})
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    # Rate limits would cut the run short
+    app_module.limiter.enabled = False
+    extensions.limiter.enabled = False
+    client = app_module.app.test_client()
+
+    def cached_request():
+        response = client.get(QUERY)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(f"{'listings':>10} {'full stream (ms)':>18} {'catalog (ms)':>14} {'speedup':>9}")
+    for size in SIZES:
+        collection = FakeCollection(make_listings(size))
+        repeat = 20 if size < 100000 else 5
+
+        stream_ms = median_ms(lambda: full_stream_list(collection), repeat)
+
+        catalog = PropertyCatalog(lambda: collection, enabled=True, use_listener=False)
+        catalog.ensure_loaded()
+        with patch('routes.properties.catalog', catalog):
+            cached_ms = median_ms(cached_request, repeat)
+
+        print(f"{size:>10} {stream_ms:>18.2f} {cached_ms:>14.2f} {stream_ms / cached_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Reverse matching: a new property request run against current inventory
+through the catalog's indexes, compared with testing the request against
+every listing. Target: under 50 ms per request at 100,000 listings.
+
+    python -m benchmarks.bench_request_match [listings] [requests]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.property_catalog import PropertyCatalog, created_timestamp
+from benchmarks.fake_data import FakeCollection, make_listings
+from benchmarks.bench_percolator import make_queries
+
+LISTINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+LIMIT = 10
+TARGET_MS = 50
+
+
+def scan(listings, query):
+    matches = [p for p in listings if p.get('status') != 'sold' and query.matches(p)]
+    matches.sort(key=created_timestamp, reverse=True)
+    return matches[:LIMIT]
+
+
+def main():
+    listings = make_listings(LISTINGS)
+    catalog = PropertyCatalog(lambda: FakeCollection(listings), enabled=True, use_listener=False)
+    start = time.perf_counter()
+    catalog.ensure_loaded()
+    load = time.perf_counter() - start
+
+    queries = make_queries(REQUESTS)
+    timings = []
+    found = 0
+    for query in queries:
+        start = time.perf_counter()
+        found += len(catalog.match_query(query, LIMIT))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    values = [dict(p, id=pid) for pid, p in listings.items()]
+    sample = queries[:max(1, REQUESTS // 10)]
+    start = time.perf_counter()
+    for query in sample:
+        scan(values, query)
+    scan_ms = (time.perf_counter() - start) / len(sample) * 1000
+
+    median_ms = timings[len(timings) // 2] * 1000
+    p95_ms = timings[int(len(timings) * 0.95)] * 1000
+    print(f"listings: {LISTINGS}  requests: {REQUESTS}  catalog load: {load:.1f} s")
+    print(f"scan all:   {scan_ms:8.2f} ms per request")
+    print(f"indexed:    {median_ms:8.2f} ms median, {p95_ms:.2f} ms p95  "
+          f"({'within' if p95_ms < TARGET_MS else 'over'} the {TARGET_MS} ms target)")
+    print(f"matches:    {found / REQUESTS:8.1f} per request (limit {LIMIT})")
+
+
+if __name__ == '__main__':
+    main()
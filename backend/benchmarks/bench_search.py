@@ -0,0 +1,51 @@
+"""
+Compares the old substring scan over title/location with the ranked
+inverted index used by /api/properties?search=.
+
+    python -m benchmarks.bench_search
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.search_index import SearchIndex
+from benchmarks.fake_data import make_listings
+
+SIZES = [1000, 10000, 100000]
+# Broad single words, a two-word phrase, a typed prefix and a rare description term
+QUERIES = ['villa', 'whitefield', 'luxury penthouse', 'garden resid', 'kasan']
+
+
+def substring_scan(listings, query):
+    return [pid for pid, p in listings.items()
+            if query in p['title'].lower() or query in p['location'].lower()]
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    print(f"{'listings':>10} {'query':>16} {'scan (ms)':>11} {'index (ms)':>11} {'matches':>9}")
+    for size in SIZES:
+        listings = make_listings(size)
+        index = SearchIndex()
+        index.rebuild(listings.items())
+        repeat = 20 if size < 100000 else 5
+        for query in QUERIES:
+            scan_ms = median_ms(lambda: substring_scan(listings, query), repeat)
+            index_ms = median_ms(lambda: sorted(index.search(query).items(), key=lambda kv: -kv[1])[:9], repeat)
+            matches = len(index.search(query))
+            print(f"{size:>10} {query:>16} {scan_ms:>11.2f} {index_ms:>11.2f} {matches:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+# Synthetic listings shaped like the ones written by seed_data.py
+
+PROPERTY_TYPES = ["Authority plots", "Free Hold plots", "Commercial Plots", "Industrial or Factory Plots", "Villa's"]
+LOCALITIES = ["Sec 16B, Greater Noida West", "Andheri East, Mumbai", "Vashi, Navi Mumbai", "Sector 62, Noida",
+              "Indirapuram, Ghaziabad", "DLF Phase 3, Gurgaon", "Whitefield, Bangalore", "Baner, Pune"]
+WORDS = ["luxury", "villa", "modern", "apartment", "park", "view", "spacious", "penthouse", "studio", "market",
+         "premium", "commercial", "family", "home", "urban", "loft", "corner", "plot", "garden", "residence"]
+# Filler vocabulary for descriptions, so description terms are not all common
+FILLER = [a + b + c for a in ["ka", "ri", "so", "ne", "ta", "mu", "pe", "lo"]
+          for b in ["ra", "di", "vo", "ku", "sa", "me"] for c in ["n", "l", "sh", "t", "m"]]
+AMENITIES = ["Pool", "Gym", "Parking", "Garden", "Security", "Clubhouse", "Lift", "Power Backup"]
+
+
+def format_inr(value):
+    """Formats an integer the Indian way, e.g. 15000000 -> '1,50,00,000'."""
+    digits = str(value)
+    if len(digits) <= 3:
+        return digits
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ",".join(groups + [tail])
+
+
+def make_listing(i, rng):
+    price = rng.randint(50, 2000) * 100000
+    lat = 28.4 + rng.random() * 0.4
+    lng = 77.0 + rng.random() * 0.6
+    return {
+        "title": " ".join(rng.sample(WORDS, 4)).title(),
+        "location": rng.choice(LOCALITIES),
+        "price": f"₹ {format_inr(price)}",
+        "priceValue": price,
+        "bedrooms": rng.randint(1, 5),
+        "bathrooms": rng.randint(1, 6),
+        "area": rng.randint(500, 5000),
+        "type": rng.choice(PROPERTY_TYPES),
+        "status": rng.choice(["available", "available", "sold"]),
+        "description": " ".join(rng.choice(FILLER) for _ in range(28)) + " " + " ".join(rng.sample(WORDS, 2)),
+        "amenities": [{"name": a, "type": "facility", "distance": ""} for a in rng.sample(AMENITIES, 3)],
+        "images": [f"https://images.example.com/{i}/{n}.jpg" for n in range(3)],
+        "coordinates": {"lat": lat, "lng": lng},
+        "createdAt": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+        "views": rng.randint(0, 500),
+    }
+
+
+def make_listings(n, seed=42):
+    rng = random.Random(seed)
+    return {f"prop{i:07d}": make_listing(i, rng) for i in range(n)}
+
+
+class FakeSnapshot:
+    """Mimics a Firestore DocumentSnapshot; to_dict() copies like deserialisation does."""
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = True
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeCollection:
+    def __init__(self, listings):
+        self.listings = listings
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def stream(self):
+        for doc_id, data in self.listings.items():
+            yield FakeSnapshot(doc_id, data)
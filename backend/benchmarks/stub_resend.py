@@ -0,0 +1,72 @@
+"""
+A local stand-in for the Resend API (POST /emails and /emails/batch) for
+benchmarks and tests: configurable latency, scripted failure responses,
+and counts of requests, messages and client connections.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubResend:
+    def __init__(self, latency=0.0, responses=None):
+        """responses: (status, headers) returned for the first requests, then 200s."""
+        self.latency = latency
+        self.responses = list(responses or [])
+        self.requests = []
+        self.messages = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body leave in one segment, as from a real server
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.connections.add(self.client_address)
+                    stub.requests.append((self.path, payload))
+                    status, headers = stub.responses.pop(0) if stub.responses else (200, {})
+                    if status == 200:
+                        stub.messages += len(payload) if isinstance(payload, list) else 1
+                if status == 200:
+                    items = payload if isinstance(payload, list) else [payload]
+                    ids = [{"id": f"msg{i}"} for i in range(len(items))]
+                    body = json.dumps({"data": ids} if isinstance(payload, list) else ids[0]).encode()
+                else:
+                    body = json.dumps({"name": "error", "statusCode": status}).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
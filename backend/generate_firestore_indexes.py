@@ -0,0 +1,51 @@
+from itertools import product
+import json
+import os
+import sys
+
+from routes.properties import _filtered_query, _ordered_query
+from utils.firestore_indexes import RecordingQuery, dumps, unique_indexes
+
+# Regenerates ../firestore.indexes.json from the property queries the API can
+# build: every combination of listing filters, unordered (facets, export,
+# request matching) and under each sort order.
+#
+# Usage: python generate_firestore_indexes.py [--check]
+#
+# --check exits non-zero instead of writing when the file is out of date.
+
+INDEXES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firestore.indexes.json')
+
+TYPES = ([], ['Apartment'], ['Apartment', 'Villa'])
+STATUSES = ([], ['Available'], ['Available', 'Under Construction'])
+BEDROOMS = (None, 2)
+PRICE_RANGES = ((None, None), (1000000, None), (None, 5000000), (1000000, 5000000))
+SORTS = (None, 'newest', 'price_asc', 'price_desc', 'distance')
+
+def property_queries():
+    for types, statuses, bedrooms, (min_price, max_price), sort_by in product(
+            TYPES, STATUSES, BEDROOMS, PRICE_RANGES, SORTS):
+        args = {'types': types, 'statuses': statuses, 'bedrooms': bedrooms,
+                'min_price': min_price, 'max_price': max_price}
+        query = _filtered_query(args, RecordingQuery('properties'))
+        yield _ordered_query(query, sort_by) if sort_by else query
+
+def generate():
+    with open(INDEXES_FILE) as f:
+        current = json.load(f)
+    # Indexes on other collections are maintained by hand
+    kept = [i for i in current['indexes'] if i['collectionGroup'] != 'properties']
+    indexes = unique_indexes(property_queries())
+    return dumps(kept + indexes, current.get('fieldOverrides', [])), current
+
+if __name__ == "__main__":
+    text, current = generate()
+    if '--check' in sys.argv:
+        if json.loads(text) != current:
+            print("firestore.indexes.json is out of date, run generate_firestore_indexes.py")
+            sys.exit(1)
+        print("firestore.indexes.json is up to date")
+    else:
+        with open(INDEXES_FILE, 'w') as f:
+            f.write(text)
+        print(f"Wrote {len(json.loads(text)['indexes'])} indexes to {os.path.normpath(INDEXES_FILE)}")
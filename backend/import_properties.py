@@ -0,0 +1,54 @@
+from firebase_config import initialize_firebase
+from routes.properties import validate_property_data
+from utils.property_import import COMMIT_WORKERS, PropertyImporter, detect_format, read_rows
+import sys
+import time
+
+# Bulk-creates listings from a CSV or NDJSON file with batched writes.
+#
+# Usage: python import_properties.py <file.csv|file.ndjson> [--dry-run] [--workers N]
+#
+# CSV columns match the listing fields; images and amenities take "a|b|c"
+# or a JSON array, lat/lng become coordinates. An optional id column makes
+# re-running an import overwrite instead of duplicating.
+
+db, _ = initialize_firebase()
+
+def main(argv):
+    workers = COMMIT_WORKERS
+    if '--workers' in argv:
+        i = argv.index('--workers')
+        workers = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    args = [a for a in argv if not a.startswith('--')]
+    if not args:
+        print("Usage: python import_properties.py <file.csv|file.ndjson> [--dry-run] [--workers N]")
+        return 1
+    path = args[0]
+    fmt = detect_format(path)
+    if fmt is None:
+        print("Unrecognised file type; use a .csv, .ndjson or .jsonl file")
+        return 1
+
+    imported = [0]
+
+    def progress(written):
+        imported[0] += len(written)
+        print(f"Imported {imported[0]} properties")
+
+    importer = PropertyImporter(db, validate_property_data, workers=workers,
+                                dry_run='--dry-run' in argv, on_committed=progress)
+    start = time.time()
+    with open(path, 'rb') as f:
+        report = importer.run(read_rows(f, fmt))
+
+    for error in report['errors']:
+        print(f"Row {error['row']}: {error['error']}")
+    if report['errors_truncated']:
+        print(f"... {report['failed'] - len(report['errors'])} more errors not listed")
+    print(f"Done in {time.time() - start:.1f}s: {report['imported']} imported, "
+          f"{report['failed']} failed of {report['rows']} rows in {report['batches']} batches")
+    return 2 if report['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -3,6 +3,7 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore
 from datetime import datetime
 from routes.auth import verify_admin
+from utils.response_cache import response_cache
 
 analytics_bp = Blueprint('analytics', __name__)
 db, bucket = initialize_firebase()
@@ -43,8 +44,11 @@ def track_event():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Lead, user and listing writes invalidate it; tracked views and contacts
+# are too frequent to, so those counters may lag by the TTL
 @analytics_bp.route('/api/analytics/dashboard', methods=['GET'])
 @verify_admin
+@response_cache.cached(tags=['dashboard', 'properties:list'], ttl=60, stale_ttl=600)
 def get_dashboard_stats():
     print("Fetching dashboard stats...")
     try:
@@ -143,22 +147,23 @@ def get_dashboard_stats():
         return jsonify({"error": str(e)}), 500
 
 @analytics_bp.route('/api/analytics/public-stats', methods=['GET'])
+@response_cache.cached(tags=['properties:list', 'users'], ttl=600, stale_ttl=3600)
 def get_public_stats():
     try:
-        # 1. Total Properties
+        # 1. Total Properties (one pass also collects the cities below)
         props_ref = db.collection('properties')
-        total_properties = len(list(props_ref.stream()))
+        property_docs = list(props_ref.select(['location']).stream())
+        total_properties = len(property_docs)
         
         # 2. Total Clients (Mocked base + real count)
         users_ref = db.collection('users')
-        total_users = 2000 + len(list(users_ref.stream()))
+        total_users = 2000 + users_ref.count().get()[0][0].value
         
         # 3. Cities (Count unique cities)
-        # This is expensive if we iterate all. For now, let's mock or estimate.
         # Ideally, we maintain a 'cities' collection or aggregate.
         # Let's just return a static number + distinct cities count if small.
         cities = set()
-        for doc in props_ref.stream():
+        for doc in property_docs:
             data = doc.to_dict()
             location = data.get('location')
             if isinstance(location, dict):
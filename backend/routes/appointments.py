@@ -3,10 +3,27 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore, auth
 from datetime import datetime
 from routes.auth import verify_token, verify_admin
+from utils.property_batch import fetch_properties_by_id, property_summary
+from utils.streaming import document_items, in_chunks, stream_json
 
 appointments_bp = Blueprint('appointments', __name__)
 db, bucket = initialize_firebase()
 
+# Appointments enriched per property batch while the admin listing streams
+ENRICH_CHUNK = 300
+
+
+def _with_property_summaries(appointments):
+    """Adds property title/image to appointments, one get_all per chunk."""
+    for chunk in in_chunks(appointments, ENRICH_CHUNK):
+        properties = fetch_properties_by_id(db, [a.get('property_id') for a in chunk],
+                                            fields=['title', 'images', 'imageUrl'])
+        for data in chunk:
+            p_data = properties.get(data.get('property_id'))
+            if p_data:
+                data.update(property_summary(p_data))
+            yield data
+
 @appointments_bp.route('/api/appointments', methods=['POST'])
 @verify_token
 def create_appointment():
@@ -84,16 +101,15 @@ def get_user_appointments(user_id):
         for doc in docs:
             data = doc.to_dict()
             data['id'] = doc.id
-            
-            # Fetch property details for context
-            if data.get('property_id'):
-                p_doc = db.collection('properties').document(data['property_id']).get()
-                if p_doc.exists:
-                    p_data = p_doc.to_dict()
-                    data['property_title'] = p_data.get('title', 'Unknown Property')
-                    data['property_image'] = p_data.get('images', [])[0] if p_data.get('images') else p_data.get('imageUrl')
-            
             appointments.append(data)
+
+        # Fetch property details for context in one round trip
+        properties = fetch_properties_by_id(db, [a.get('property_id') for a in appointments],
+                                            fields=['title', 'images', 'imageUrl'])
+        for data in appointments:
+            p_data = properties.get(data.get('property_id'))
+            if p_data:
+                data.update(property_summary(p_data))
             
         return jsonify(appointments), 200
     except Exception as e:
@@ -106,23 +122,7 @@ def get_all_appointments():
         docs = db.collection('appointments')\
             .order_by('created_at', direction=firestore.Query.DESCENDING)\
             .stream()
-            
-        appointments = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            
-            # Fetch property details for context
-            if data.get('property_id'):
-                p_doc = db.collection('properties').document(data['property_id']).get()
-                if p_doc.exists:
-                    p_data = p_doc.to_dict()
-                    data['property_title'] = p_data.get('title', 'Unknown Property')
-                    data['property_image'] = p_data.get('images', [])[0] if p_data.get('images') else p_data.get('imageUrl')
-            
-            appointments.append(data)
-            
-        return jsonify(appointments), 200
+        return stream_json(_with_property_summaries(document_items(docs))), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -3,6 +3,9 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore
 import slugify
 from routes.auth import verify_admin
+from utils.http_cache import BLOG_CACHE_CONTROL, conditional_json, etag_for
+from utils.response_cache import response_cache
+from utils.streaming import stream_json
 
 blogs_bp = Blueprint('blogs', __name__)
 db, bucket = initialize_firebase()
@@ -10,9 +13,17 @@ db, bucket = initialize_firebase()
 def get_slug(title):
     return slugify.slugify(title)
 
+def _updated_at(doc):
+    """The blog's updated_at, read without decoding the whole document."""
+    try:
+        return str(doc.get('updated_at'))
+    except KeyError:
+        return None
+
 # --- Public Endpoints ---
 
 @blogs_bp.route('/api/blogs', methods=['GET'])
+@response_cache.cached(tags=['blogs'])
 def get_blogs():
     try:
         category = request.args.get('category')
@@ -23,22 +34,33 @@ def get_blogs():
         if category:
             query = query.where('category', '==', category)
             
-        docs = query.limit(limit).stream()
-        
-        blogs = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            blogs.append(data)
-            
-        # Sort in memory to avoid composite index requirement
-        blogs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-        return jsonify(blogs), 200
+        docs = list(query.limit(limit).stream())
+
+        def build():
+            blogs = []
+            for doc in docs:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                blogs.append(data)
+
+            # Sort in memory to avoid composite index requirement
+            blogs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+            return blogs
+
+        # Weak: view counters may differ between responses sharing a tag
+        tag = etag_for(request.query_string, [(doc.id, _updated_at(doc)) for doc in docs])
+        return conditional_json(build, tag=tag, weak=True, cache_control=BLOG_CACHE_CONTROL)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _count_cached_view(response, slug):
+    """Cached blog responses still count as views."""
+    blog_id = (response.get_json(silent=True) or {}).get('id')
+    if blog_id:
+        db.collection('blogs').document(blog_id).update({'views': firestore.Increment(1)})
+
 @blogs_bp.route('/api/blogs/<slug>', methods=['GET'])
+@response_cache.cached(tags=['blogs'], on_hit=_count_cached_view)
 def get_blog_by_slug(slug):
     try:
         # Query by slug
@@ -48,17 +70,22 @@ def get_blog_by_slug(slug):
         if not blog_doc:
             return jsonify({"error": "Blog not found"}), 404
             
-        data = blog_doc.to_dict()
-        data['id'] = blog_doc.id
-        
-        # Increment view count
+        # Increment view count (304 revalidations are views too)
         blog_doc.reference.update({'views': firestore.Increment(1)})
-        
-        return jsonify(data), 200
+
+        def build():
+            data = blog_doc.to_dict()
+            data['id'] = blog_doc.id
+            return data
+
+        # Weak: updated_at only moves on edits, not on view increments
+        tag = etag_for(blog_doc.id, _updated_at(blog_doc))
+        return conditional_json(build, tag=tag, weak=True, cache_control=BLOG_CACHE_CONTROL)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @blogs_bp.route('/api/blog-categories', methods=['GET'])
+@response_cache.cached(tags=['blog-categories'])
 def get_categories():
     try:
         docs = db.collection('blog_categories').order_by('name').stream()
@@ -74,8 +101,7 @@ def get_categories():
 def get_all_blogs_admin():
     try:
         docs = db.collection('blogs').order_by('created_at', direction=firestore.Query.DESCENDING).stream()
-        blogs = [{"id": doc.id, **doc.to_dict()} for doc in docs]
-        return jsonify(blogs), 200
+        return stream_json({"id": doc.id, **doc.to_dict()} for doc in docs), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -128,6 +154,7 @@ def create_blog():
         }
         
         db.collection('blogs').add(blog_data)
+        response_cache.invalidate('blogs')
         
         return jsonify({"message": "Blog created successfully", "slug": slug}), 201
     except Exception as e:
@@ -164,6 +191,7 @@ def update_blog(blog_id):
             pass
 
         db.collection('blogs').document(blog_id).update(update_data)
+        response_cache.invalidate('blogs')
         
         return jsonify({"message": "Blog updated successfully"}), 200
     except Exception as e:
@@ -174,6 +202,7 @@ def update_blog(blog_id):
 def delete_blog(blog_id):
     try:
         db.collection('blogs').document(blog_id).delete()
+        response_cache.invalidate('blogs')
         return jsonify({"message": "Blog deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -194,6 +223,7 @@ def create_category():
             'name': name,
             'slug': slug
         })
+        response_cache.invalidate('blog-categories')
         
         return jsonify({"message": "Category created"}), 201
     except Exception as e:
@@ -1,8 +1,10 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 from firebase_config import initialize_firebase
 from firebase_admin import firestore
 from datetime import datetime, timedelta
 from routes.auth import verify_admin
+from utils.response_cache import response_cache
+from utils.email_service import email_queue
 
 cleanup_bp = Blueprint('cleanup', __name__)
 db, _ = initialize_firebase()
@@ -88,6 +90,7 @@ def cleanup_data():
         if count > 0:
             batch.commit()
 
+        response_cache.invalidate('dashboard')
         return jsonify({
             "message": "Cleanup completed",
             "events_deleted": deleted_count,
@@ -97,3 +100,46 @@ def cleanup_data():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@cleanup_bp.route('/api/admin/response-cache', methods=['GET'])
+@verify_admin
+def get_response_cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+@cleanup_bp.route('/api/admin/response-cache', methods=['DELETE'])
+@verify_admin
+def clear_response_cache():
+    response_cache.clear()
+    return jsonify({"message": "Response cache cleared"}), 200
+
+@cleanup_bp.route('/api/admin/response-cache/routes', methods=['PATCH'])
+@verify_admin
+def toggle_response_cache_route():
+    """Body: {"route": "blogs.get_blogs", "enabled": false}"""
+    data = request.json or {}
+    route = data.get('route')
+    if not route or not isinstance(data.get('enabled'), bool):
+        return jsonify({"error": "route and enabled are required"}), 400
+    response_cache.set_route_enabled(route, data['enabled'])
+    return jsonify({"route": route, "enabled": response_cache.route_enabled(route)}), 200
+
+@cleanup_bp.route('/api/admin/email-queue', methods=['GET'])
+@verify_admin
+def get_email_queue():
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({**email_queue.stats(), "dead_letters": email_queue.dead_letters(limit)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@cleanup_bp.route('/api/admin/email-queue/retry', methods=['POST'])
+@verify_admin
+def retry_dead_emails():
+    """Body: {"ids": [12, 15]} requeues those dead letters; no ids requeues all of them."""
+    try:
+        ids = (request.json or {}).get('ids') if request.is_json else None
+        if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+            return jsonify({"error": "ids must be a list of integers"}), 400
+        return jsonify({"requeued": email_queue.retry_dead(ids)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
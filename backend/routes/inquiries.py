@@ -3,6 +3,8 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore
 from datetime import datetime
 from routes.auth import verify_token, verify_admin
+from utils.streaming import document_items, stream_json
+from utils.response_cache import response_cache
 
 inquiries_bp = Blueprint('inquiries', __name__)
 db, _ = initialize_firebase()
@@ -29,6 +31,7 @@ def create_inquiry():
              return jsonify({"error": "Email and message are required"}), 400
 
         db.collection('inquiries').add(inquiry_data)
+        response_cache.invalidate('dashboard')
         
         # Send Notifications
         try:
@@ -50,14 +53,7 @@ def get_all_inquiries():
         docs = db.collection('inquiries')\
             .order_by('timestamp', direction=firestore.Query.DESCENDING)\
             .stream()
-            
-        inquiries = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            inquiries.append(data)
-            
-        return jsonify(inquiries), 200
+        return stream_json(document_items(docs)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -3,6 +3,9 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore
 from datetime import datetime
 from routes.auth import verify_admin
+from utils.json_provider import encode_value
+from utils.percolator import StandingQuery, percolator, request_query_id
+from utils.response_cache import response_cache
 
 leads_bp = Blueprint('leads', __name__)
 db, _ = initialize_firebase()
@@ -96,7 +99,7 @@ def export_leads():
                 lead.get('phone', ''),
                 lead.get('status', ''),
                 lead.get('source', 'Website'),
-                lead.get('createdAt', ''),
+                encode_value(lead['createdAt']) if isinstance(lead.get('createdAt'), datetime) else lead.get('createdAt', ''),
                 lead.get('title', '') or lead.get('property_title', '')
             ])
             
@@ -139,7 +142,18 @@ def update_lead_status(lead_type, lead_id):
             update_data['notes'] = data['notes']
             
         ref.update(update_data)
-        
+        # The dashboard's lead funnel counts statuses
+        response_cache.invalidate('dashboard')
+
+        if lead_type != 'inquiry' and 'status' in update_data:
+            # Only active requests take part in listing matches
+            if update_data['status'] == 'active':
+                doc = ref.get()
+                if doc.exists:
+                    percolator.add(StandingQuery.from_request(lead_id, doc.to_dict()))
+            else:
+                percolator.remove(request_query_id(lead_id))
+
         return jsonify({"message": "Lead updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
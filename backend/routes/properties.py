@@ -1,12 +1,52 @@
 from flask import Blueprint, request, jsonify
+from datetime import datetime, timezone
+import base64
+import json
+import math
 from firebase_config import initialize_firebase
-from firebase_admin import firestore, auth
+from firebase_admin import firestore
 from .auth import verify_admin
 from utils.email_service import notify_saved_search_match, notify_price_drop
+from utils.property_catalog import PropertyCatalog, created_timestamp, parse_price, price_value
+from utils.property_store import ColumnarStore, amenity_names, normalize_label
+from utils.geo_index import haversine_km
+from utils.search_index import text_matches
+from utils.cluster_index import ClusterIndex, cluster_markers
+from utils.property_batch import MAX_BATCH_IDS, fetch_properties, property_summary
+from utils.property_fields import parse_fields
+from utils.favorites import favorited_by, user_emails
+from utils.percolator import percolator
+from utils.property_diff import diff_fields, field_label, price_change, touches_match_fields
+from utils.property_import import FORMATS as IMPORT_FORMATS, PropertyImporter, detect_format, read_rows
+from utils.property_export import FORMATS as EXPORT_FORMATS, csv_chunks, parquet_available, parquet_chunks, with_history_counts
+from utils.streaming import primed, stream_json, stream_response
+from utils.http_cache import DETAIL_CACHE_CONTROL, LIST_CACHE_CONTROL, conditional_json, etag_for
+from utils.response_cache import response_cache
 
 properties_bp = Blueprint('properties', __name__)
 db, _ = initialize_firebase()
 
+# In-memory copy of the properties collection used by the list endpoint
+catalog = PropertyCatalog(lambda: db.collection('properties'))
+
+def _invalidate_cached_responses(property_ids):
+    """Catalog changes made by other processes reach us through the listener."""
+    tags = ['properties:list']
+    if property_ids is None:
+        response_cache.invalidate(*tags, *[t for t in response_cache.tags() if t.startswith('property:')])
+    else:
+        response_cache.invalidate(*tags, *[f'property:{pid}' for pid in property_ids])
+
+catalog.on_change = _invalidate_cached_responses
+
+MAX_RADIUS_KM = 500
+# Current listings returned and stored with a new property request
+REQUEST_MATCH_LIMIT = 10
+# Documents the Firestore fallback reads when the catalog is off
+REQUEST_MATCH_SCAN = 500
+# Fields the Firestore listing path reads for in-process filters and sort keys
+LIST_QUERY_FIELDS = ['title', 'location', 'amenities', 'coordinates', 'price', 'priceValue', 'createdAt']
+
 def validate_property_data(data, partial=False):
     required_fields = ['title', 'price', 'type']
     if not partial:
@@ -30,80 +70,449 @@ def validate_property_data(data, partial=False):
         
     return True, None
 
-@properties_bp.route('/api/properties', methods=['GET'])
-def get_properties():
+def _list_values(name):
+    """Multi-select parameters accept comma separated or repeated values."""
+    values = []
+    for raw in request.args.getlist(name):
+        values += [v.strip() for v in raw.split(',') if v.strip()]
+    return values
+
+def _list_args():
+    """Parses the query parameters shared by the listing endpoints."""
+    return {
+        'min_price': request.args.get('min_price', type=int),
+        'max_price': request.args.get('max_price', type=int),
+        'bedrooms': request.args.get('bedrooms', type=int),
+        'types': _list_values('type'),
+        'statuses': _list_values('status'),
+        'amenities': _list_values('amenities'),
+        'search': request.args.get('search', '').lower(),
+        'near': request.args.get('near'),
+        'radius_km': request.args.get('radius_km', 5, type=float),
+        'bbox': request.args.get('bbox'),
+        # Map searches around a point list the closest listings first
+        'sort': request.args.get('sort', 'distance' if request.args.get('near') else 'newest'),
+        'page': request.args.get('page', 1, type=int),
+        'limit': request.args.get('limit', 9, type=int),
+        'cursor': request.args.get('cursor'),
+        'include_total': request.args.get('include_total', 'true').lower() != 'false',
+        'fields': parse_fields(request.args.get('fields'))
+    }
+
+def _parse_floats(value, count, name):
     try:
-        properties_ref = db.collection('properties')
-        
-        # Get query parameters
-        min_price = request.args.get('min_price', type=int)
-        max_price = request.args.get('max_price', type=int)
-        bedrooms = request.args.get('bedrooms', type=int)
-        prop_type = request.args.get('type')
-        search = request.args.get('search', '').lower()
-        sort_by = request.args.get('sort', 'newest')
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 9, type=int)
-
-        # Firestore filtering (basic)
-        query = properties_ref
-        if prop_type:
-            query = query.where('type', '==', prop_type)
-        if bedrooms:
-            query = query.where('bedrooms', '>=', bedrooms)
-            
-        docs = query.stream()
-        properties = []
-        
-        for doc in docs:
-            prop_data = doc.to_dict()
-            prop_data['id'] = doc.id
-            
-            # In-memory filtering for fields that might be complex to index or string matching
-            # Price parsing (assuming stored as string "₹ 1,50,00,000")
+        numbers = [float(v) for v in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(n) for n in numbers):
+        raise ValueError(f"Invalid {name}")
+    return numbers
+
+def _geo_args(args):
+    """
+    Parses near=lat,lng (with radius_km) and bbox=south,west,north,east.
+    Returns (near, bbox) as tuples or None; raises ValueError.
+    """
+    near = bbox = None
+    if args['near']:
+        lat, lng = _parse_floats(args['near'], 2, 'near')
+        radius_km = args['radius_km']
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("Invalid near")
+        if radius_km is None or not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM}")
+        near = (lat, lng, radius_km)
+    if args['bbox']:
+        south, west, north, east = _parse_floats(args['bbox'], 4, 'bbox')
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            raise ValueError("Invalid bbox")
+        bbox = (south, west, north, east)
+    if args['sort'] == 'distance' and near is None:
+        raise ValueError("sort=distance requires near")
+    return near, bbox
+
+# --- Keyset pagination ---
+# Every sort order has a unique key: (sort value, document id). A cursor is
+# the opaque, url-safe encoding of the key of the last item on a page.
+
+def _sort_field(sort_by):
+    if sort_by in ('price_asc', 'price_desc'):
+        return 'priceValue'
+    # Relevance needs the search index, Firestore falls back to newest
+    return 'createdAt'
+
+def _is_descending(sort_by):
+    return sort_by not in ('price_asc', 'distance')
+
+def _sort_key(sort_by):
+    """Returns the function mapping a property to its (value, id) sort key."""
+    if sort_by == 'distance':
+        return lambda p: (p['distance_km'], p['id'])
+    if _sort_field(sort_by) == 'priceValue':
+        return lambda p: (price_value(p), p['id'])
+    return lambda p: (created_timestamp(p), p['id'])
+
+def encode_cursor(sort_by, key):
+    payload = json.dumps([sort_by, *key])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_by):
+    """Returns the (value, id) key encoded in a cursor, or raises ValueError."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, property_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort_by:
+        raise ValueError("Cursor does not match sort order")
+    # Every sort value (price, createdAt epoch seconds, distance) is a number
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) \
+            or not isinstance(property_id, str):
+        raise ValueError("Invalid cursor")
+    return value, property_id
+
+def _after_cursor(properties, key, sort_by, sort_key):
+    """Drops items up to and including the cursor key from a sorted list."""
+    key = tuple(key)
+    if _is_descending(sort_by):
+        return [p for p in properties if sort_key(p) < key]
+    return [p for p in properties if sort_key(p) > key]
+
+def _list_from_catalog(args):
+    """Answers a listing query from the catalog's columnar store."""
+    cursor = decode_cursor(args['cursor'], args['sort']) if args['cursor'] else None
+    near, bbox = _geo_args(args)
+    return catalog.query(
+        min_price=args['min_price'],
+        max_price=args['max_price'],
+        bedrooms=args['bedrooms'],
+        prop_types=args['types'],
+        statuses=args['statuses'],
+        amenities=args['amenities'],
+        search=args['search'],
+        bbox=bbox,
+        near=near,
+        sort_by=args['sort'],
+        cursor=cursor,
+        offset=0 if cursor else (args['page'] - 1) * args['limit'],
+        limit=args['limit']
+    )
+
+def _query_fields(fields, args):
+    """Fields a filtered read needs; search also looks at the description."""
+    return fields + ['description'] if args['search'] else fields
+
+def _stream_matching(query, args):
+    """Yields the documents of query that pass the search, amenity and geo filters."""
+    wanted_amenities = {normalize_label(a) for a in args['amenities']}
+    near, bbox = _geo_args(args)
+    for doc in query.stream():
+        prop_data = doc.to_dict()
+        if args['search'] and not text_matches(prop_data, args['search']):
+            continue
+        if not wanted_amenities <= amenity_names(prop_data):
+            continue
+        if near or bbox:
+            coordinates = prop_data.get('coordinates')
             try:
-                price_str = prop_data.get('price', '0').replace('₹', '').replace(',', '').strip()
-                price = int(price_str)
-            except:
-                price = 0
-                
-            if min_price is not None and price < min_price:
+                lat, lng = float(coordinates['lat']), float(coordinates['lng'])
+            except (TypeError, KeyError, ValueError):
                 continue
-            if max_price is not None and price > max_price:
+            if bbox and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
                 continue
-                
-            # Search filter (Title or Location)
-            if search:
-                title = prop_data.get('title', '').lower()
-                location = prop_data.get('location', '').lower()
-                if search not in title and search not in location:
+            if near:
+                distance = float(haversine_km(near[0], near[1], lat, lng))
+                if distance > near[2]:
                     continue
-                    
-            properties.append(prop_data)
-            
-        # Sorting
-        if sort_by == 'price_asc':
-            properties.sort(key=lambda x: int(str(x.get('price', '0')).replace('₹', '').replace(',', '').strip()) if x.get('price') else 0)
-        elif sort_by == 'price_desc':
-            properties.sort(key=lambda x: int(str(x.get('price', '0')).replace('₹', '').replace(',', '').strip()) if x.get('price') else 0, reverse=True)
-        else: # newest (default)
-            # Assuming documents have a timestamp or we use ID/natural order if no timestamp
-            # For now, reverse list as Firestore returns oldest first by default usually
-            properties.reverse()
-
-        # Pagination
+                prop_data['distance_km'] = round(distance, 3)
+        prop_data['id'] = doc.id
+        yield prop_data
+
+def _filtered_query(args, query=None):
+    """Applies the listing filters Firestore can evaluate to the properties collection."""
+    query = db.collection('properties') if query is None else query
+    if len(args['types']) == 1:
+        query = query.where('type', '==', args['types'][0])
+    elif args['types']:
+        query = query.where('type', 'in', args['types'])
+    if len(args['statuses']) == 1:
+        query = query.where('status', '==', args['statuses'][0])
+    elif args['statuses']:
+        query = query.where('status', 'in', args['statuses'])
+    if args['bedrooms']:
+        query = query.where('bedrooms', '>=', args['bedrooms'])
+    if args['min_price'] is not None:
+        query = query.where('priceValue', '>=', args['min_price'])
+    if args['max_price'] is not None:
+        query = query.where('priceValue', '<=', args['max_price'])
+    return query
+
+def _ordered_query(query, sort_by):
+    """Orders a filtered query by its sort field, with the document id breaking ties so cursors are stable."""
+    direction = firestore.Query.DESCENDING if _is_descending(sort_by) else firestore.Query.ASCENDING
+    return query.order_by(_sort_field(sort_by), direction=direction).order_by('__name__', direction=direction)
+
+def _list_from_firestore(args):
+    """
+    Pushes filters, ordering and limits down to Firestore so a page reads
+    O(page) documents. Relies on the numeric priceValue field (see
+    backfill_price_value.py) and the composite indexes generate_firestore_indexes.py
+    writes to firestore.indexes.json.
+    """
+    _geo_args(args)
+    query = _filtered_query(args)
+    # Read only the requested fields, plus what filtering and cursors need
+    select_paths = args['fields'].select_paths(extra=_query_fields(LIST_QUERY_FIELDS, args))
+    if select_paths is not None:
+        query = query.select(select_paths)
+
+    sort_by = args['sort']
+    query = _ordered_query(query, sort_by)
+
+    sort_key = _sort_key(sort_by)
+    cursor_key = decode_cursor(args['cursor'], sort_by) if args['cursor'] else None
+    start = 0 if cursor_key else (args['page'] - 1) * args['limit']
+
+    if args['search'] or args['amenities'] or args['near'] or args['bbox']:
+        # Substring search, amenity objects and geometry cannot be pushed down, filter the narrowed set here
+        properties = list(_stream_matching(query, args))
+        if sort_by == 'distance':
+            properties.sort(key=sort_key)
         total = len(properties)
-        total_pages = (total + limit - 1) // limit
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_properties = properties[start:end]
-        
-        return jsonify({
-            "properties": paginated_properties,
-            "total": total,
-            "page": page,
-            "total_pages": total_pages
-        }), 200
+        if cursor_key:
+            properties = _after_cursor(properties, cursor_key, sort_by, sort_key)
+        page = properties[start:start + args['limit']]
+        last_key = sort_key(page[-1]) if page else None
+        return page, total, len(properties) > start + args['limit'], last_key
+
+    total = query.count().get()[0][0].value if args['include_total'] else None
+
+    if cursor_key:
+        value, property_id = cursor_key
+        field = _sort_field(sort_by)
+        if field == 'createdAt':
+            value = datetime.fromtimestamp(value, timezone.utc)
+        query = query.start_after({field: value, '__name__': property_id})
+    elif start:
+        query = query.offset(start)
+
+    # One extra document tells us whether there is a next page
+    properties = []
+    for doc in query.limit(args['limit'] + 1).stream():
+        prop_data = doc.to_dict()
+        prop_data['id'] = doc.id
+        properties.append(prop_data)
+    page = properties[:args['limit']]
+    last_key = sort_key(page[-1]) if page else None
+    return page, total, len(properties) > args['limit'], last_key
+
+@properties_bp.route('/api/properties', methods=['GET'])
+@response_cache.cached(tags=['properties:list'], stale_ttl=60)
+def get_properties():
+    try:
+        args = _list_args()
+
+        def build():
+            if catalog.enabled:
+                properties, total, has_more, last_key = _list_from_catalog(args)
+            else:
+                properties, total, has_more, last_key = _list_from_firestore(args)
+
+            result = {
+                "properties": [args['fields'].project(p) for p in properties],
+                "page": args['page'],
+                "next_cursor": encode_cursor(args['sort'], last_key) if has_more and last_key else None
+            }
+            if args['include_total']:
+                limit = args['limit']
+                result['total'] = total
+                result['total_pages'] = (total + limit - 1) // limit
+            return result
+
+        try:
+            # Tagged by a hash of the page itself, so every process and restart agrees on it
+            return conditional_json(build, cache_control=LIST_CACHE_CONTROL)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _facets_from_firestore(args, price_buckets):
+    """
+    Counts facets like the catalog does, over a throwaway columnar store of
+    the documents matching every filter a facet does not ignore.
+    """
+    unfaceted = dict(args, types=[], bedrooms=None, min_price=None, max_price=None)
+    fields = ['title', 'location', 'type', 'bedrooms', 'price', 'priceValue', 'amenities', 'coordinates']
+    query = _filtered_query(unfaceted).select(_query_fields(fields, args))
+    store = ColumnarStore(price_value, created_timestamp)
+    store.rebuild({p['id']: p for p in _stream_matching(query, args)})
+    return store.facets(min_price=args['min_price'], max_price=args['max_price'], bedrooms=args['bedrooms'],
+                        prop_types=args['types'], price_buckets=price_buckets)
+
+@properties_bp.route('/api/properties/facets', methods=['GET'])
+@response_cache.cached(tags=['properties:list'], stale_ttl=60)
+def get_property_facets():
+    """Filter counts for the listing UI; takes the same parameters as /api/properties."""
+    try:
+        args = _list_args()
+        price_buckets = min(max(request.args.get('price_buckets', 10, type=int), 1), 50)
+        try:
+            near, bbox = _geo_args(args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if catalog.enabled:
+            facets = catalog.facets(
+                min_price=args['min_price'],
+                max_price=args['max_price'],
+                bedrooms=args['bedrooms'],
+                prop_types=args['types'],
+                statuses=args['statuses'],
+                amenities=args['amenities'],
+                search=args['search'],
+                bbox=bbox,
+                near=near,
+                price_buckets=price_buckets
+            )
+        else:
+            facets = _facets_from_firestore(args, price_buckets)
+        return jsonify(facets), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _clusters_from_firestore(bbox, zoom):
+    """Builds a throwaway cluster index from the listings in the box."""
+    index = ClusterIndex()
+    ids, lats, lngs, prices = [], [], [], []
+    for doc in db.collection('properties').select(['coordinates', 'price', 'priceValue']).stream():
+        prop_data = doc.to_dict()
+        coordinates = prop_data.get('coordinates')
+        try:
+            lat, lng = float(coordinates['lat']), float(coordinates['lng'])
+        except (TypeError, KeyError, ValueError):
+            continue
+        if bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]:
+            ids.append(doc.id)
+            lats.append(lat)
+            lngs.append(lng)
+            prices.append(price_value(prop_data))
+    index.build(ids, lats, lngs, prices)
+    aggregates, level = index.clusters(*bbox, zoom)
+    # Rows are the document ids themselves
+    return cluster_markers(aggregates, str), level
+
+@properties_bp.route('/api/properties/clusters', methods=['GET'])
+@response_cache.cached(tags=['properties:list'], stale_ttl=60)
+def get_property_clusters():
+    """Map markers for bbox=south,west,north,east at a zoom level, clustered server side."""
+    try:
+        zoom = request.args.get('zoom', type=int)
+        if zoom is None or not 0 <= zoom <= 22:
+            return jsonify({"error": "zoom must be between 0 and 22"}), 400
+        if not request.args.get('bbox'):
+            return jsonify({"error": "bbox is required"}), 400
+        try:
+            _, bbox = _geo_args({'near': None, 'bbox': request.args.get('bbox'), 'sort': None})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if catalog.enabled:
+            clusters, level = catalog.clusters(bbox, zoom)
+        else:
+            clusters, level = _clusters_from_firestore(bbox, zoom)
+        return jsonify({"clusters": clusters, "zoom": zoom, "level": level}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@properties_bp.route('/api/properties/batch', methods=['GET'])
+def get_properties_batch():
+    """Fetches up to MAX_BATCH_IDS listings by id, in the requested order."""
+    try:
+        ids = _list_values('ids')
+        if not ids:
+            return jsonify({"error": "ids is required"}), 400
+        if len(ids) > MAX_BATCH_IDS:
+            return jsonify({"error": f"At most {MAX_BATCH_IDS} ids per request"}), 400
+        fields = parse_fields(request.args.get('fields'))
+
+        properties, missing = fetch_properties(db, ids, fields.select_paths())
+        return jsonify({"properties": [fields.project(p) for p in properties], "missing": missing}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@properties_bp.route('/api/admin/properties/cache', methods=['GET'])
+@verify_admin
+def get_catalog_stats():
+    return jsonify(catalog.stats()), 200
+
+@properties_bp.route('/api/admin/properties/percolator', methods=['GET'])
+@verify_admin
+def get_percolator_stats():
+    return jsonify(percolator.stats()), 200
+
+def _imported(written):
+    for property_id, data in written:
+        catalog.upsert(property_id, data)
+    response_cache.invalidate('properties:list')
+
+@properties_bp.route('/api/admin/properties/import', methods=['POST'])
+@verify_admin
+def import_properties():
+    """
+    Bulk-creates listings from a CSV or NDJSON upload (multipart field
+    "file", or the raw request body). ?dry_run=true only validates.
+    Saved-search match notifications are not sent for imported listings.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(content_type=request.mimetype)
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+
+        importer = PropertyImporter(db, validate_property_data,
+                                    dry_run=request.args.get('dry_run') == 'true',
+                                    on_committed=_imported, user_id=request.user.get('uid', 'system'))
+        report = importer.run(read_rows(stream, fmt))
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@properties_bp.route('/api/admin/properties/export', methods=['GET'])
+@verify_admin
+def export_properties():
+    """
+    Streams every listing matching the list endpoint's filters as NDJSON
+    (full documents), CSV or Parquet, with history counts and views.
+    ?history=false skips the per-listing history count.
+    """
+    try:
+        args = _list_args()
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        if fmt == 'parquet' and not parquet_available():
+            return jsonify({"error": "Parquet export requires pyarrow"}), 501
+        try:
+            _geo_args(args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        properties = _stream_matching(_filtered_query(args), args)
+        if request.args.get('history', 'true') != 'false':
+            properties = with_history_counts(db.collection('properties'), properties)
+        properties = primed(properties)
+
+        filename = f"properties-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+        if fmt == 'csv':
+            return stream_response(csv_chunks(properties), 'text/csv', filename), 200
+        if fmt == 'parquet':
+            return stream_response(parquet_chunks(properties), 'application/vnd.apache.parquet', filename), 200
+        return stream_json(properties, ndjson=True, filename=filename), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -118,8 +527,11 @@ def create_property():
             return jsonify({"error": error_msg}), 400
             
         data['createdAt'] = firestore.SERVER_TIMESTAMP
+        data['priceValue'] = parse_price(data.get('price'))
         
         property_ref = db.collection('properties').add(data)[1]
+        catalog.upsert(property_ref.id, data)
+        response_cache.invalidate('properties:list')
         
         # Log creation
         log_property_history(property_ref.id, "Property Created", "Initial creation")
@@ -135,14 +547,22 @@ def create_property():
         return jsonify({"error": str(e)}), 500
 
 @properties_bp.route('/api/properties/<property_id>', methods=['GET'])
+@response_cache.cached(tags=lambda property_id: [f'property:{property_id}'])
 def get_property(property_id):
     try:
+        fields = parse_fields(request.args.get('fields'))
         doc_ref = db.collection('properties').document(property_id)
-        doc = doc_ref.get()
+        doc = doc_ref.get(field_paths=fields.select_paths())
         if doc.exists:
-            prop_data = doc.to_dict()
-            prop_data['id'] = doc.id
-            return jsonify(prop_data), 200
+            def build():
+                prop_data = doc.to_dict()
+                prop_data['id'] = doc.id
+                return fields.project(prop_data)
+
+            # update_time changes on every write to the document
+            updated = doc.update_time if isinstance(doc.update_time, datetime) else None
+            tag = etag_for(doc.id, updated.isoformat(), request.query_string) if updated else None
+            return conditional_json(build, tag=tag, cache_control=DETAIL_CACHE_CONTROL, last_modified=updated)
         else:
             return jsonify({"error": "Property not found"}), 404
     except Exception as e:
@@ -153,6 +573,8 @@ def get_property(property_id):
 def delete_property(property_id):
     try:
         db.collection('properties').document(property_id).delete()
+        catalog.remove(property_id)
+        response_cache.invalidate('properties:list', f'property:{property_id}')
         return jsonify({"message": "Property deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -176,12 +598,7 @@ def get_property_history(property_id):
 def log_property_history(property_id, action, details, user_id="system"):
     try:
         history_ref = db.collection('properties').document(property_id).collection('history')
-        history_ref.add({
-            "action": action,
-            "details": details,
-            "timestamp": firestore.SERVER_TIMESTAMP,
-            "userId": user_id
-        })
+        history_ref.add(_history_entry(action, details, user_id))
     except Exception as e:
         print(f"Error logging history: {e}")
 
@@ -190,131 +607,174 @@ def log_property_history(property_id, action, details, user_id="system"):
 def update_property(property_id):
     try:
         data = request.get_json()
-        print(f"DEBUG: update_property data: {data}")
-        
+
         # Validate data (using same validator as create)
         is_valid, error_msg = validate_property_data(data, partial=True)
-        print(f"DEBUG: validation result: {is_valid}, {error_msg}")
         if not is_valid:
              return jsonify({"error": error_msg}), 400
 
-        doc_ref = db.collection('properties').document(property_id)
-        old_doc = doc_ref.get()
-        
-        if old_doc.exists:
-            old_data = old_doc.to_dict()
-            
-            # Price change logic
-            old_price = parse_price(old_data.get('price'))
-            new_price = parse_price(data.get('price'))
-            
-            if 'price' in data and old_price != new_price:
-                log_property_history(property_id, "Price Change", f"Price changed from {old_data.get('price')} to {data.get('price')}")
-                
-                # Check for price drop notification
-                if new_price < old_price:
-                    try:
-                        check_price_drop(property_id, data)
-                    except Exception as e:
-                        print(f"Error checking price drop: {e}")
-
-            # Check for other changes (simplified)
-            changes = []
-            if 'title' in data and old_data.get('title') != data.get('title'):
-                changes.append("Title")
-            if 'type' in data and old_data.get('type') != data.get('type'):
-                changes.append("Type")
-            if 'status' in data and old_data.get('status') != data.get('status'): # If we had status
-                changes.append("Status")
-                
-            if changes:
-                log_property_history(property_id, "Property Updated", f"Updated fields: {', '.join(changes)}")
-
-        db.collection('properties').document(property_id).update(data)
-        return jsonify({"message": "Property updated successfully"}), 200
+        if 'price' in data:
+            data['priceValue'] = parse_price(data['price'])
+
+        result = _update_in_transaction(property_id, data, request.user.get('uid', 'system'))
+        if result is None:
+            return jsonify({"error": "Property not found"}), 404
+        old_data, diff, price_change_id = result
+
+        catalog.patch(property_id, data)
+        response_cache.invalidate('properties:list', f'property:{property_id}')
+        _dispatch_update_events(property_id, old_data, data, diff, price_change_id)
+        return jsonify({"message": "Property updated successfully",
+                        "changes": [change['field'] for change in diff]}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def parse_price(price_str):
-    try:
-        return int(str(price_str).replace('₹', '').replace(',', '').strip())
-    except:
-        return 0
+def _history_entry(action, details, user_id, changes=None):
+    entry = {
+        "action": action,
+        "details": details,
+        "timestamp": firestore.SERVER_TIMESTAMP,
+        "userId": user_id
+    }
+    if changes is not None:
+        entry["changes"] = changes
+    return entry
 
-def check_new_listing_matches(property_data, property_id):
-    # 1. Check Property Requests (Global collection)
-    requests_ref = db.collection('property_requests').where('status', '==', 'active').stream()
-    
-    prop_price = parse_price(property_data.get('price'))
-    prop_bedrooms = int(property_data.get('bedrooms', 0))
-    prop_type = property_data.get('type')
-    prop_location = property_data.get('location', '').lower()
-
-    for req in requests_ref:
-        req_data = req.to_dict()
-        criteria = req_data.get('criteria', {})
-        user_id = req_data.get('user_id')
-        
-        # Check criteria
-        min_price = int(criteria.get('minPrice', 0))
-        max_price = int(criteria.get('maxPrice', 1000000000))
-        req_bedrooms = int(criteria.get('bedrooms', 0))
-        req_type = criteria.get('type')
-        req_location = criteria.get('location', '').lower()
-
-        if min_price <= prop_price <= max_price:
-            if prop_bedrooms >= req_bedrooms:
-                if not req_type or req_type == 'any' or req_type == prop_type:
-                    if not req_location or req_location in prop_location:
-                        # Match found!
-                        try:
-                            user = auth.get_user(user_id)
-                            if user.email:
-                                notify_saved_search_match(user.email, "Property Request Match", property_data.get('title'), property_id)
-                        except:
-                            pass
-
-    # 2. Check Saved Searches (Per User)
-    # Note: Iterating all users is inefficient. In production, use a dedicated 'saved_searches' collection group query.
-    # For MVP, we'll skip complex user iteration or assume we have a way to index searches.
-    # To keep it simple and performant enough for a demo, we'll just check the 'property_requests' as that's the explicit feature requested.
-    pass
-
-def check_price_drop(property_id, new_data):
+def _update_in_transaction(property_id, data, user_id):
+    """
+    Reads the listing once inside a transaction, diffs it against the update
+    and commits the update together with its history entries. Returns
+    (old_data, diff, price_change_id), where price_change_id is the id of
+    the price history entry (None if the price did not change), or None when
+    the listing does not exist.
+    """
+    doc_ref = db.collection('properties').document(property_id)
+    history_ref = doc_ref.collection('history')
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        old_data = snapshot.to_dict()
+        diff = diff_fields(old_data, data)
+
+        transaction.update(doc_ref, data)
+        prices = price_change(old_data, data)
+        price_change_id = None
+        if prices:
+            price_entry = history_ref.document()
+            price_change_id = price_entry.id
+            transaction.set(price_entry, _history_entry(
+                "Price Change", f"Price changed from {old_data.get('price')} to {data.get('price')}", user_id,
+                [c for c in diff if c['field'] == 'price']))
+        other = [c for c in diff if c['field'] != 'price']
+        if other:
+            labels = ', '.join(field_label(c['field']) for c in other)
+            transaction.set(history_ref.document(), _history_entry(
+                "Property Updated", f"Updated fields: {labels}", user_id, other))
+        return old_data, diff, price_change_id
+
+    return run(db.transaction())
+
+def _dispatch_update_events(property_id, old_data, changes, diff, price_change_id=None):
+    """Price-drop and match notifications for a committed update, from the data already read."""
+    new_data = {**old_data, **changes}
+    prices = price_change(old_data, changes)
+    if prices and prices[1] < prices[0]:
+        try:
+            check_price_drop(property_id, new_data, old_data, price_change_id)
+        except Exception as e:
+            print(f"Error checking price drop: {e}")
+    if touches_match_fields(diff):
+        try:
+            check_new_listing_matches(new_data, property_id, previous=old_data)
+        except Exception as e:
+            print(f"Error checking matches: {e}")
+
+def match_inventory(query, limit=REQUEST_MATCH_LIMIT):
+    """
+    Newest current listings satisfying a standing query (e.g. a new property
+    request), from the catalog's indexes or, with the catalog off, from a
+    bounded Firestore query with the type and price filters pushed down.
+    """
+    if catalog.enabled:
+        return catalog.match_query(query, limit)
+
+    fs_query = db.collection('properties')
+    if query.type:
+        fs_query = fs_query.where('type', '==', query.type)
+    if query.min_price:
+        fs_query = fs_query.where('priceValue', '>=', query.min_price)
+    if math.isfinite(query.max_price):
+        fs_query = fs_query.where('priceValue', '<=', query.max_price)
+    matches = []
+    for doc in fs_query.limit(REQUEST_MATCH_SCAN).stream():
+        prop_data = doc.to_dict()
+        prop_data['id'] = doc.id
+        if prop_data.get('status') != 'sold' and query.matches(prop_data):
+            matches.append(prop_data)
+    matches.sort(key=created_timestamp, reverse=True)
+    return matches[:limit]
+
+def match_summary(prop_data):
+    """What a request keeps of each matching listing."""
+    return {
+        "id": prop_data.get('id'),
+        "title": prop_data.get('title'),
+        "price": prop_data.get('price'),
+        "location": prop_data.get('location'),
+        "type": prop_data.get('type'),
+        "image": property_summary(prop_data)['property_image']
+    }
+
+def check_new_listing_matches(property_data, property_id, previous=None):
+    """
+    Notifies owners of active property requests and saved searches the
+    listing matches, using the in-memory percolator. With previous (the
+    listing before an update), queries it already matched are skipped so an
+    edit does not notify them again.
+    """
+    percolator.ensure_loaded(db)
+    matched = percolator.match(property_data)
+    if previous is not None:
+        already = {q.id for q in percolator.match(previous)}
+        matched = [q for q in matched if q.id not in already]
+    if not matched:
+        return
+
+    emails = dict(user_emails({q.owner for q in matched if q.owner}))
+    for query in matched:
+        email = emails.get(query.owner)
+        if not email:
+            continue
+        try:
+            notify_saved_search_match(email, query.name, property_data.get('title'), property_id)
+        except Exception as e:
+            print(f"Error notifying {query.owner} of match for {query.id}: {e}")
+
+def check_price_drop(property_id, new_data, old_data, change_id):
+    """
+    Notifies users who favorited the listing when its price went down.
+    change_id identifies the price change (its history entry), so a retried
+    update is not notified twice but a later drop to the same price is.
+    """
     new_price_str = new_data.get('price')
     if not new_price_str:
         return
 
-    # Get old data
-    old_doc = db.collection('properties').document(property_id).get()
-    if not old_doc.exists:
-        return
-    
-    old_data = old_doc.to_dict()
     old_price_str = old_data.get('price')
     
     if not old_price_str:
         return
 
-    new_price = parse_price(new_price_str)
-    old_price = parse_price(old_price_str)
+    new_price = price_value(new_data)
+    old_price = price_value(old_data)
 
     if new_price < old_price:
-        # Price Dropped! Find users who favorited this property.
-        # We need to query the 'users' collection, but favorites are subcollections.
-        # Firestore Collection Group Query is best here.
-        favorites_query = db.collection_group('favorites').stream()
-        
-        for fav in favorites_query:
-            if fav.id == property_id:
-                # This user favorited this property
-                # fav.reference.parent.parent is the user document
-                user_ref = fav.reference.parent.parent
-                user_id = user_ref.id
-                
-                try:
-                    user = auth.get_user(user_id)
-                    if user.email:
-                        notify_price_drop(user.email, old_data.get('title'), old_price_str, new_price_str, property_id)
-                except:
-                    pass
+        # Price Dropped! Notify the users in the listing's reverse favorites index.
+        for user_id, email in user_emails(favorited_by(db, property_id)):
+            try:
+                notify_price_drop(email, old_data.get('title'), old_price_str, new_price_str, property_id, change_id)
+            except Exception as e:
+                print(f"Error notifying {user_id} of price drop: {e}")
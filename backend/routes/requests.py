@@ -3,6 +3,10 @@ from firebase_config import initialize_firebase
 from firebase_admin import firestore, auth
 from datetime import datetime
 from routes.auth import verify_token, verify_admin
+from utils.streaming import document_items, stream_json
+from utils.percolator import StandingQuery, percolator
+from utils.response_cache import response_cache
+from routes.properties import match_inventory, match_summary
 
 requests_bp = Blueprint('requests', __name__)
 db, _ = initialize_firebase()
@@ -24,14 +28,27 @@ def create_request():
             'status': 'active',
             'created_at': firestore.SERVER_TIMESTAMP
         }
-        
-        db.collection('property_requests').add(request_data)
+
+        # Run the criteria against current listings before storing the request
+        request_ref = db.collection('property_requests').document()
+        query = StandingQuery.from_request(request_ref.id, request_data)
+        try:
+            matches = [match_summary(p) for p in match_inventory(query)]
+        except Exception as e:
+            print(f"Error matching request against listings: {e}")
+            matches = []
+        request_data['matches'] = matches
+        request_data['matched_at'] = firestore.SERVER_TIMESTAMP
+
+        request_ref.set(request_data)
+        percolator.add(query)
+        response_cache.invalidate('dashboard')
 
         # Send Notifications
         try:
             from utils.email_service import notify_admin_new_lead, send_request_auto_reply
             
-            notify_admin_new_lead('Property Request', request_data)
+            notify_admin_new_lead('Property Request', {**request_data, 'matches': len(matches)})
             
             # Fetch user email for auto-reply
             try:
@@ -44,7 +61,8 @@ def create_request():
         except Exception as e:
             print(f"Failed to send email notifications: {e}")
         
-        return jsonify({"message": "Property request submitted successfully"}), 201
+        return jsonify({"message": "Property request submitted successfully",
+                        "id": request_ref.id, "matches": matches}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -74,13 +92,6 @@ def get_all_requests():
         docs = db.collection('property_requests')\
             .order_by('created_at', direction=firestore.Query.DESCENDING)\
             .stream()
-            
-        requests = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            requests.append(data)
-            
-        return jsonify(requests), 200
+        return stream_json(document_items(docs)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
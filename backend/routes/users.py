@@ -3,6 +3,11 @@ from firebase_config import initialize_firebase
 from firebase_admin import auth, firestore
 from datetime import datetime
 from .auth import verify_token, verify_admin
+from utils.property_batch import fetch_properties, fetch_properties_by_id, property_summary
+from utils.streaming import document_items, stream_json
+from utils.favorites import delete_all_favorites, delete_favorite, save_favorite
+from utils.percolator import StandingQuery, percolator, saved_search_query_id
+from utils.response_cache import response_cache
 
 users_bp = Blueprint('users', __name__)
 db, _ = initialize_firebase()
@@ -53,6 +58,8 @@ def sync_user():
             }
             
             user_ref.set(user_data_to_save)
+            # Client counts on the public stats and admin dashboard
+            response_cache.invalidate('users', 'dashboard')
         else:
             # Update last login and phone if provided (and valid)
             update_data = {'lastLogin': now}
@@ -112,10 +119,8 @@ def add_favorite(user_id):
         if not prop_ref.get().exists:
             return jsonify({"error": "Property not found"}), 404
 
-        # Add to favorites subcollection
-        db.collection('users').document(user_id).collection('favorites').document(property_id).set({
-            'addedAt': str(datetime.now())
-        })
+        # Add to favorites subcollection and the property's reverse index
+        save_favorite(db, user_id, property_id, str(datetime.now()))
         
         return jsonify({"message": "Added to favorites"}), 201
     except Exception as e:
@@ -127,7 +132,7 @@ def remove_favorite(user_id, property_id):
     if not verify_user_access(user_id):
         return jsonify({"error": "Unauthorized access to this user data"}), 403
     try:
-        db.collection('users').document(user_id).collection('favorites').document(property_id).delete()
+        delete_favorite(db, user_id, property_id)
         return jsonify({"message": "Removed from favorites"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -146,15 +151,8 @@ def get_favorites(user_id):
         if not favorite_ids:
             return jsonify([]), 200
 
-        # Fetch actual property details for these IDs
-        # Note: In a real app, you might want to batch get or store minimal details in favorite doc
-        properties = []
-        for pid in favorite_ids:
-            prop_doc = db.collection('properties').document(pid).get()
-            if prop_doc.exists:
-                p_data = prop_doc.to_dict()
-                p_data['id'] = prop_doc.id
-                properties.append(p_data)
+        # Fetch actual property details for these IDs in one round trip
+        properties, _ = fetch_properties(db, favorite_ids)
                 
         return jsonify(properties), 200
     except Exception as e:
@@ -175,7 +173,8 @@ def save_search(user_id):
         
         # Add to savedSearches subcollection
         doc_ref = db.collection('users').document(user_id).collection('savedSearches').add(data)
-        
+        percolator.add(StandingQuery.from_saved_search(user_id, doc_ref[1].id, data))
+
         return jsonify({"id": doc_ref[1].id, "message": "Search saved successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -206,6 +205,7 @@ def delete_saved_search(user_id, search_id):
         return jsonify({"error": "Unauthorized access to this user data"}), 403
     try:
         db.collection('users').document(user_id).collection('savedSearches').document(search_id).delete()
+        percolator.remove(saved_search_query_id(user_id, search_id))
         return jsonify({"message": "Saved search deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -244,17 +244,9 @@ def get_recently_viewed(user_id):
             .order_by('viewedAt', direction=firestore.Query.DESCENDING)\
             .limit(4).stream()
         
-        viewed_props = []
-        for doc in docs:
-            data = doc.to_dict()
-            pid = data.get('propertyId')
-            if pid:
-                # Fetch property details
-                p_doc = db.collection('properties').document(pid).get()
-                if p_doc.exists:
-                    p_data = p_doc.to_dict()
-                    p_data['id'] = p_doc.id
-                    viewed_props.append(p_data)
+        property_ids = [doc.to_dict().get('propertyId') for doc in docs]
+        # Fetch property details in one round trip
+        viewed_props, _ = fetch_properties(db, property_ids)
             
         return jsonify(viewed_props), 200
     except Exception as e:
@@ -307,16 +299,15 @@ def get_user_inquiries(user_id):
         for doc in docs:
             data = doc.to_dict()
             data['id'] = doc.id
-            
-            # Fetch property details
-            if data.get('property_id'):
-                p_doc = db.collection('properties').document(data['property_id']).get()
-                if p_doc.exists:
-                    p_data = p_doc.to_dict()
-                    data['property_title'] = p_data.get('title', 'Unknown Property')
-                    data['property_image'] = p_data.get('images', [])[0] if p_data.get('images') else p_data.get('imageUrl')
-            
             inquiries.append(data)
+
+        # Fetch property details for all inquiries in one round trip
+        properties = fetch_properties_by_id(db, [i.get('property_id') for i in inquiries],
+                                            fields=['title', 'images', 'imageUrl'])
+        for data in inquiries:
+            p_data = properties.get(data.get('property_id'))
+            if p_data:
+                data.update(property_summary(p_data))
             
         return jsonify(inquiries), 200
     except Exception as e:
@@ -328,8 +319,10 @@ def delete_user(user_id):
     if not verify_user_access(user_id):
         return jsonify({"error": "Unauthorized access to this user data"}), 403
     try:
-        # 1. Delete user document from Firestore
+        # 1. Delete user document from Firestore, with the favorites pointing back at it
+        delete_all_favorites(db, user_id)
         db.collection('users').document(user_id).delete()
+        response_cache.invalidate('users', 'dashboard')
         
         # 2. Delete user from Firebase Auth
         # Note: This is usually done from client side using deleteUser(user), 
@@ -349,22 +342,9 @@ def delete_user(user_id):
 @verify_admin
 def get_all_users():
     try:
-        # In a real app with many users, use pagination tokens.
-        # For this scale, fetching all is fine.
-        users_ref = db.collection('users')
-        docs = users_ref.stream()
-        
-        users = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            # Ensure critical fields exist
-            if 'email' not in data:
-                # Try to fetch from Auth if missing in Firestore (optional, slow)
-                pass
-            users.append(data)
-            
-        return jsonify(users), 200
+        # Written out as documents arrive so memory stays flat however many users there are
+        docs = db.collection('users').stream()
+        return stream_json(document_items(docs)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -435,6 +415,7 @@ def update_user_role(user_id):
             
         # Update Firestore
         db.collection('users').document(user_id).update({'role': role})
+        response_cache.invalidate('users')
         
         # Update Custom Claims
         auth.set_custom_user_claims(user_id, {'role': role})
@@ -4,6 +4,8 @@ import os
 
 # Add backend directory to path so we can import app
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# No email workers on the real queue file; tests use the email_outbox fixture
+os.environ['EMAIL_QUEUE_ENABLED'] = 'false'
 
 from app import app as flask_app
 
@@ -50,3 +52,23 @@ def mock_admin_auth(mocker):
         'role': 'admin'
     }
     return mock
+
+@pytest.fixture(autouse=True)
+def no_response_cache():
+    """Tests patch data sources between requests; serve every request fresh"""
+    from utils.response_cache import response_cache
+    response_cache.enabled = False
+    response_cache.clear()
+    yield response_cache
+    response_cache.enabled = False
+    response_cache.clear()
+
+@pytest.fixture(autouse=True)
+def email_outbox(tmp_path, mocker):
+    """Queued emails go to a per-test database and are only sent when a test runs the queue"""
+    from utils.email_queue import EmailQueue
+    queue = EmailQueue(mocker.MagicMock(return_value=True), path=str(tmp_path / 'email_queue.sqlite3'), workers=0)
+    mocker.patch('utils.email_service.email_queue', queue)
+    mocker.patch('utils.email_service.QUEUE_ENABLED', True)
+    yield queue
+    queue.stop()
@@ -0,0 +1,43 @@
+import json
+from unittest.mock import MagicMock, patch
+
+
+def snapshot(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    return doc
+
+
+def test_admin_appointments_streamed_with_property_summaries(client, mock_admin_auth):
+    """Admin appointment listing streams, adding property details per chunk"""
+    docs = [snapshot('a1', {"property_id": "p1", "date": "2025-01-01"}),
+            snapshot('a2', {"property_id": "p2", "date": "2025-01-02"})]
+    properties = {"p1": {"title": "Garden Villa", "images": ["villa.jpg"]}}
+
+    with patch('routes.appointments.db') as mock_db, \
+            patch('routes.appointments.fetch_properties_by_id', return_value=properties) as fetch:
+        mock_db.collection.return_value.order_by.return_value.stream.side_effect = lambda: iter(docs)
+        headers = {'Authorization': 'Bearer admin_token'}
+
+        response = client.get('/api/admin/appointments', headers=headers)
+        assert response.is_streamed
+        body = response.get_json()
+        assert [a["id"] for a in body] == ['a1', 'a2']
+        assert body[0]["property_title"] == "Garden Villa"
+        assert "property_title" not in body[1]
+        assert fetch.call_args[0][1] == ['p1', 'p2']
+
+        response = client.get('/api/admin/appointments?format=ndjson', headers=headers)
+        assert response.mimetype == 'application/x-ndjson'
+        assert [json.loads(line)["id"] for line in response.get_data(as_text=True).splitlines()] == ['a1', 'a2']
+
+
+def test_user_appointments_returned_as_one_document(client, mock_auth):
+    with patch('routes.appointments.db') as mock_db, \
+            patch('routes.appointments.fetch_properties_by_id', return_value={}):
+        mock_db.collection.return_value.where.return_value.order_by.return_value.stream.return_value = [
+            snapshot('a1', {"property_id": "p1", "user_id": "test_user_id"})]
+        response = client.get('/api/users/test_user_id/appointments', headers={'Authorization': 'Bearer token'})
+
+    assert response.get_json() == [{"id": "a1", "property_id": "p1", "user_id": "test_user_id"}]
@@ -39,3 +39,26 @@ def test_admin_access_granted(client, mock_admin_auth):
         response = client.get('/api/admin/users', headers=headers)
         
         assert response.status_code == 200
+
+def test_admin_users_streamed_as_json_or_ndjson(client, mock_admin_auth):
+    """Admin user listing streams a JSON array by default and NDJSON on request"""
+    def snapshot(doc_id, email):
+        doc = MagicMock()
+        doc.id = doc_id
+        doc.to_dict.return_value = {"email": email}
+        return doc
+
+    with patch('routes.users.db') as mock_db:
+        mock_db.collection.return_value.stream.side_effect = lambda: iter(
+            [snapshot('u1', 'a@example.com'), snapshot('u2', 'b@example.com')])
+        headers = {'Authorization': 'Bearer admin_token'}
+
+        response = client.get('/api/admin/users', headers=headers)
+        assert response.is_streamed
+        assert response.get_json() == [{"email": "a@example.com", "id": "u1"},
+                                       {"email": "b@example.com", "id": "u2"}]
+
+        response = client.get('/api/admin/users?format=ndjson', headers=headers)
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ['u1', 'u2']
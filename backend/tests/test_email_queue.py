@@ -0,0 +1,141 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from utils.email_queue import DEAD, PENDING, SENT, EmailQueue
+
+
+def make_queue(tmp_path, send, **kwargs):
+    kwargs.setdefault('workers', 0)
+    return EmailQueue(send, path=str(tmp_path / 'queue.sqlite3'), **kwargs)
+
+
+def test_queued_email_is_sent_once_per_dedupe_key(tmp_path):
+    send = MagicMock(return_value=True)
+    queue = make_queue(tmp_path, send)
+
+    assert queue.enqueue('a@example.com', 'Price Drop', 'body', dedupe_key='price-drop:a:p1:100')
+    assert not queue.enqueue('a@example.com', 'Price Drop', 'body', dedupe_key='price-drop:a:p1:100')
+    assert queue.enqueue('b@example.com', 'Hello', 'body')
+    send.assert_not_called()
+
+    assert queue.run_pending() == 2
+    assert sorted(c[0][0] for c in send.call_args_list) == ['a@example.com', 'b@example.com']
+    stats = queue.stats()
+    assert stats['queued'][SENT] == 2
+    assert stats['duplicates'] == 1
+
+
+def test_failures_back_off_then_dead_letter(tmp_path):
+    send = MagicMock(side_effect=[False, RuntimeError('provider down'), False, True])
+    queue = make_queue(tmp_path, send, max_attempts=3, base_delay=60)
+    queue.enqueue('a@example.com', 'Hello', 'body')
+
+    assert queue.run_pending() == 1
+    # The retry is scheduled in the future, so nothing is due yet
+    assert queue.run_pending() == 0
+    assert queue.stats()['queued'][PENDING] == 1
+
+    for hours in (1, 2):
+        with patch('utils.email_queue.time.time', return_value=time.time() + hours * 3600):
+            assert queue.run_pending() == 1
+    dead = queue.dead_letters()
+    assert [(d['to_email'], d['attempts'], d['last_error']) for d in dead] == [('a@example.com', 3, 'send failed')]
+
+    assert queue.retry_dead([dead[0]['id']]) == 1
+    assert queue.run_pending() == 1
+    assert queue.stats()['queued'] == {PENDING: 0, 'sending': 0, SENT: 1, DEAD: 0}
+
+
+def test_purge_releases_dedupe_keys_of_sent_and_dead_messages(tmp_path):
+    queue = make_queue(tmp_path, MagicMock(side_effect=[True, False]), max_attempts=1)
+    queue.enqueue('a@example.com', 'Hello', 'body', dedupe_key='sent')
+    queue.enqueue('b@example.com', 'Hello', 'body', dedupe_key='dead')
+    assert queue.run_pending() == 2
+    assert queue.stats()['queued'][DEAD] == 1
+
+    assert queue.purge() == 0
+    assert not queue.enqueue('b@example.com', 'Hello', 'body', dedupe_key='dead')
+    with patch('utils.email_queue.time.time', return_value=time.time() + queue.retention_seconds + 1):
+        assert queue.purge() == 2
+    assert queue.enqueue('a@example.com', 'Hello', 'body', dedupe_key='sent')
+    assert queue.enqueue('b@example.com', 'Hello', 'body', dedupe_key='dead')
+
+
+def test_messages_survive_a_restart_and_expired_leases_are_reclaimed(tmp_path):
+    crashed = make_queue(tmp_path, MagicMock(), lease_seconds=30)
+    crashed.enqueue('a@example.com', 'Hello', 'body')
+    crashed.enqueue('b@example.com', 'Hello', 'body')
+    # Claimed but never settled, as when the process dies mid-send
+    assert [row['to_email'] for row in crashed._claim()] == ['a@example.com']
+
+    send = MagicMock(return_value=True)
+    restarted = make_queue(tmp_path, send, lease_seconds=30)
+    assert restarted.run_pending() == 1
+    with patch('utils.email_queue.time.time', return_value=time.time() + 60):
+        assert restarted.run_pending() == 1
+    assert sorted(c[0][0] for c in send.call_args_list) == ['a@example.com', 'b@example.com']
+
+
+def test_worker_pool_delivers_in_background(tmp_path):
+    delivered = threading.Event()
+    sent = []
+
+    def send(to_email, subject, body):
+        sent.append(to_email)
+        if len(sent) == 20:
+            delivered.set()
+        return True
+
+    queue = make_queue(tmp_path, send, workers=3)
+    try:
+        for i in range(20):
+            queue.enqueue(f'user{i}@example.com', 'Hello', 'body')
+        assert delivered.wait(10)
+    finally:
+        queue.stop()
+    assert sorted(sent) == sorted(f'user{i}@example.com' for i in range(20))
+
+
+def test_inquiry_handler_only_enqueues(client, email_outbox):
+    with patch('routes.inquiries.db'), patch('utils.email_service.send_email') as send_email:
+        response = client.post('/api/inquiries', json={'name': 'Asha', 'email': 'asha@example.com', 'message': 'Hi'})
+
+    assert response.status_code == 201
+    send_email.assert_not_called()
+    assert email_outbox.stats()['queued'][PENDING] == 2
+    email_outbox.run_pending()
+    assert sorted(c[0][0] for c in email_outbox.send.call_args_list)[0] == 'asha@example.com'
+
+
+def test_app_startup_resumes_messages_left_by_an_earlier_process(tmp_path):
+    from flask import Flask
+    from utils import email_service
+
+    earlier = make_queue(tmp_path, MagicMock())
+    earlier.enqueue('a@example.com', 'Hello', 'body')
+    earlier.enqueue('b@example.com', 'Hello', 'body')
+    # Claimed but never settled, with a lease that has since expired
+    assert len(earlier._claim()) == 1
+    earlier._connection().execute("UPDATE email_jobs SET lease_until = 0")
+
+    delivered = threading.Event()
+    sent = []
+
+    def send(to_email, subject, body):
+        sent.append(to_email)
+        if len(sent) == 2:
+            delivered.set()
+        return True
+
+    queue = make_queue(tmp_path, send, workers=2)
+    with patch.object(email_service, 'email_queue', queue), patch.object(email_service, 'QUEUE_ENABLED', True):
+        try:
+            app = Flask(__name__)
+            email_service.init_email_queue(app)
+            email_service.init_email_queue(app)
+            assert delivered.wait(10)
+            assert len(queue._threads) == 2
+        finally:
+            queue.stop()
+    assert sorted(sent) == ['a@example.com', 'b@example.com']
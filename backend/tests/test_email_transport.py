@@ -0,0 +1,57 @@
+import time
+
+from benchmarks.stub_resend import StubResend
+from utils.email_service import RateLimiter, ResendTransport
+
+
+def messages(n):
+    return [(f'user{i}@example.com', 'Hello', 'Line one\nLine two') for i in range(n)]
+
+
+def test_batches_of_up_to_100_over_one_pooled_connection():
+    with StubResend() as stub:
+        transport = ResendTransport('key', base_url=stub.url, rate_limit=0)
+        assert transport.send_batch(messages(250)) == [None] * 250
+        assert transport.send('solo@example.com', 'Hello', 'body')
+
+    assert [(path, len(payload) if isinstance(payload, list) else 1) for path, payload in stub.requests] == [
+        ('/emails/batch', 100), ('/emails/batch', 100), ('/emails/batch', 50), ('/emails', 1)]
+    assert stub.requests[0][1][0]['html'] == 'Line one<br>Line two'
+    assert len(stub.connections) == 1
+
+
+def test_failed_request_fails_its_batch_only():
+    with StubResend(responses=[(500, {})]) as stub:
+        transport = ResendTransport('key', base_url=stub.url, rate_limit=0, batch_size=3)
+        errors = transport.send_batch(messages(5))
+
+    assert [e is not None for e in errors] == [True, True, True, False, False]
+    assert errors[0].startswith('500')
+
+
+def test_429_holds_back_the_next_request_for_retry_after():
+    with StubResend(responses=[(429, {'Retry-After': '0.3'})]) as stub:
+        transport = ResendTransport('key', base_url=stub.url, rate_limit=100)
+        assert not transport.send('a@example.com', 'Hello', 'body')
+        start = time.monotonic()
+        assert transport.send('a@example.com', 'Hello', 'body')
+
+    assert time.monotonic() - start >= 0.25
+
+
+def test_slow_provider_times_out_instead_of_hanging():
+    with StubResend(latency=1.0) as stub:
+        transport = ResendTransport('key', base_url=stub.url, rate_limit=0, timeout=(1, 0.2))
+        start = time.monotonic()
+        errors = transport.send_batch(messages(2))
+
+    assert errors[0] and 'Timeout' in errors[0]
+    assert time.monotonic() - start < 0.9
+
+
+def test_rate_limiter_paces_requests():
+    limiter = RateLimiter(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.19
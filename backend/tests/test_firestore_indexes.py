@@ -0,0 +1,33 @@
+import json
+
+from generate_firestore_indexes import generate, property_queries
+from routes.properties import _filtered_query, _ordered_query
+from utils.firestore_indexes import RecordingQuery, composite_index
+
+def index_fields(index):
+    return [(f['fieldPath'], f['order']) for f in index['fields']]
+
+def test_committed_indexes_match_the_generated_list():
+    text, current = generate()
+    assert json.loads(text) == current, "run python generate_firestore_indexes.py"
+
+def test_every_property_query_has_its_composite_index():
+    _, current = generate()
+    committed = [index_fields(i) for i in current['indexes']]
+    for query in property_queries():
+        index = composite_index(query)
+        assert index is None or index_fields(index) in committed, (query.filters, query.orders)
+
+def test_listing_query_index_layout():
+    args = {'types': ['Apartment', 'Villa'], 'statuses': ['Available'], 'bedrooms': 2,
+            'min_price': 1000000, 'max_price': None}
+    query = _ordered_query(_filtered_query(args, RecordingQuery('properties')), 'newest')
+    assert index_fields(composite_index(query)) == [
+        ('type', 'ASCENDING'), ('status', 'ASCENDING'), ('createdAt', 'DESCENDING'),
+        ('bedrooms', 'DESCENDING'), ('priceValue', 'DESCENDING')]
+
+    unfiltered = _ordered_query(_filtered_query({'types': [], 'statuses': [], 'bedrooms': None,
+                                                 'min_price': None, 'max_price': None},
+                                                RecordingQuery('properties')), 'price_asc')
+    # A single ordering is served by the automatic single-field index
+    assert composite_index(unfiltered) is None
@@ -0,0 +1,76 @@
+import json
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from flask import jsonify
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1 import DELETE_FIELD, GeoPoint, Increment, SERVER_TIMESTAMP
+from google.cloud.firestore_v1.document import DocumentReference
+
+# Python value -> what API clients receive
+CASES = [
+    (DatetimeWithNanoseconds(2024, 5, 1, 10, 30, tzinfo=timezone.utc, nanosecond=123456789),
+     "2024-05-01T10:30:00.123456+00:00"),
+    (datetime(2024, 5, 1, 10, 30), "2024-05-01T10:30:00"),
+    (date(2024, 5, 1), "2024-05-01"),
+    (DELETE_FIELD, None),
+    (Increment(1), None),
+    (GeoPoint(18.52, 73.85), {"lat": 18.52, "lng": 73.85}),
+    (DocumentReference('properties', 'p1', client=MagicMock()), "properties/p1"),
+    (b"\x00\xffKP", "AP9LUA=="),
+    (np.int64(7), 7),
+    (np.float32(0.5), 0.5),
+    (np.array([1, 2, 3]), [1, 2, 3]),
+]
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request):
+    """Every case runs through orjson and through the stdlib fallback used when it is not installed"""
+    if request.param == 'stdlib':
+        with patch('utils.json_provider.orjson', None):
+            yield request.param
+    else:
+        pytest.importorskip('orjson')
+        yield request.param
+
+
+@pytest.mark.parametrize('value, expected', CASES)
+def test_firestore_values_on_the_wire(app, encoder, value, expected):
+    with app.app_context():
+        response = jsonify({"value": value})
+        assert json.loads(response.get_data()) == {"value": expected}
+        assert json.loads(app.json.dumps({"value": value})) == {"value": expected}
+
+
+def test_server_timestamp_renders_as_the_current_time(app, encoder):
+    with app.app_context():
+        rendered = jsonify({"created_at": SERVER_TIMESTAMP}).get_json()["created_at"]
+    created_at = datetime.fromisoformat(rendered)
+    assert created_at.tzinfo is not None
+    assert abs((datetime.now(timezone.utc) - created_at).total_seconds()) < 5
+
+
+def test_sets_become_lists_and_key_order_is_kept(app, encoder):
+    with app.app_context():
+        body = jsonify({"z": 1, "a": {"tags": {"pool"}, "b": 2}, "m": (1, 2)}).get_data(as_text=True)
+    assert json.loads(body) == {"z": 1, "a": {"tags": ["pool"], "b": 2}, "m": [1, 2]}
+    # Insertion order, not sorted
+    assert body.index('"z"') < body.index('"a"') < body.index('"m"')
+
+
+def test_unknown_types_still_raise(app, encoder):
+    with app.app_context(), pytest.raises(TypeError):
+        app.json.dumps({"value": object()})
+
+
+def test_routes_serve_iso_dates(client):
+    doc = MagicMock()
+    doc.id = 'b1'
+    doc.to_dict.return_value = {"title": "Hello", "created_at": datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)}
+    with patch('routes.blogs.db') as mock_db:
+        mock_db.collection.return_value.where.return_value.limit.return_value.stream.return_value = [doc]
+        body = client.get('/api/blogs?limit=1').get_json()
+    assert body[0]["created_at"] == "2024-05-01T10:30:00+00:00"
@@ -0,0 +1,94 @@
+import random
+from unittest.mock import MagicMock, patch
+
+from utils.percolator import Percolator, StandingQuery, request_query_id, saved_search_query_id
+
+TYPES = ["Villa's", "Commercial Plots", "Free Hold plots", "any"]
+LOCATIONS = ["Baner, Pune", "Sector 62, Noida", "Vashi, Navi Mumbai", "Whitefield, Bangalore"]
+
+
+def random_request(i, rng):
+    low = rng.randint(0, 150) * 100000
+    return StandingQuery.from_request(f"r{i}", {
+        "user_id": f"u{i}",
+        "criteria": {"minPrice": low, "maxPrice": low + rng.randint(1, 100) * 100000,
+                     "bedrooms": rng.randint(0, 4), "type": rng.choice(TYPES),
+                     "location": rng.choice(["", "pune", "noida", "navi mumbai", "bangalore", "mum", "une", "sec 6", "tor 62"])}
+    })
+
+
+def test_match_agrees_with_evaluating_every_query():
+    rng = random.Random(7)
+    queries = [random_request(i, rng) for i in range(2000)]
+    queries += [StandingQuery.from_saved_search(f"u{i}", f"s{i}", {
+        "name": "Search", "filters": {"minPrice": 0, "maxPrice": rng.randint(20, 200) * 100000,
+                                      "bedrooms": rng.randint(0, 3), "propertyType": "all",
+                                      "searchQuery": rng.choice(["", "villa", "noida", "vil", "lla", "view fl"])}
+    }) for i in range(500)]
+    percolator = Percolator()
+    percolator.load(queries)
+
+    for _ in range(200):
+        listing = {"title": rng.choice(["Garden Villa", "Corner Plot", "Sea View Flat"]),
+                   "location": rng.choice(LOCATIONS), "type": rng.choice(TYPES[:3]),
+                   "priceValue": rng.randint(10, 250) * 100000, "bedrooms": rng.randint(0, 5)}
+        expected = {q.id for q in queries if q.matches(listing)}
+        assert {q.id for q in percolator.match(listing)} == expected
+
+
+def test_partial_word_locations_match_like_a_substring_test():
+    percolator = Percolator()
+    percolator.load([StandingQuery.from_request(f"r{i}", {"user_id": "u1", "criteria": {"location": location}})
+                     for i, location in enumerate(["mum", "avi mum", "sec 6", "62, noi", "noida west", "hi, na"])])
+
+    def matched(location):
+        return sorted(q.id for q in percolator.match({"title": "Flat", "location": location, "priceValue": 1}))
+
+    assert matched("Vashi, Navi Mumbai") == [request_query_id("r0"), request_query_id("r1"), request_query_id("r5")]
+    assert matched("Sec 62, Noida") == [request_query_id("r2"), request_query_id("r3")]
+    assert matched("Sec 16B, Greater Noida West") == [request_query_id("r4")]
+
+
+def test_index_follows_request_and_search_writes():
+    percolator = Percolator()
+    percolator.load([])
+    listing = {"title": "Garden Villa", "location": "Baner, Pune", "type": "Villa's", "priceValue": 5000000}
+
+    percolator.add(StandingQuery.from_request("r1", {"user_id": "u1", "criteria": {"maxPrice": 6000000, "location": "Pune"}}))
+    percolator.add(StandingQuery.from_saved_search("u2", "s1", {"name": "Villas", "filters": {"propertyType": "Villa's"}}))
+    assert {q.id for q in percolator.match(listing)} == {request_query_id("r1"), saved_search_query_id("u2", "s1")}
+
+    percolator.remove(request_query_id("r1"))
+    # Re-adding under the same id replaces the query
+    percolator.add(StandingQuery.from_saved_search("u2", "s1", {"name": "Plots", "filters": {"propertyType": "Commercial Plots"}}))
+    assert percolator.match(listing) == []
+    assert percolator.stats()["queries"] == 1
+
+
+def test_new_listing_notifies_request_and_saved_search_owners(client, mock_admin_auth):
+    def doc(doc_id, data, parent_uid=None):
+        snapshot = MagicMock()
+        snapshot.id = doc_id
+        snapshot.to_dict.return_value = data
+        snapshot.reference.parent.parent.id = parent_uid
+        return snapshot
+
+    from utils import percolator as percolator_module
+    with patch('routes.properties.db') as mock_db, patch('routes.properties.percolator', Percolator()), \
+            patch('routes.properties.user_emails', return_value=[('u1', 'a@example.com'), ('u2', 'b@example.com')]), \
+            patch('routes.properties.notify_saved_search_match') as notify, \
+            patch('routes.properties.log_property_history'):
+        mock_db.collection.return_value.add.return_value = (None, MagicMock(id='p1'))
+        mock_db.collection.return_value.where.return_value.stream.return_value = [
+            doc('r1', {"user_id": "u1", "criteria": {"type": "Villa's", "location": "pune"}})]
+        mock_db.collection_group.return_value.stream.return_value = [
+            doc('s1', {"name": "Cheap", "filters": {"maxPrice": 100000}}, parent_uid='u2'),
+            doc('s2', {"name": "Villas", "filters": {"searchQuery": "villa"}}, parent_uid='u2')]
+
+        response = client.post('/api/properties', headers={'Authorization': 'Bearer admin_token'},
+                               json={"title": "Garden Villa", "price": "5000000", "type": "Villa's",
+                                     "location": "Baner, Pune"})
+
+    assert response.status_code == 201
+    assert sorted((c[0][0], c[0][1]) for c in notify.call_args_list) == [
+        ('a@example.com', percolator_module.REQUEST_MATCH_NAME), ('b@example.com', 'Villas')]
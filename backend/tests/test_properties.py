@@ -47,3 +47,280 @@ def test_update_property_validation(client, mock_admin_auth):
     response = client.put('/api/properties/prop_123', json=data, headers=headers)
     assert response.status_code == 400
     assert b"Invalid price format" in response.data
+
+def test_create_property_writes_price_value(client, mock_admin_auth):
+    """Test that the canonical numeric price is stored alongside the display string"""
+    headers = {'Authorization': 'Bearer admin_token'}
+    data = {
+        "title": "Luxury Villa",
+        "price": "₹ 1,50,00,000",
+        "type": "Villa's"
+    }
+
+    with patch('routes.properties.db') as mock_db:
+        mock_ref = MagicMock()
+        mock_ref.id = "new_property_id"
+        mock_db.collection.return_value.add.return_value = (None, mock_ref)
+
+        with patch('routes.properties.log_property_history'), patch('routes.properties.check_new_listing_matches'):
+            response = client.post('/api/properties', json=data, headers=headers)
+
+        assert response.status_code == 201
+        saved = mock_db.collection.return_value.add.call_args[0][0]
+        assert saved['priceValue'] == 15000000
+
+def test_get_properties_pushes_price_filter_to_firestore(client):
+    """Test that price filters and sorting run in Firestore when the catalog is off"""
+    with patch('routes.properties.db') as mock_db, patch('routes.properties.catalog') as mock_catalog:
+        mock_catalog.enabled = False
+        query = mock_db.collection.return_value
+        query.where.return_value = query
+        query.order_by.return_value = query
+        query.offset.return_value = query
+        query.limit.return_value = query
+        query.stream.return_value = []
+        count_result = MagicMock()
+        count_result.value = 0
+        query.count.return_value.get.return_value = [[count_result]]
+
+        response = client.get('/api/properties?min_price=100&max_price=500&sort=price_asc&page=2')
+
+        assert response.status_code == 200
+        query.where.assert_any_call('priceValue', '>=', 100)
+        query.where.assert_any_call('priceValue', '<=', 500)
+        query.order_by.assert_any_call('priceValue', direction='ASCENDING')
+        query.offset.assert_called_once_with(9)
+        query.limit.assert_called_once_with(10)
+
+def test_get_properties_cursor_pagination(client):
+    """Test that next_cursor walks the listing without repeating or skipping items"""
+    from utils.property_catalog import PropertyCatalog
+
+    docs = []
+    for i in range(5):
+        doc = MagicMock()
+        doc.id = f"p{i}"
+        # Two listings share a price so the id tiebreak matters
+        doc.to_dict.return_value = {"title": f"Listing {i}", "priceValue": [300, 100, 200, 100, 500][i]}
+        docs.append(doc)
+    collection = MagicMock()
+    collection.stream.return_value = docs
+    catalog = PropertyCatalog(lambda: collection, enabled=True, use_listener=False)
+
+    with patch('routes.properties.catalog', catalog):
+        seen = []
+        url = '/api/properties?sort=price_asc&limit=2'
+        while url:
+            data = client.get(url).get_json()
+            seen += [p['id'] for p in data['properties']]
+            cursor = data['next_cursor']
+            url = f'/api/properties?sort=price_asc&limit=2&cursor={cursor}' if cursor else None
+
+        assert seen == ['p1', 'p3', 'p2', 'p0', 'p4']
+
+        response = client.get(f'/api/properties?sort=newest&cursor={cursor or "bad"}')
+        assert response.status_code == 400
+
+        # Decodable cursors carrying the wrong types are rejected, not a 500
+        from routes.properties import encode_cursor
+        for key in (("cheap", "p1"), (100, 7), (None, "p1"), (True, "p1")):
+            response = client.get(f'/api/properties?sort=price_asc&cursor={encode_cursor("price_asc", key)}')
+            assert response.status_code == 400, key
+
+def test_batch_fetch_keeps_order_and_reports_missing(client):
+    """Test that the batch endpoint reads every id in one get_all call"""
+    def snapshot(doc_id, exists=True):
+        doc = MagicMock()
+        doc.id = doc_id
+        doc.exists = exists
+        doc.to_dict.return_value = {'title': doc_id.upper()}
+        return doc
+
+    with patch('routes.properties.db') as mock_db:
+        # get_all returns documents in arbitrary order
+        mock_db.get_all.return_value = [snapshot('b'), snapshot('gone', exists=False), snapshot('a')]
+        response = client.get('/api/properties/batch?ids=a,b,gone,a&fields=title')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [p['id'] for p in data['properties']] == ['a', 'b']
+        assert data['missing'] == ['gone']
+        mock_db.get_all.assert_called_once()
+        assert mock_db.get_all.call_args.kwargs['field_paths'] == ['title']
+
+    too_many = ','.join(f'p{i}' for i in range(101))
+    assert client.get(f'/api/properties/batch?ids={too_many}').status_code == 400
+
+def test_card_preset_projects_list_and_firestore_reads(client):
+    """Test that fields=card trims responses and narrows the Firestore read"""
+    doc = MagicMock()
+    doc.id = 'p1'
+    doc.to_dict.return_value = {'title': 'Villa', 'price': '100', 'images': ['a.jpg', 'b.jpg'],
+                                'description': 'long text', 'createdAt': '2024-01-01T00:00:00'}
+
+    with patch('routes.properties.catalog') as mock_catalog, patch('routes.properties.db') as mock_db:
+        mock_catalog.enabled = False
+        query = mock_db.collection.return_value
+        query.select.return_value = query
+        query.order_by.return_value = query
+        query.limit.return_value = query
+        query.count.return_value.get.return_value = [[MagicMock(value=1)]]
+        query.stream.return_value = [doc]
+
+        response = client.get('/api/properties?fields=card')
+
+        assert response.status_code == 200
+        prop = response.get_json()['properties'][0]
+        assert prop['images'] == ['a.jpg']
+        assert 'description' not in prop
+        selected = query.select.call_args.args[0]
+        assert 'title' in selected and 'description' not in selected and 'id' not in selected
+
+def test_bulk_import_batches_rows_and_reports_errors(client, mock_admin_auth):
+    """CSV import writes listings and their history in one batch and reports bad rows"""
+    import io
+    csv_body = (
+        "title,price,type,location,images,lat,lng\n"
+        "Garden Villa,\"₹ 1,20,00,000\",Villa's,\"Baner, Pune\",a.jpg|b.jpg,18.55,73.78\n"
+        "No Price,,Villa's,Pune,,,\n"
+        "Corner Plot,4500000,Free Hold plots,\"Sector 62, Noida\",,,\n"
+    )
+    headers = {'Authorization': 'Bearer admin_token'}
+    with patch('routes.properties.db') as mock_db:
+        batch = mock_db.batch.return_value
+        response = client.post('/api/admin/properties/import', headers=headers,
+                               data={'file': (io.BytesIO(csv_body.encode()), 'listings.csv')},
+                               content_type='multipart/form-data')
+
+    report = response.get_json()
+    assert response.status_code == 200
+    assert (report['rows'], report['imported'], report['failed'], report['batches']) == (3, 2, 1, 1)
+    assert report['errors'] == [{"row": 2, "error": "Missing required field: price"}]
+    # One listing write and one history write per imported row, one commit
+    assert batch.set.call_count == 4
+    batch.commit.assert_called_once()
+    villa = batch.set.call_args_list[0][0][1]
+    assert villa['priceValue'] == 12000000
+    assert villa['images'] == ['a.jpg', 'b.jpg'] and villa['imageUrl'] == 'a.jpg'
+    assert villa['coordinates'] == {"lat": 18.55, "lng": 73.78}
+
+def test_export_streams_filtered_csv_with_history_counts(client, mock_admin_auth):
+    """CSV export applies the list filters and adds each listing's history count"""
+    import csv
+    import io
+
+    def snapshot(doc_id, title, location):
+        doc = MagicMock()
+        doc.id = doc_id
+        doc.to_dict.return_value = {"title": title, "location": location, "price": "4500000",
+                                    "type": "Villa's", "views": 7, "images": ["a.jpg", "b.jpg"]}
+        return doc
+
+    headers = {'Authorization': 'Bearer admin_token'}
+    with patch('routes.properties.db') as mock_db:
+        query = mock_db.collection.return_value.where.return_value
+        query.stream.return_value = [snapshot('p1', 'Garden Villa', 'Baner, Pune'),
+                                     snapshot('p2', 'Corner Plot', 'Sector 62, Noida')]
+        history = mock_db.collection.return_value.document.return_value.collection.return_value
+        history.count.return_value.get.return_value = [[MagicMock(value=3)]]
+
+        response = client.get("/api/admin/properties/export?format=csv&type=Villa's&search=pune",
+                              headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+    mock_db.collection.return_value.where.assert_called_with('type', '==', "Villa's")
+    assert [r['id'] for r in rows] == ['p1']
+    assert (rows[0]['historyCount'], rows[0]['views'], rows[0]['images']) == ('3', '7', 'a.jpg|b.jpg')
+    assert rows[0]['priceValue'] == '4500000'
+
+def test_update_commits_diff_and_history_in_one_transaction(client, mock_admin_auth):
+    """An update reads the listing once and writes it with its history entries atomically"""
+    headers = {'Authorization': 'Bearer admin_token'}
+    old = {"title": "Garden Villa", "price": "5000000", "priceValue": 5000000, "type": "Villa's"}
+    with patch('routes.properties.db') as mock_db, \
+            patch('routes.properties.check_price_drop') as price_drop, \
+            patch('routes.properties.check_new_listing_matches') as matches:
+        doc_ref = mock_db.collection.return_value.document.return_value
+        snapshot = doc_ref.get.return_value
+        snapshot.exists = True
+        snapshot.to_dict.return_value = old
+        transaction = mock_db.transaction.return_value
+
+        response = client.put('/api/properties/p1', headers=headers,
+                              json={"price": "4500000", "title": "Garden Villa", "status": "sold"})
+
+    assert response.status_code == 200
+    assert response.get_json()['changes'] == ['price', 'status']
+    doc_ref.get.assert_called_once_with(transaction=transaction)
+    transaction.update.assert_called_once()
+    entries = [c[0][1] for c in transaction.set.call_args_list]
+    assert [e['action'] for e in entries] == ['Price Change', 'Property Updated']
+    assert entries[1]['changes'] == [{"field": "status", "old": None, "new": "sold"}]
+    # Downstream gets the data already read, no second get()
+    assert price_drop.call_args[0][2] == old
+    # Alerts are keyed by the price history entry, not the new price
+    assert price_drop.call_args[0][3] == doc_ref.collection.return_value.document.return_value.id
+    assert matches.call_args[1]['previous'] == old
+
+def test_price_drop_notifies_from_reverse_favorites_index():
+    """A price cut reads the listing's favoritedBy entries, not every user's favorites"""
+    from routes.properties import check_price_drop
+
+    def entry(uid):
+        doc = MagicMock()
+        doc.id = uid
+        return doc
+
+    with patch('routes.properties.db') as mock_db, patch('utils.favorites.auth') as mock_auth, \
+            patch('routes.properties.notify_price_drop') as notify:
+        reverse = mock_db.collection.return_value.document.return_value.collection.return_value
+        reverse.stream.return_value = [entry('u1'), entry('u2')]
+        mock_auth.get_users.return_value.users = [MagicMock(uid='u1', email='a@example.com'),
+                                                  MagicMock(uid='u2', email=None)]
+
+        check_price_drop('p1', {"price": "40,00,000"}, {"title": "Villa", "price": "50,00,000"}, 'h1')
+
+    mock_db.collection.return_value.document.return_value.collection.assert_called_with('favoritedBy')
+    mock_db.collection_group.assert_not_called()
+    mock_auth.get_users.assert_called_once()
+    notify.assert_called_once_with('a@example.com', 'Villa', '50,00,000', '40,00,000', 'p1', 'h1')
+
+def test_export_round_trips_through_import_with_amenities_unchanged(client, mock_admin_auth):
+    """CSV and NDJSON exports import back with each amenity's name, type and distance"""
+    import io
+    amenities = [{"name": "Swimming Pool", "type": "sports", "distance": "200m"},
+                 {"name": "Metro, Line 3", "type": "transport", "distance": "1.2 km"}, "Lift"]
+    listing = {"title": "Garden Villa", "price": "4500000", "type": "Villa's", "location": "Baner, Pune",
+               "bedrooms": 3, "images": ["a.jpg"], "amenities": amenities}
+    doc = MagicMock()
+    doc.id = 'p1'
+    doc.to_dict.side_effect = lambda: dict(listing)
+    headers = {'Authorization': 'Bearer admin_token'}
+
+    for fmt, filename in (('csv', 'listings.csv'), ('ndjson', 'listings.ndjson')):
+        with patch('routes.properties.db') as mock_db:
+            mock_db.collection.return_value.stream.return_value = [doc]
+            exported = client.get(f'/api/admin/properties/export?format={fmt}&history=false', headers=headers)
+            assert exported.status_code == 200
+
+            response = client.post('/api/admin/properties/import', headers=headers,
+                                   data={'file': (io.BytesIO(exported.data), filename)},
+                                   content_type='multipart/form-data')
+            assert response.get_json()['imported'] == 1, fmt
+            imported = mock_db.batch.return_value.set.call_args_list[0][0][1]
+
+        assert imported['amenities'] == amenities, fmt
+        assert (imported['title'], imported['bedrooms'], imported['images']) == ("Garden Villa", 3, ["a.jpg"])
+
+def test_parquet_export_keeps_amenity_details():
+    pq = pytest.importorskip('pyarrow.parquet')
+    import io
+    from utils.property_export import parquet_chunks
+    listing = {"id": "p1", "title": "Garden Villa", "price": "4500000",
+               "amenities": [{"name": "Swimming Pool", "type": "sports", "distance": "200m"}, "Lift"]}
+    table = pq.read_table(io.BytesIO(b''.join(parquet_chunks([listing]))))
+    assert table.column('amenities').to_pylist() == [[
+        {"name": "Swimming Pool", "type": "sports", "distance": "200m"},
+        {"name": "Lift", "type": None, "distance": None}]]
@@ -0,0 +1,372 @@
+from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+from utils.property_catalog import PropertyCatalog
+
+def make_doc(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    return doc
+
+def make_catalog(docs):
+    collection = MagicMock()
+    collection.stream.return_value = docs
+    return PropertyCatalog(lambda: collection, enabled=True, use_listener=False), collection
+
+def listed(catalog):
+    """Every listing the catalog serves, newest first."""
+    return catalog.query(limit=10000)[0]
+
+def listed_ids(catalog):
+    return [p['id'] for p in listed(catalog)]
+
+def listing(catalog, property_id):
+    return next((p for p in listed(catalog) if p['id'] == property_id), None)
+
+def test_catalog_loads_once_and_orders_newest_first():
+    catalog, collection = make_catalog([
+        make_doc('old', {'title': 'Old', 'createdAt': datetime(2024, 1, 1, tzinfo=timezone.utc)}),
+        make_doc('new', {'title': 'New', 'createdAt': datetime(2025, 1, 1, tzinfo=timezone.utc)}),
+    ])
+
+    assert listed_ids(catalog) == ['new', 'old']
+    listed(catalog)
+
+    assert collection.stream.call_count == 1
+    stats = catalog.stats()
+    assert stats['reloads'] == 1
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+def test_catalog_write_through():
+    catalog, _ = make_catalog([make_doc('a', {'title': 'A', 'price': '100'})])
+    catalog.ensure_loaded()
+
+    catalog.upsert('b', {'title': 'B', 'createdAt': object()})
+    catalog.patch('a', {'price': '90'})
+    assert listing(catalog, 'a')['price'] == '90'
+    assert listed_ids(catalog) == ['b', 'a']
+
+    catalog.remove('b')
+    assert listed_ids(catalog) == ['a']
+
+def test_catalog_applies_listener_changes():
+    catalog, _ = make_catalog([make_doc('a', {'title': 'A'})])
+    catalog.ensure_loaded()
+
+    catalog._apply_changes([
+        SimpleNamespace(type=SimpleNamespace(name='MODIFIED'), document=make_doc('a', {'title': 'A2'})),
+        SimpleNamespace(type=SimpleNamespace(name='ADDED'), document=make_doc('b', {'title': 'B'})),
+        SimpleNamespace(type=SimpleNamespace(name='REMOVED'), document=make_doc('b', {})),
+    ])
+
+    assert listing(catalog, 'a')['title'] == 'A2'
+    assert listing(catalog, 'b') is None
+    assert catalog.stats()['listener_events'] == 3
+
+def test_get_properties_served_from_catalog(client):
+    catalog, _ = make_catalog([
+        make_doc('p1', {'title': 'Villa', 'price': '₹ 1,50,00,000', 'type': "Villa's", 'location': 'Noida'}),
+        make_doc('p2', {'title': 'Plot', 'price': '50,00,000', 'type': 'Free Hold plots', 'location': 'Noida'}),
+    ])
+
+    with patch('routes.properties.catalog', catalog), patch('routes.properties.db') as mock_db:
+        response = client.get('/api/properties?max_price=10000000')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [p['id'] for p in data['properties']] == ['p2']
+        assert data['total'] == 1
+        mock_db.collection.return_value.stream.assert_not_called()
+
+def test_search_ranks_and_tracks_writes(client):
+    catalog, _ = make_catalog([
+        make_doc('villa', {'title': 'Luxury Villa with Private Pool', 'location': 'Greater Noida West'}),
+        make_doc('flat', {'title': 'Modern Apartment', 'location': 'Noida', 'description': 'Walk to the villa club'}),
+    ])
+
+    with patch('routes.properties.catalog', catalog):
+        data = client.get('/api/properties?search=villa&sort=relevance').get_json()
+        assert [p['id'] for p in data['properties']] == ['villa', 'flat']
+
+        # Partially typed last word still matches
+        data = client.get('/api/properties?search=noida apart').get_json()
+        assert [p['id'] for p in data['properties']] == ['flat']
+
+        catalog.patch('flat', {'description': 'Near the metro'})
+        catalog.remove('villa')
+        data = client.get('/api/properties?search=villa').get_json()
+        assert data['properties'] == []
+
+def test_search_agrees_without_the_catalog(client):
+    docs = [
+        make_doc('villa', {'title': 'The Villa', 'location': 'Greater Noida West'}),
+        make_doc('flat', {'title': 'Modern Apartment', 'location': 'Noida', 'description': 'Walk to the villa club'}),
+    ]
+    catalog, _ = make_catalog(docs)
+    query = MagicMock()
+    query.select.return_value = query.order_by.return_value = query
+    query.stream.side_effect = lambda: iter(docs)
+
+    def found(search):
+        url = f'/api/properties?search={search}'
+        with patch('routes.properties.catalog', catalog):
+            from_catalog = sorted(p['id'] for p in client.get(url).get_json()['properties'])
+        with patch('routes.properties.catalog', MagicMock(enabled=False)), patch('routes.properties.db') as mock_db:
+            mock_db.collection.return_value = query
+            from_firestore = sorted(p['id'] for p in client.get(url).get_json()['properties'])
+        assert from_catalog == from_firestore, search
+        return from_catalog
+
+    # Only stopwords: matched as text in title and location rather than dropped
+    assert found('the') == ['villa']
+    assert found('the villa') == ['flat', 'villa']
+    assert found('noida apart') == ['flat']
+    # Whole words, with only the last one matched as a prefix
+    assert found('oida') == []
+    assert found('gre') == ['villa']
+
+def test_columnar_query_matches_reference():
+    import random
+    rng = random.Random(3)
+    docs = [make_doc(f"p{i:03d}", {
+        'priceValue': rng.choice([100, 200, 300]),
+        'bedrooms': rng.randint(1, 4),
+        'type': rng.choice(['Villa', 'Plot']),
+        'createdAt': datetime(2024, 1, 1 + i % 28, tzinfo=timezone.utc)
+    }) for i in range(120)]
+    catalog, _ = make_catalog(docs)
+    catalog.remove('p007')
+    catalog.upsert('p500', {'priceValue': 200, 'bedrooms': 3, 'type': 'Villa'})
+
+    expected = sorted(
+        (p for p in listed(catalog) if p['type'] == 'Villa' and p['bedrooms'] >= 2 and p['priceValue'] <= 200),
+        key=lambda p: (p['priceValue'], p['id']), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        page, total, has_more, last_key = catalog.query(
+            max_price=200, bedrooms=2, prop_types=['Villa'], sort_by='price_desc', cursor=cursor, limit=7)
+        seen += [p['id'] for p in page]
+        if not has_more:
+            break
+        cursor = last_key
+
+    assert total == len(expected)
+    assert seen == [p['id'] for p in expected]
+
+def test_bitmap_filters_for_multi_select(client):
+    catalog, _ = make_catalog([
+        make_doc('v1', {'type': "Villa's", 'bedrooms': 4, 'status': 'available',
+                        'amenities': [{'name': 'Pool'}, {'name': 'Gym'}]}),
+        make_doc('v2', {'type': "Villa's", 'bedrooms': 3, 'status': 'Available', 'amenities': ['pool']}),
+        make_doc('c1', {'type': 'Commercial Plots', 'bedrooms': 3, 'status': 'sold', 'amenities': ['Pool', 'Gym']}),
+    ])
+
+    with patch('routes.properties.catalog', catalog):
+        data = client.get("/api/properties?type=Villa's&bedrooms=3&amenities=pool,gym").get_json()
+        assert [p['id'] for p in data['properties']] == ['v1']
+
+        data = client.get("/api/properties?type=Villa's,Commercial Plots&status=available").get_json()
+        assert sorted(p['id'] for p in data['properties']) == ['v1', 'v2']
+
+        catalog.patch('v2', {'amenities': ['Pool', 'Gym']})
+        catalog.remove('v1')
+        data = client.get('/api/properties?amenities=Gym&bedrooms=3&status=available').get_json()
+        assert [p['id'] for p in data['properties']] == ['v2']
+
+def test_facets_count_each_option(client):
+    catalog, _ = make_catalog([
+        make_doc('v1', {'type': "Villa's", 'bedrooms': 4, 'price': '2,00,00,000', 'location': 'Baner, Pune'}),
+        make_doc('v2', {'type': "Villa's", 'bedrooms': 3, 'price': '1,00,00,000', 'location': 'Baner, Pune'}),
+        make_doc('f1', {'type': 'Flats', 'bedrooms': 3, 'price': '50,00,000', 'location': 'Vashi, Navi Mumbai'}),
+    ])
+
+    with patch('routes.properties.catalog', catalog):
+        data = client.get("/api/properties/facets?type=Villa's&price_buckets=2").get_json()
+
+    assert data['total'] == 2
+    # The type facet ignores the type filter so other options keep their counts
+    assert data['type'] == {"Villa's": 2, 'Flats': 1}
+    assert data['bedrooms'] == {'3': 1, '4': 1}
+    assert data['locality'] == {'Baner': 2}
+    assert [b['count'] for b in data['price']] == [1, 1]
+    assert data['price'][0]['min'] == 10000000
+
+def test_facets_match_without_the_catalog(client):
+    docs = [
+        make_doc('v1', {'type': "Villa's", 'bedrooms': 4, 'price': '2,00,00,000', 'location': 'Baner, Pune'}),
+        make_doc('v2', {'type': "Villa's", 'bedrooms': 3, 'price': '1,00,00,000', 'location': 'Baner, Pune'}),
+        make_doc('v3', {'type': "Villa's", 'price': '1,30,00,000', 'location': 'Aundh, Pune'}),
+        make_doc('f1', {'type': 'Flats', 'bedrooms': 3, 'price': '50,00,000', 'location': 'Vashi, Navi Mumbai'}),
+        make_doc('f2', {'type': 'Flats', 'bedrooms': 2, 'price': '75,00,000', 'location': 'Vashi, Navi Mumbai'}),
+    ]
+    catalog, _ = make_catalog(docs)
+    query = MagicMock()
+    query.select.return_value = query
+    query.stream.side_effect = lambda: iter(docs)
+    url = "/api/properties/facets?type=Villa's&bedrooms=2&min_price=6000000&price_buckets=3"
+
+    with patch('routes.properties.catalog', catalog):
+        from_catalog = client.get(url).get_json()
+    with patch('routes.properties.catalog', MagicMock(enabled=False)), patch('routes.properties.db') as mock_db:
+        mock_db.collection.return_value = query
+        from_firestore = client.get(url).get_json()
+
+    assert from_firestore == from_catalog
+    # Each facet leaves out its own filter and keeps the others
+    assert from_catalog['type'] == {"Villa's": 2, 'Flats': 1}
+    assert from_catalog['bedrooms'] == {'0': 1, '3': 1, '4': 1}
+    # The type filter is applied to the facet counts, not pushed down to Firestore
+    query.where.assert_not_called()
+
+def test_geo_queries_use_the_grid(client):
+    catalog, _ = make_catalog([
+        make_doc('near', {'coordinates': {'lat': 28.5355, 'lng': 77.3910}}),
+        make_doc('nearer', {'coordinates': {'lat': 28.5360, 'lng': 77.3915}}),
+        make_doc('far', {'coordinates': {'lat': 19.0760, 'lng': 72.8777}}),
+        make_doc('nowhere', {}),
+    ])
+
+    with patch('routes.properties.catalog', catalog):
+        data = client.get('/api/properties?near=28.5361,77.3916&radius_km=2').get_json()
+        assert [p['id'] for p in data['properties']] == ['nearer', 'near']
+        assert data['properties'][0]['distance_km'] < data['properties'][1]['distance_km']
+
+        data = client.get('/api/properties?bbox=18.9,72.7,19.2,73.0').get_json()
+        assert [p['id'] for p in data['properties']] == ['far']
+
+        # Moving a listing moves it between grid cells
+        catalog.patch('far', {'coordinates': {'lat': 28.54, 'lng': 77.39}})
+        data = client.get('/api/properties?bbox=18.9,72.7,19.2,73.0').get_json()
+        assert data['properties'] == []
+        data = client.get('/api/properties?near=28.5361,77.3916&radius_km=2').get_json()
+        assert len(data['properties']) == 3
+
+        assert client.get('/api/properties?bbox=19.2,72.7,18.9,73.0').status_code == 400
+        assert client.get('/api/properties?sort=distance').status_code == 400
+
+def test_clusters_merge_when_zoomed_out(client):
+    catalog, _ = make_catalog([
+        make_doc('a', {'price': '50,00,000', 'coordinates': {'lat': 28.5355, 'lng': 77.3910}}),
+        make_doc('b', {'price': '70,00,000', 'coordinates': {'lat': 28.5955, 'lng': 77.3310}}),
+        make_doc('c', {'price': '90,00,000', 'coordinates': {'lat': 19.0760, 'lng': 72.8777}}),
+    ])
+    bbox = 'bbox=18,72,29,78'
+
+    with patch('routes.properties.catalog', catalog):
+        data = client.get(f'/api/properties/clusters?{bbox}&zoom=5').get_json()
+        clusters = sorted(data['clusters'], key=lambda c: c['count'])
+        assert [c['count'] for c in clusters] == [1, 2]
+        assert clusters[0]['property_id'] == 'c'
+        assert (clusters[1]['min_price'], clusters[1]['max_price']) == (5000000, 7000000)
+
+        data = client.get(f'/api/properties/clusters?{bbox}&zoom=14').get_json()
+        assert sorted(c['count'] for c in data['clusters']) == [1, 1, 1]
+
+        catalog.remove('b')
+        data = client.get(f'/api/properties/clusters?{bbox}&zoom=5').get_json()
+        assert sorted(c.get('property_id') for c in data['clusters']) == ['a', 'c']
+
+        assert client.get('/api/properties/clusters?zoom=5').status_code == 400
+
+def test_clusters_match_without_the_catalog(client):
+    docs = [
+        make_doc('a', {'price': '50,00,000', 'coordinates': {'lat': 28.5355, 'lng': 77.3910}}),
+        make_doc('b', {'price': 'On request', 'coordinates': {'lat': 28.5955, 'lng': 77.3310}}),
+        make_doc('c', {'price': '90,00,000', 'coordinates': {'lat': 19.0760, 'lng': 72.8777}}),
+        make_doc('d', {'price': '10,00,000'}),
+    ]
+    catalog, _ = make_catalog(docs)
+    url = '/api/properties/clusters?bbox=18,72,29,78&zoom=5'
+
+    with patch('routes.properties.catalog', catalog):
+        from_catalog = client.get(url).get_json()
+    with patch('routes.properties.catalog', MagicMock(enabled=False)), patch('routes.properties.db') as mock_db:
+        mock_db.collection.return_value.select.return_value.stream.return_value = docs
+        from_firestore = client.get(url).get_json()
+
+    key = lambda c: c['count']
+    assert sorted(from_firestore['clusters'], key=key) == sorted(from_catalog['clusters'], key=key)
+    assert from_firestore['level'] == from_catalog['level']
+
+def test_listing_etag_tracks_listing_content(client):
+    catalog, _ = make_catalog([make_doc('a', {'title': 'Villa'})])
+    # Another worker or a restarted instance holding the same listings
+    replica, _ = make_catalog([make_doc('a', {'title': 'Villa'})])
+
+    with patch('routes.properties.catalog', catalog):
+        first = client.get('/api/properties')
+        etag = first.headers['ETag']
+        assert 'max-age' in first.headers['Cache-Control']
+    with patch('routes.properties.catalog', replica):
+        assert client.get('/api/properties', headers={'If-None-Match': etag}).status_code == 304
+
+    with patch('routes.properties.catalog', catalog):
+        again = client.get('/api/properties', headers={'If-None-Match': etag})
+        assert again.status_code == 304
+        assert again.data == b''
+
+        catalog.patch('a', {'title': 'Renamed villa'})
+        changed = client.get('/api/properties', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.get_json()['properties'][0]['title'] == 'Renamed villa'
+
+def test_compressed_listing_has_its_own_etag(client, no_response_cache):
+    catalog, _ = make_catalog([make_doc('a', {'title': 'Villa ' * 500})])
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+
+    with patch('routes.properties.catalog', catalog):
+        for cached in (False, True):
+            no_response_cache.enabled = cached
+            no_response_cache.clear()
+            identity = client.get('/api/properties').headers['ETag']
+            compressed = client.get('/api/properties', headers=gzip_headers)
+            assert compressed.headers['Content-Encoding'] == 'gzip'
+            assert compressed.headers['ETag'] == identity[:-1] + '-gzip"'
+
+            again = client.get('/api/properties', headers={**gzip_headers, 'If-None-Match': compressed.headers['ETag']})
+            assert again.status_code == 304
+            assert again.headers['ETag'] == compressed.headers['ETag']
+            assert client.get('/api/properties', headers={'If-None-Match': identity}).status_code == 304
+
+def test_new_request_is_matched_against_current_listings(client, mock_auth):
+    catalog, _ = make_catalog([
+        make_doc('v1', {'title': 'Garden Villa', 'type': "Villa's", 'location': 'Baner, Pune', 'price': '5000000',
+                        'bedrooms': 3, 'createdAt': datetime(2024, 1, 1, tzinfo=timezone.utc)}),
+        make_doc('v2', {'title': 'Hill Villa', 'type': "Villa's", 'location': 'Aundh, Pune', 'price': '6000000',
+                        'bedrooms': 4, 'createdAt': datetime(2025, 1, 1, tzinfo=timezone.utc)}),
+        make_doc('v3', {'title': 'Sold Villa', 'type': "Villa's", 'location': 'Baner, Pune', 'price': '5000000',
+                        'bedrooms': 3, 'status': 'sold'}),
+        make_doc('v4', {'title': 'Noida Villa', 'type': "Villa's", 'location': 'Sector 62, Noida', 'price': '5000000',
+                        'bedrooms': 3}),
+        make_doc('p1', {'title': 'Corner Plot', 'type': 'Commercial Plots', 'location': 'Baner, Pune', 'price': '5000000'}),
+    ])
+    with patch('routes.properties.catalog', catalog), patch('routes.requests.db') as mock_db, \
+            patch('utils.email_service.notify_admin_new_lead'), patch('utils.email_service.send_request_auto_reply'):
+        mock_db.collection.return_value.document.return_value.id = 'req1'
+        response = client.post('/api/requests', headers={'Authorization': 'Bearer token'}, json={
+            'user_id': 'test_user_id',
+            'criteria': {'type': "Villa's", 'location': 'pune', 'minPrice': 1000000, 'maxPrice': 8000000, 'bedrooms': 3}})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['id'] == 'req1'
+    assert [m['id'] for m in body['matches']] == ['v2', 'v1']
+    stored = mock_db.collection.return_value.document.return_value.set.call_args[0][0]
+    assert stored['matches'] == body['matches']
+
+def test_request_matches_use_the_same_substring_test_as_the_percolator():
+    from utils.percolator import Percolator, StandingQuery
+    listing_data = {'title': 'Sunrise Heights', 'type': 'Apartment', 'location': 'Greater Noida',
+                    'price': '4500000', 'bedrooms': 2}
+    catalog, _ = make_catalog([make_doc('g1', listing_data)])
+
+    for location in ('oida', 'eater noida', 'greater'):
+        query = StandingQuery.from_request('r1', {'criteria': {'location': location}})
+        percolator = Percolator()
+        percolator.load([query])
+        assert [q.id for q in percolator.match(dict(listing_data, id='g1'))] == [query.id]
+        assert [m['id'] for m in catalog.match_query(query)] == ['g1'], location
@@ -0,0 +1,161 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+@pytest.fixture
+def response_cache(no_response_cache):
+    no_response_cache.enabled = True
+    return no_response_cache
+
+def blog_docs(title):
+    doc = MagicMock()
+    doc.id = 'b1'
+    doc.to_dict.return_value = {'title': title, 'created_at': '2024-01-01'}
+    doc.get.return_value = '2024-01-01'
+    return [doc]
+
+def test_cached_until_admin_write_invalidates(client, mock_admin_auth, response_cache):
+    with patch('routes.blogs.db') as mock_db:
+        query = mock_db.collection.return_value.where.return_value.limit.return_value
+        query.stream.return_value = blog_docs('First')
+
+        assert client.get('/api/blogs?limit=5').get_json()[0]['title'] == 'First'
+        query.stream.return_value = blog_docs('Second')
+        # Same normalised key, served from the cache
+        assert client.get('/api/blogs?limit=5').get_json()[0]['title'] == 'First'
+        assert query.stream.call_count == 1
+
+        headers = {'Authorization': 'Bearer admin_token'}
+        assert client.delete('/api/admin/blogs/b1', headers=headers).status_code == 200
+        assert client.get('/api/blogs?limit=5').get_json()[0]['title'] == 'Second'
+
+    stats = response_cache.stats()['routes']['blogs.get_blogs']
+    assert (stats['hits'], stats['misses'], stats['stores']) == (1, 2, 2)
+
+def test_lru_bounds_and_route_switch(response_cache, app):
+    response_cache.max_entries = 2
+    with patch('routes.properties.db') as mock_db:
+        snapshot = mock_db.collection.return_value.document.return_value.get.return_value
+        snapshot.exists = True
+        snapshot.id = 'a'
+        snapshot.update_time = None
+        snapshot.to_dict.return_value = {'title': 'Villa'}
+        client = app.test_client()
+
+        for pid in ('a', 'b', 'c'):
+            client.get(f'/api/properties/{pid}')
+        assert response_cache.stats()['entries'] == 2
+        assert response_cache.evictions == 1
+
+        response_cache.set_route_enabled('properties.get_property', False)
+        assert response_cache.stats()['entries'] == 0
+        client.get('/api/properties/a')
+        assert response_cache.stats()['entries'] == 0
+
+def test_singleflight_runs_once_for_concurrent_callers():
+    import threading
+    from utils.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'stats'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('stats', compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('stats', compute))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    while flight.stats()['coalesced'] < 4:
+        pass
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {'stats'}
+
+def test_stale_entry_served_while_refreshing(response_cache, client):
+    import threading
+    import time
+    from utils.response_cache import CacheEntry
+
+    now = time.time()
+    response_cache.put('/api/blogs?', CacheEntry('blogs.get_blogs', b'[{"title": "Old"}]', 200,
+                                                 [('Content-Type', 'application/json')], ('blogs',),
+                                                 expires=now - 1, stale_until=now + 60))
+    # Another request is mid-refresh for the same key
+    refreshing, release = threading.Event(), threading.Event()
+    refresher = threading.Thread(target=response_cache.flights.do,
+                                 args=('/api/blogs?', lambda: refreshing.set() or release.wait(5)))
+    refresher.start()
+    refreshing.wait(5)
+
+    with patch('routes.blogs.db') as mock_db:
+        assert client.get('/api/blogs').get_json() == [{'title': 'Old'}]
+        mock_db.collection.assert_not_called()
+    release.set()
+    refresher.join(5)
+    assert response_cache.stats()['routes']['blogs.get_blogs']['stale_hits'] == 1
+
+def test_cached_responses_served_precompressed(client, response_cache):
+    import gzip
+    from utils import compression
+    with patch('routes.blogs.db') as mock_db, \
+            patch('utils.compression.compress', wraps=compression.compress) as compress:
+        query = mock_db.collection.return_value.where.return_value.limit.return_value
+        query.stream.return_value = blog_docs('Villa ' * 500)
+
+        for _ in range(3):
+            response = client.get('/api/blogs?limit=5', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            assert gzip.decompress(response.data).startswith(b'[{')
+        # Compressed once, when the entry was stored
+        assert compress.call_count == len(compression.ENCODINGS)
+
+        plain = client.get('/api/blogs?limit=5')
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.get_json()[0]['title'].startswith('Villa')
+
+def test_small_bodies_not_compressed(client):
+    response = client.get('/health', headers={'Accept-Encoding': 'gzip, br'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_compressed_blog_hits_still_count_views(client, response_cache):
+    import gzip
+    with patch('routes.blogs.db') as mock_db:
+        doc = blog_docs('Villa ' * 500)[0]
+        doc.to_dict.return_value = {'title': 'Villa ' * 500, 'slug': 'villas', 'updated_at': '2024-01-01'}
+        mock_db.collection.return_value.where.return_value.limit.return_value.stream.side_effect = lambda: iter([doc])
+
+        for _ in range(3):
+            response = client.get('/api/blogs/villas', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.data).startswith(b'{')
+
+        # One view counted by the render, then one per cached hit
+        assert doc.reference.update.call_count == 1
+        mock_db.collection.return_value.document.assert_called_with('b1')
+        assert mock_db.collection.return_value.document.return_value.update.call_count == 2
+
+def test_public_stats_refreshed_when_a_user_is_deleted(client, mock_auth, response_cache):
+    def stats_with(clients):
+        mock_db.collection.return_value.count.return_value.get.return_value = [[MagicMock(value=clients)]]
+        return client.get('/api/analytics/public-stats').get_json()['clients']
+
+    with patch('routes.analytics.db') as mock_db, patch('routes.users.db'), \
+            patch('routes.users.delete_all_favorites'), patch('routes.users.auth'):
+        mock_db.collection.return_value.select.return_value.stream.return_value = []
+        assert stats_with(5) == 2005
+        # Served from the cache until a user write invalidates it
+        assert stats_with(4) == 2005
+        assert client.delete('/api/users/test_user_id', headers={'Authorization': 'Bearer token'}).status_code == 200
+        assert stats_with(4) == 2004
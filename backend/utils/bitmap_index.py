@@ -0,0 +1,88 @@
+import numpy as np
+
+# Per-value bitsets over store row ids, packed into uint64 words.
+# Multi-select filters are answered with word-wise AND/OR, so their cost
+# depends on the number of rows / 64, not on the number of properties
+# matching each value.
+
+
+def words_for(capacity):
+    return (capacity + 63) // 64
+
+
+def rows_to_words(rows, capacity):
+    """Packs an array of row ids into a bitset."""
+    bits = np.zeros(words_for(capacity) * 64, dtype=np.bool_)
+    bits[rows] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def words_to_rows(words, n):
+    """Unpacks a bitset into the sorted array of row ids below n."""
+    bits = np.unpackbits(words.view(np.uint8), count=n, bitorder='little')
+    return np.flatnonzero(bits)
+
+
+class BitmapIndex:
+    def __init__(self, capacity):
+        self._words = words_for(capacity)
+        self._bitmaps = {}
+        self._row_values = {}
+
+    def resize(self, capacity):
+        words = words_for(capacity)
+        if words <= self._words:
+            return
+        for value, bitmap in self._bitmaps.items():
+            grown = np.zeros(words, dtype=np.uint64)
+            grown[:len(bitmap)] = bitmap
+            self._bitmaps[value] = grown
+        self._words = words
+
+    def empty(self):
+        return np.zeros(self._words, dtype=np.uint64)
+
+    def add(self, row, values):
+        """Sets row's bits for values, clearing any values it had before."""
+        values = set(values)
+        previous = self._row_values.get(row, set())
+        if values == previous:
+            return
+        word, bit = row >> 6, np.uint64(1 << (row & 63))
+        for value in previous - values:
+            bitmap = self._bitmaps[value]
+            bitmap[word] &= ~bit
+        for value in values - previous:
+            bitmap = self._bitmaps.get(value)
+            if bitmap is None:
+                bitmap = self._bitmaps[value] = self.empty()
+            bitmap[word] |= bit
+        if values:
+            self._row_values[row] = values
+        else:
+            self._row_values.pop(row, None)
+
+    def discard(self, row):
+        self.add(row, ())
+
+    def values(self):
+        return list(self._bitmaps)
+
+    def get(self, value):
+        bitmap = self._bitmaps.get(value)
+        return bitmap if bitmap is not None else self.empty()
+
+    def union(self, values):
+        result = self.empty()
+        for value in values:
+            bitmap = self._bitmaps.get(value)
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def intersection(self, values):
+        result = None
+        for value in values:
+            bitmap = self.get(value)
+            result = bitmap.copy() if result is None else result & bitmap
+        return result if result is not None else self.empty()
@@ -0,0 +1,192 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+# Map marker clusters precomputed for every zoom level. Cells follow the web
+# map tile pyramid: a cell at level l splits into four cells at level l + 1.
+# Only the finest level holds rows; every coarser cell aggregates its four
+# children, so a write refreshes one leaf and its chain of parents.
+
+MAX_LEVEL = 20
+# Cells are a quarter of a 256px tile (~64px), so zoom z uses level z + 2
+LEVELS_PER_ZOOM_OFFSET = 2
+# Upper bound on the clusters returned for one viewport
+MAX_CLUSTERS = 500
+MAX_LATITUDE = 85.05112878
+
+# Aggregate slots: [count, sum_lat, sum_lng, min_price, max_price, sample_row]
+COUNT, SUM_LAT, SUM_LNG, MIN_PRICE, MAX_PRICE, SAMPLE = range(6)
+
+
+def tile_xy(lat, lng, level):
+    """Web mercator cell of (lat, lng) at a level."""
+    n = 1 << level
+    lat = min(max(lat, -MAX_LATITUDE), MAX_LATITUDE)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_xy_array(lats, lngs, level):
+    """Vectorised tile_xy over arrays of coordinates."""
+    n = 1 << level
+    lats = np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE)
+    xs = ((lngs + 180.0) / 360.0 * n).astype(np.int64)
+    ys = ((1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0 * n).astype(np.int64)
+    return np.clip(xs, 0, n - 1), np.clip(ys, 0, n - 1)
+
+
+def _aggregate(points):
+    """Aggregate of (lat, lng, price, row) tuples; prices <= 0 are unknown."""
+    agg = [0, 0.0, 0.0, math.inf, -math.inf, None]
+    for lat, lng, price, row in points:
+        agg[COUNT] += 1
+        agg[SUM_LAT] += lat
+        agg[SUM_LNG] += lng
+        if price > 0:
+            agg[MIN_PRICE] = min(agg[MIN_PRICE], price)
+            agg[MAX_PRICE] = max(agg[MAX_PRICE], price)
+        if agg[SAMPLE] is None:
+            agg[SAMPLE] = row
+    return agg
+
+
+def _merge(aggregates):
+    merged = [0, 0.0, 0.0, math.inf, -math.inf, None]
+    for agg in aggregates:
+        merged[COUNT] += agg[COUNT]
+        merged[SUM_LAT] += agg[SUM_LAT]
+        merged[SUM_LNG] += agg[SUM_LNG]
+        merged[MIN_PRICE] = min(merged[MIN_PRICE], agg[MIN_PRICE])
+        merged[MAX_PRICE] = max(merged[MAX_PRICE], agg[MAX_PRICE])
+        if merged[SAMPLE] is None:
+            merged[SAMPLE] = agg[SAMPLE]
+    return merged
+
+
+def cluster_markers(aggregates, property_id):
+    """
+    Formats aggregates as map markers. property_id maps a sample row to the
+    listing id, which a cluster of one listing carries.
+    """
+    markers = []
+    for agg in aggregates:
+        count = agg[COUNT]
+        marker = {
+            "lat": round(agg[SUM_LAT] / count, 6),
+            "lng": round(agg[SUM_LNG] / count, 6),
+            "count": count,
+            "min_price": int(agg[MIN_PRICE]) if agg[MIN_PRICE] != math.inf else None,
+            "max_price": int(agg[MAX_PRICE]) if agg[MAX_PRICE] != -math.inf else None
+        }
+        if count == 1:
+            marker["property_id"] = property_id(agg[SAMPLE])
+        markers.append(marker)
+    return markers
+
+
+class ClusterIndex:
+    def __init__(self, max_level=MAX_LEVEL):
+        self.max_level = max_level
+        self.levels = [{} for _ in range(max_level + 1)]
+        self._members = defaultdict(dict)
+        self._row_cell = {}
+
+    def __len__(self):
+        return len(self._row_cell)
+
+    def add(self, row, lat, lng, price):
+        cell = tile_xy(lat, lng, self.max_level)
+        previous = self._row_cell.get(row)
+        if previous is not None and previous != cell:
+            self._members[previous].pop(row, None)
+            self._refresh(previous)
+        self._members[cell][row] = (lat, lng, price, row)
+        self._row_cell[row] = cell
+        self._refresh(cell)
+
+    def discard(self, row):
+        cell = self._row_cell.pop(row, None)
+        if cell is not None:
+            self._members[cell].pop(row, None)
+            self._refresh(cell)
+
+    def _refresh(self, cell):
+        """Recomputes a leaf from its rows, then each parent from its children."""
+        members = self._members.get(cell)
+        if members:
+            self.levels[self.max_level][cell] = _aggregate(members.values())
+        else:
+            self._members.pop(cell, None)
+            self.levels[self.max_level].pop(cell, None)
+        x, y = cell
+        for level in range(self.max_level - 1, -1, -1):
+            x, y = x >> 1, y >> 1
+            children = self.levels[level + 1]
+            found = [children[c] for c in ((2 * x, 2 * y), (2 * x + 1, 2 * y), (2 * x, 2 * y + 1),
+                                           (2 * x + 1, 2 * y + 1)) if c in children]
+            if found:
+                self.levels[level][(x, y)] = _merge(found)
+            else:
+                self.levels[level].pop((x, y), None)
+
+    def build(self, rows, lats, lngs, prices):
+        """Replaces the index from parallel arrays, aggregating one level at a time."""
+        rows, lats, lngs, prices = (np.asarray(a) for a in (rows, lats, lngs, prices))
+        self.levels = [{} for _ in range(self.max_level + 1)]
+        self._members = defaultdict(dict)
+        self._row_cell = {}
+        if not len(rows):
+            return
+        xs, ys = tile_xy_array(lats, lngs, self.max_level)
+        for row, lat, lng, price, x, y in zip(rows.tolist(), lats.tolist(), lngs.tolist(), prices.tolist(),
+                                              xs.tolist(), ys.tolist()):
+            self._members[(x, y)][row] = (lat, lng, price, row)
+            self._row_cell[row] = (x, y)
+
+        # Unknown prices (<= 0) must not win the min/max reductions
+        low_prices = np.where(prices > 0, prices, np.inf)
+        high_prices = np.where(prices > 0, prices, -np.inf)
+        for level in range(self.max_level, -1, -1):
+            shift = self.max_level - level
+            keys = ((xs >> shift) << 32) | (ys >> shift)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            cells, first = sorted_keys[starts], order[starts]
+            counts = np.diff(np.r_[starts, len(keys)])
+            sum_lat = np.add.reduceat(lats[order], starts)
+            sum_lng = np.add.reduceat(lngs[order], starts)
+            min_price = np.minimum.reduceat(low_prices[order], starts)
+            max_price = np.maximum.reduceat(high_prices[order], starts)
+            self.levels[level] = {
+                (int(key >> 32), int(key & 0xffffffff)): [count, lat, lng, low, high, sample]
+                for key, count, lat, lng, low, high, sample in zip(
+                    cells.tolist(), counts.tolist(), sum_lat.tolist(), sum_lng.tolist(),
+                    min_price.tolist(), max_price.tolist(), rows[first].tolist())
+            }
+
+    def clusters(self, south, west, north, east, zoom, max_clusters=MAX_CLUSTERS):
+        """
+        Returns (aggregates, level) for the cells overlapping a box at a
+        map zoom. Steps to coarser levels until the viewport holds at most
+        max_clusters occupied cells.
+        """
+        level = min(max(int(zoom), 0) + LEVELS_PER_ZOOM_OFFSET, self.max_level)
+        while True:
+            x0, y0 = tile_xy(north, west, level)
+            x1, y1 = tile_xy(south, east, level)
+            cells = self.levels[level]
+            n_cells = (x1 - x0 + 1) * (y1 - y0 + 1)
+            if n_cells > 16 * max_clusters and level > 0:
+                # Far finer than the viewport can show; don't walk it
+                level -= 1
+                continue
+            if n_cells <= len(cells):
+                found = [cells[(x, y)] for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in cells]
+            else:
+                found = [agg for (x, y), agg in cells.items() if x0 <= x <= x1 and y0 <= y <= y1]
+            if len(found) <= max_clusters or level == 0:
+                return found, level
+            level -= 1
@@ -0,0 +1,121 @@
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Response compression negotiated from Accept-Encoding. Brotli is preferred
+# when the client accepts it and the module is installed, gzip otherwise.
+# Bodies under MIN_SIZE are sent as is, streamed bodies are compressed chunk
+# by chunk (flushed so rows still arrive as they are produced), and cached
+# responses carry variants compressed once when they are stored. An encoded
+# body gets its own ETag, since strong validators must differ between byte
+# representations.
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+MIN_SIZE = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'application/javascript',
+                      'text/csv', 'text/html', 'text/plain', 'text/css', 'image/svg+xml'}
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encodings=None):
+    """Best encoding the client accepts, or None for identity."""
+    if accept_encodings is None:
+        accept_encodings = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compressed_variants(body, mimetype):
+    """Every supported encoding of body, for responses stored in the cache."""
+    if not COMPRESSION_ENABLED or not compressible(mimetype) or len(body) < MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding) for encoding in ENCODINGS}
+
+
+def _compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def encoded_etag(tag, encoding):
+    """ETag of the encoding variant of a representation tagged tag."""
+    return f"{tag}-{encoding}"
+
+
+def _encode_etag(response, encoding):
+    tag, weak = response.get_etag()
+    if tag:
+        response.set_etag(encoded_etag(tag, encoding), weak=weak)
+
+
+def set_encoded_body(response, encoding, body):
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    _encode_etag(response, encoding)
+
+
+def compress_response(response):
+    """after_request hook compressing eligible responses in place."""
+    if not COMPRESSION_ENABLED or not compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+        return response
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.direct_passthrough = False
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Content-Length', None)
+        _encode_etag(response, encoding)
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+    set_encoded_body(response, encoding, compress(body, encoding))
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
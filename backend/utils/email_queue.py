@@ -0,0 +1,291 @@
+import atexit
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Durable outbox for transactional email. Request handlers only insert a row
+# into a local SQLite database; a small pool of worker threads delivers due
+# messages through the provider, retrying failures with exponential backoff
+# and moving messages that keep failing to a dead-letter state.
+#
+# A message claimed by a worker is leased rather than deleted, so a process
+# that dies mid-send leaves it to be picked up again once the lease expires
+# (delivery is at least once). An optional dedupe key makes enqueueing the
+# same notification twice within the retention window a no-op.
+
+QUEUE_ENABLED = os.getenv('EMAIL_QUEUE_ENABLED', 'true').lower() == 'true'
+QUEUE_PATH = os.getenv('EMAIL_QUEUE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'email_queue.sqlite3'))
+WORKERS = int(os.getenv('EMAIL_QUEUE_WORKERS', '4'))
+MAX_ATTEMPTS = int(os.getenv('EMAIL_QUEUE_MAX_ATTEMPTS', '6'))
+# Retry n waits about BASE_DELAY * 2**(n-1) seconds, capped at MAX_DELAY
+BASE_DELAY = float(os.getenv('EMAIL_QUEUE_BASE_DELAY', '5'))
+MAX_DELAY = float(os.getenv('EMAIL_QUEUE_MAX_DELAY', '900'))
+# A claimed message is retried by another worker if not settled within this
+LEASE_SECONDS = float(os.getenv('EMAIL_QUEUE_LEASE_SECONDS', '120'))
+# Sent and dead-lettered messages (and their dedupe keys) are kept this long
+RETENTION_SECONDS = int(os.getenv('EMAIL_QUEUE_RETENTION_SECONDS', str(7 * 24 * 3600)))
+# Longest an idle worker sleeps before looking for due retries
+IDLE_WAIT = 5
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT UNIQUE,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS email_jobs_due ON email_jobs (status, next_attempt_at);
+"""
+
+
+def backoff_delay(attempts, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """Seconds before retry number `attempts`, with jitter so failed bursts spread out."""
+    return min(max_delay, base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class EmailQueue:
+    def __init__(self, send, path=QUEUE_PATH, workers=WORKERS, max_attempts=MAX_ATTEMPTS,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, lease_seconds=LEASE_SECONDS,
+                 retention_seconds=RETENTION_SECONDS, send_batch=None, batch_size=1):
+        """
+        send(to_email, subject, body) returns True on success; False or an
+        exception is a failure. With send_batch(messages), returning an error
+        or None per (to_email, subject, body), workers claim up to batch_size
+        due messages at a time and hand them over together.
+        """
+        self.send = send
+        self.send_batch = send_batch
+        self.batch_size = batch_size if send_batch else 1
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._stopping = False
+        self._schema_ready = False
+        self._last_purge = 0
+        self.sent = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.duplicates = 0
+
+    # --- Storage ---
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    def enqueue(self, to_email, subject, body, dedupe_key=None, delay=0):
+        """Stores a message for delivery. Returns False if dedupe_key was already queued."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO email_jobs (dedupe_key, to_email, subject, body, next_attempt_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (dedupe_key, to_email, subject, body, now + delay, now, now))
+        if not cursor.rowcount:
+            self.duplicates += 1
+            return False
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return True
+
+    def _claim(self, limit=1):
+        """Leases up to limit due messages (or ones whose lease expired), oldest first."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                "SELECT * FROM email_jobs WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_until < ?) "
+                "ORDER BY next_attempt_at LIMIT ?", (PENDING, now, SENDING, now, limit)).fetchall()
+            if rows:
+                conn.execute(f"UPDATE email_jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                             f"WHERE id IN ({','.join('?' * len(rows))})",
+                             (SENDING, now + self.lease_seconds, now, *[row['id'] for row in rows]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return rows
+
+    def _settle(self, row, error):
+        conn = self._connection()
+        now = time.time()
+        attempts = row['attempts'] + 1
+        if error is None:
+            conn.execute("UPDATE email_jobs SET status = ?, attempts = ?, lease_until = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+                         (SENT, attempts, now, row['id']))
+            self.sent += 1
+        elif attempts >= self.max_attempts:
+            conn.execute("UPDATE email_jobs SET status = ?, attempts = ?, lease_until = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                         (DEAD, attempts, error, now, row['id']))
+            self.dead_lettered += 1
+            print(f"Email {row['id']} to {row['to_email']} dead-lettered after {attempts} attempts: {error}")
+        else:
+            retry_at = now + backoff_delay(attempts, self.base_delay, self.max_delay)
+            conn.execute("UPDATE email_jobs SET status = ?, attempts = ?, lease_until = NULL, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                         (PENDING, attempts, retry_at, error, now, row['id']))
+            self.failed += 1
+
+    # --- Delivery ---
+
+    def _send_one(self, row):
+        try:
+            return None if self.send(row['to_email'], row['subject'], row['body']) else 'send failed'
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    def _deliver(self, rows):
+        if len(rows) == 1:
+            errors = [self._send_one(rows[0])]
+        else:
+            try:
+                errors = self.send_batch([(row['to_email'], row['subject'], row['body']) for row in rows])
+            except Exception as e:
+                errors = [str(e) or type(e).__name__] * len(rows)
+        for row, error in zip(rows, errors):
+            self._settle(row, error)
+
+    def run_pending(self, limit=None):
+        """Delivers due messages in the calling thread. Returns how many were attempted."""
+        attempted = 0
+        while limit is None or attempted < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - attempted)
+            rows = self._claim(size)
+            if not rows:
+                break
+            self._deliver(rows)
+            attempted += len(rows)
+        return attempted
+
+    def _next_due_in(self):
+        row = self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM email_jobs WHERE status = ?", (PENDING,)).fetchone()
+        if row[0] is None:
+            return IDLE_WAIT
+        return max(0.0, min(IDLE_WAIT, row[0] - time.time()))
+
+    def _worker(self):
+        while not self._stopping:
+            try:
+                rows = self._claim(self.batch_size)
+                if rows:
+                    self._deliver(rows)
+                    continue
+                if time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    self.purge()
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self._next_due_in())
+            except Exception as e:
+                print(f"Email queue worker error: {e}")
+                time.sleep(1)
+
+    def start(self):
+        """Starts the worker pool once per process (gunicorn forks after import)."""
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._worker, name=f'email-queue-{i}', daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        """Lets workers finish the message in hand; undelivered messages stay queued."""
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    # --- Administration ---
+
+    def purge(self, older_than=None):
+        """
+        Deletes sent and dead-lettered messages older than the retention
+        window, releasing their dedupe keys.
+        """
+        cutoff = time.time() - (self.retention_seconds if older_than is None else older_than)
+        return self._connection().execute(
+            "DELETE FROM email_jobs WHERE status IN (?, ?) AND updated_at < ?", (SENT, DEAD, cutoff)).rowcount
+
+    def dead_letters(self, limit=50):
+        rows = self._connection().execute(
+            "SELECT id, dedupe_key, to_email, subject, attempts, last_error, created_at, updated_at "
+            "FROM email_jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (DEAD, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def retry_dead(self, job_ids=None):
+        """Requeues dead-lettered messages (all of them, or the given ids) with a fresh attempt budget."""
+        if job_ids is not None and not job_ids:
+            return 0
+        now = time.time()
+        sql = "UPDATE email_jobs SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?"
+        params = [PENDING, now, now, DEAD]
+        if job_ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params += list(job_ids)
+        count = self._connection().execute(sql, params).rowcount
+        if count:
+            self.start()
+            with self._wakeup:
+                self._wakeup.notify_all()
+        return count
+
+    def stats(self):
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, DEAD: 0}
+        for status, count in self._connection().execute("SELECT status, COUNT(*) FROM email_jobs GROUP BY status"):
+            counts[status] = count
+        return {
+            "path": self.path,
+            "workers": len(self._threads),
+            "queued": counts,
+            "sent": self.sent,
+            "failed_attempts": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "duplicates": self.duplicates,
+        }
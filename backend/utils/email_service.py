@@ -5,52 +5,186 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("EmailService")
 
 import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from utils.email_queue import QUEUE_ENABLED, EmailQueue
 
 load_dotenv()
 
 RESEND_API_KEY = os.getenv('RESEND_API_KEY')
+RESEND_API_URL = os.getenv('RESEND_API_URL', 'https://api.resend.com')
 EMAIL_FROM = os.getenv('EMAIL_FROM', 'onboarding@resend.dev')
+# Seconds to establish a connection / to wait for the provider's response
+CONNECT_TIMEOUT = float(os.getenv('EMAIL_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('EMAIL_READ_TIMEOUT', '10'))
+# Kept-alive connections to the provider, at least one per queue worker
+POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', '8'))
+# Resend accepts up to 100 messages per batch request
+BATCH_SIZE = min(100, int(os.getenv('EMAIL_BATCH_SIZE', '100')))
+# API requests per second allowed by the provider's quota (Resend: 2). The
+# quota covers the whole deployment but each process only paces itself, so
+# every sending process (gunicorn workers times running instances) gets an
+# equal share: set EMAIL_SENDING_PROCESSES to the most that run at once. If
+# it is set too low, the provider's 429s still hold senders back (Retry-After).
+RATE_LIMIT = float(os.getenv('RESEND_RATE_LIMIT', '2'))
+SENDING_PROCESSES = max(1, int(os.getenv('EMAIL_SENDING_PROCESSES', '1')))
+
+def _html(body):
+    return body.replace('\n', '<br>')  # Simple text to HTML conversion
+
+class RateLimiter:
+    """
+    Token bucket shared by the sending threads of one process; acquire()
+    blocks until a request may go out. Processes do not coordinate, see
+    SENDING_PROCESSES.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def block_for(self, seconds):
+        """Holds every sender back, e.g. for the Retry-After of a 429."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+class ResendTransport:
+    """
+    Sends through one pooled keep-alive session with explicit timeouts,
+    grouping messages into batch requests and pacing requests to this
+    process's share of the quota.
+    Messages are (to_email, subject, body) tuples.
+    """
+
+    def __init__(self, api_key, base_url=RESEND_API_URL, sender=EMAIL_FROM, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 pool_size=POOL_SIZE, batch_size=BATCH_SIZE, rate_limit=RATE_LIMIT / SENDING_PROCESSES):
+        self.base_url = base_url.rstrip('/')
+        self.sender = sender
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_limit)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        # Failed sends are retried by the email queue, not here
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _payload(self, message):
+        to_email, subject, body = message
+        return {"from": self.sender, "to": [to_email], "subject": subject, "html": _html(body)}
+
+    def _post(self, path, payload):
+        """Returns None on success or an error string."""
+        self.limiter.acquire()
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return f"{type(e).__name__}: {e}"
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                retry_after = 1.0
+            self.limiter.block_for(retry_after)
+        if 200 <= response.status_code < 300:
+            return None
+        return f"{response.status_code} - {response.text[:200]}"
+
+    def send(self, to_email, subject, body):
+        error = self._post('/emails', self._payload((to_email, subject, body)))
+        if error:
+            logger.error(f"Failed to send email to {to_email}: {error}")
+            return False
+        logger.info(f"Email sent successfully to {to_email}")
+        return True
+
+    def send_batch(self, messages):
+        """Returns one error (None for sent) per message; a failed request fails its whole batch."""
+        errors = []
+        for i in range(0, len(messages), self.batch_size):
+            chunk = messages[i:i + self.batch_size]
+            if len(chunk) == 1:
+                error = self._post('/emails', self._payload(chunk[0]))
+            else:
+                error = self._post('/emails/batch', [self._payload(m) for m in chunk])
+            if error:
+                logger.error(f"Failed to send batch of {len(chunk)} emails: {error}")
+            else:
+                logger.info(f"Sent batch of {len(chunk)} emails")
+            errors += [error] * len(chunk)
+        return errors
+
+transport = ResendTransport(RESEND_API_KEY) if RESEND_API_KEY else None
+
+def _log_mock_email(to_email, subject, body):
+    logger.warning("RESEND_API_KEY not found. Falling back to mock email.")
+    logger.info(f"--- MOCK EMAIL ---")
+    logger.info(f"To: {to_email}")
+    logger.info(f"Subject: {subject}")
+    logger.info(f"Body: {body}")
+    logger.info(f"------------------")
 
 def send_email(to_email, subject, body):
     """
     Sends an email using the Resend API.
     """
-    if not RESEND_API_KEY:
-        logger.warning("RESEND_API_KEY not found. Falling back to mock email.")
-        logger.info(f"--- MOCK EMAIL ---")
-        logger.info(f"To: {to_email}")
-        logger.info(f"Subject: {subject}")
-        logger.info(f"Body: {body}")
-        logger.info(f"------------------")
+    if transport is None:
+        _log_mock_email(to_email, subject, body)
         return True
 
     try:
-        url = "https://api.resend.com/emails"
-        headers = {
-            "Authorization": f"Bearer {RESEND_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "from": EMAIL_FROM,
-            "to": [to_email],
-            "subject": subject,
-            "html": body.replace('\n', '<br>')  # Simple text to HTML conversion
-        }
-
-        response = requests.post(url, json=payload, headers=headers)
-        
-        if response.status_code == 200:
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
-        else:
-            logger.error(f"Failed to send email: {response.status_code} - {response.text}")
-            return False
+        return transport.send(to_email, subject, body)
     except Exception as e:
         logger.error(f"Exception sending email: {e}")
         return False
 
+def send_emails(messages):
+    """Sends (to_email, subject, body) messages in batch requests; returns an error or None per message."""
+    if transport is None:
+        for message in messages:
+            _log_mock_email(*message)
+        return [None] * len(messages)
+    return transport.send_batch(messages)
+
+def queue_email(to_email, subject, body, dedupe_key=None):
+    """
+    Hands a message to the durable email queue so the caller does not wait
+    on the provider. With the queue disabled it is sent synchronously.
+    dedupe_key: a message with a key already queued or sent is dropped.
+    """
+    if not QUEUE_ENABLED:
+        return send_email(to_email, subject, body)
+    try:
+        return email_queue.enqueue(to_email, subject, body, dedupe_key=dedupe_key)
+    except Exception as e:
+        logger.error(f"Could not queue email, sending directly: {e}")
+        return send_email(to_email, subject, body)
+
 def notify_saved_search_match(user_email, search_name, property_title, property_id):
     subject = f"New Match for your search: {search_name}"
     body = f"""
@@ -64,9 +198,9 @@ def notify_saved_search_match(user_email, search_name, property_title, property_
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body, dedupe_key=f"match:{user_email}:{property_id}:{search_name}")
 
-def notify_price_drop(user_email, property_title, old_price, new_price, property_id):
+def notify_price_drop(user_email, property_title, old_price, new_price, property_id, change_id):
     subject = f"Price Drop Alert: {property_title}"
     body = f"""
     Hello,
@@ -81,7 +215,7 @@ def notify_price_drop(user_email, property_title, old_price, new_price, property
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body, dedupe_key=f"price-drop:{user_email}:{property_id}:{change_id}")
 
 def notify_appointment_confirmation(user_email, property_title, date, time):
     subject = f"Appointment Request Received: {property_title}"
@@ -99,7 +233,7 @@ def notify_appointment_confirmation(user_email, property_title, date, time):
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body)
 
 def notify_appointment_status_change(user_email, property_title, date, time, status):
     subject = f"Appointment Update: {property_title}"
@@ -117,7 +251,7 @@ def notify_appointment_status_change(user_email, property_title, date, time, sta
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body)
 
 def notify_appointment_reschedule(user_email, property_title, old_date, old_time, new_date, new_time):
     subject = f"Appointment Rescheduled: {property_title}"
@@ -136,7 +270,7 @@ def notify_appointment_reschedule(user_email, property_title, old_date, old_time
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body)
 
 def notify_admin_new_lead(lead_type, data):
     """
@@ -162,7 +296,7 @@ def notify_admin_new_lead(lead_type, data):
     """
     # For now, we'll just log it or send to a dev email if configured
     # In production, you'd send this to the actual admin
-    send_email(EMAIL_FROM, subject, body) # Sending to sender for testing purposes
+    queue_email(EMAIL_FROM, subject, body) # Sending to sender for testing purposes
 
 def send_inquiry_auto_reply(user_email, name):
     subject = "We received your inquiry - Krishna Properties"
@@ -176,7 +310,7 @@ def send_inquiry_auto_reply(user_email, name):
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body)
 
 def send_request_auto_reply(user_email, name):
     subject = "Dream Home Request Received - Krishna Properties"
@@ -190,4 +324,16 @@ def send_request_auto_reply(user_email, name):
     Best regards,
     Krishna Properties Team
     """
-    send_email(user_email, subject, body)
+    queue_email(user_email, subject, body)
+
+email_queue = EmailQueue(send_email, send_batch=send_emails, batch_size=BATCH_SIZE)
+
+def init_email_queue(app):
+    """
+    Starts the queue's workers when the app loads, so messages an earlier
+    process left queued or mid-send are delivered without waiting for a new
+    email. Safe to call more than once; workers start once per process.
+    """
+    app.extensions['email_queue'] = email_queue
+    if QUEUE_ENABLED:
+        email_queue.start()
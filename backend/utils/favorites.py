@@ -0,0 +1,69 @@
+from firebase_admin import auth
+
+from utils.streaming import in_chunks
+
+# Favorites are stored twice: users/{uid}/favorites/{property_id} for a
+# user's own list, and the reverse index properties/{property_id}/favoritedBy/{uid}
+# so notifications about one listing read only the users who favorited it.
+# Both are written in the same batch (see backfill_favorites_index.py for
+# favorites created before the index existed).
+
+REVERSE_COLLECTION = 'favoritedBy'
+# auth.get_users accepts at most 100 identifiers per call
+AUTH_LOOKUP_CHUNK = 100
+# Two writes per favorite within Firestore's 500 writes per batch
+BATCH_FAVORITES = 250
+
+
+def favorite_refs(db, user_id, property_id):
+    """(users/{uid}/favorites/{pid}, properties/{pid}/favoritedBy/{uid})"""
+    return (db.collection('users').document(user_id).collection('favorites').document(property_id),
+            db.collection('properties').document(property_id).collection(REVERSE_COLLECTION).document(user_id))
+
+
+def save_favorite(db, user_id, property_id, added_at):
+    favorite_ref, reverse_ref = favorite_refs(db, user_id, property_id)
+    batch = db.batch()
+    batch.set(favorite_ref, {'addedAt': added_at})
+    batch.set(reverse_ref, {'userId': user_id, 'addedAt': added_at})
+    batch.commit()
+
+
+def delete_favorite(db, user_id, property_id):
+    batch = db.batch()
+    for ref in favorite_refs(db, user_id, property_id):
+        batch.delete(ref)
+    batch.commit()
+
+
+def delete_all_favorites(db, user_id):
+    """Deletes a user's favorites and their reverse index entries."""
+    favorites = db.collection('users').document(user_id).collection('favorites').stream()
+    removed = 0
+    for chunk in in_chunks(favorites, BATCH_FAVORITES):
+        batch = db.batch()
+        for favorite in chunk:
+            for ref in favorite_refs(db, user_id, favorite.id):
+                batch.delete(ref)
+        batch.commit()
+        removed += len(chunk)
+    return removed
+
+
+def favorited_by(db, property_id):
+    """User ids that favorited a property, from the reverse index."""
+    docs = db.collection('properties').document(property_id).collection(REVERSE_COLLECTION).stream()
+    return [doc.id for doc in docs]
+
+
+def user_emails(user_ids):
+    """Yields (uid, email) for users that exist and have an email address."""
+    for chunk in in_chunks(user_ids, AUTH_LOOKUP_CHUNK):
+        try:
+            result = auth.get_users([auth.UidIdentifier(uid) for uid in chunk])
+        except Exception as e:
+            print(f"Error looking up users: {e}")
+            continue
+        for user in result.users:
+            if user.email:
+                yield user.uid, user.email
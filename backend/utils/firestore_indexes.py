@@ -0,0 +1,98 @@
+import json
+
+# Derives the composite indexes Firestore needs for a query from the filters
+# and orderings it applies. A RecordingQuery stands in for a collection so the
+# routes' own query builders can be replayed without touching Firestore.
+#
+# Index layout: equality and `in` fields first (ascending), then the explicit
+# orderings, then any remaining inequality fields, which Firestore orders
+# implicitly in name order and in the direction of the last ordering.
+# A trailing __name__ in that same direction is implicit in every index.
+
+EQUALITY_OPS = ('==', 'in', 'array-contains', 'array-contains-any')
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+
+class RecordingQuery:
+    """Records where/order_by calls; everything else is a no-op."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.filters = []
+        self.orders = []
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string = filter.field_path, filter.op_string
+        self.filters.append((field_path, op_string))
+        return self
+
+    def order_by(self, field_path, direction=ASCENDING):
+        self.orders.append((field_path, DESCENDING if str(direction).upper() == DESCENDING else ASCENDING))
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    limit = offset = start_after = select
+
+
+def composite_index(query):
+    """Returns the index entry a recorded query needs, or None if single-field indexes serve it."""
+    equality = []
+    inequality = set()
+    for field, op in query.filters:
+        if op in EQUALITY_OPS:
+            if field not in equality:
+                equality.append(field)
+        else:
+            inequality.add(field)
+
+    fields = [(field, ASCENDING) for field in equality]
+    direction = ASCENDING
+    name_direction = None
+    for field, order in query.orders:
+        if field == '__name__':
+            name_direction = order
+        elif field not in equality:
+            fields.append((field, order))
+            direction = order
+    ordered = {field for field, _ in fields}
+    fields += [(field, direction) for field in sorted(inequality - ordered)]
+    # Only a tie-break against the index direction has to be spelled out
+    if name_direction and name_direction != direction:
+        fields.append(('__name__', name_direction))
+    if len(fields) < 2:
+        return None
+    return {
+        "collectionGroup": query.collection,
+        "queryScope": "COLLECTION",
+        "fields": [{"fieldPath": field, "order": order} for field, order in fields],
+    }
+
+
+def unique_indexes(queries):
+    """Composite indexes for the recorded queries, deduplicated and in a stable order."""
+    indexes = {}
+    for query in queries:
+        index = composite_index(query)
+        if index:
+            indexes[json.dumps(index, sort_keys=True)] = index
+    return sorted(indexes.values(), key=lambda i: (i['collectionGroup'], [(f['fieldPath'], f['order']) for f in i['fields']]))
+
+
+def dumps(indexes, field_overrides=()):
+    """Formats firestore.indexes.json with one line per indexed field."""
+    entries = []
+    for index in indexes:
+        fields = ',\n'.join(f'        {{ "fieldPath": "{f["fieldPath"]}", "order": "{f["order"]}" }}' for f in index['fields'])
+        entries.append('    {\n'
+                       f'      "collectionGroup": "{index["collectionGroup"]}",\n'
+                       f'      "queryScope": "{index["queryScope"]}",\n'
+                       '      "fields": [\n'
+                       f'{fields}\n'
+                       '      ]\n'
+                       '    }')
+    overrides = json.dumps(list(field_overrides))
+    return '{\n  "indexes": [\n' + ',\n'.join(entries) + f'\n  ],\n  "fieldOverrides": {overrides}\n}}\n'
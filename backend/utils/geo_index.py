@@ -0,0 +1,89 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+# Uniform lat/lng grid over store rows. A bounding box (or the box around a
+# radius) only visits the cells it overlaps; exact distances are then
+# computed on the coordinate columns for those rows alone.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+# ~1.1 km cells: a city-level map viewport covers a few hundred of them
+CELL_DEGREES = 0.01
+# Past this many cells a column scan is cheaper than walking the grid
+MAX_CELLS = 20000
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance in km from (lat, lng) to arrays of points."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def radius_bbox(lat, lng, radius_km):
+    """The (south, west, north, east) box enclosing a circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return (max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0))
+
+
+class GeoGrid:
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells = defaultdict(set)
+        self._row_cell = {}
+
+    def __len__(self):
+        return len(self._row_cell)
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def add(self, row, lat, lng):
+        """Places row in the cell of (lat, lng), moving it if it was elsewhere."""
+        cell = self._cell(lat, lng)
+        previous = self._row_cell.get(row)
+        if previous == cell:
+            return
+        if previous is not None:
+            self._drop(row, previous)
+        self._cells[cell].add(row)
+        self._row_cell[row] = cell
+
+    def discard(self, row):
+        cell = self._row_cell.pop(row, None)
+        if cell is not None:
+            self._drop(row, cell)
+
+    def _drop(self, row, cell):
+        rows = self._cells[cell]
+        rows.discard(row)
+        if not rows:
+            del self._cells[cell]
+
+    def rows_in_bbox(self, south, west, north, east):
+        """
+        Sorted rows whose cell overlaps the box, or None when the box spans
+        too many cells to be worth walking. Callers still check exact bounds.
+        """
+        lat0, lng0 = self._cell(south, west)
+        lat1, lng1 = self._cell(north, east)
+        n_cells = (lat1 - lat0 + 1) * (lng1 - lng0 + 1)
+        if n_cells > MAX_CELLS:
+            return None
+        rows = []
+        if n_cells > len(self._cells):
+            # Sparse grid: checking the occupied cells is cheaper
+            for (i, j), cell_rows in self._cells.items():
+                if lat0 <= i <= lat1 and lng0 <= j <= lng1:
+                    rows.extend(cell_rows)
+        else:
+            for i in range(lat0, lat1 + 1):
+                for j in range(lng0, lng1 + 1):
+                    cell_rows = self._cells.get((i, j))
+                    if cell_rows:
+                        rows.extend(cell_rows)
+        return np.sort(np.array(rows, dtype=np.int64))
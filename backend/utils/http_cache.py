@@ -0,0 +1,50 @@
+import hashlib
+from flask import request, jsonify, make_response
+
+from utils.compression import ENCODINGS, encoded_etag
+
+# Conditional GET helpers. Handlers that can compute a validator cheaply
+# (document update time) pass it in and skip building and serialising the
+# body on a match; otherwise the ETag is a hash of the body.
+
+# Cache-Control values for the public read endpoints
+LIST_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=60"
+DETAIL_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+BLOG_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=3600"
+
+
+def etag_for(*parts):
+    """Opaque tag for a tuple of validator parts (versions, ids, timestamps)."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def _matched_tag(tag):
+    """The tag, or the tag of one of its encoded variants, that If-None-Match holds."""
+    for candidate in (tag, *(encoded_etag(tag, encoding) for encoding in ENCODINGS)):
+        if request.if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def conditional_json(build, tag=None, weak=False, cache_control=LIST_CACHE_CONTROL, last_modified=None):
+    """
+    Returns build()'s result as JSON, or an empty 304 when the client's
+    If-None-Match already holds the current tag (or that of a compressed
+    variant, which the 304 then echoes). Without a tag, the body is built and
+    its hash becomes a strong ETag.
+    """
+    matched = _matched_tag(tag) if tag is not None else None
+    if matched is None:
+        response = make_response(jsonify(build()), 200)
+        if tag is None:
+            tag = hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+            matched = _matched_tag(tag)
+    if matched is not None:
+        response = make_response('', 304)
+        tag = matched
+
+    response.set_etag(tag, weak=weak)
+    response.headers['Cache-Control'] = cache_control
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
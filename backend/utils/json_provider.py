@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import date, datetime, timezone
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+from google.cloud.firestore_v1 import GeoPoint, transforms
+from google.cloud.firestore_v1.document import DocumentReference
+from google.cloud.firestore_v1.transforms import Sentinel, SERVER_TIMESTAMP
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder with the same type handling
+    orjson = None
+
+# One place that decides how Firestore values look in API responses:
+#   datetimes (incl. DatetimeWithNanoseconds) -> ISO 8601 strings
+#   SERVER_TIMESTAMP                          -> the current time (what the server will store)
+#   other sentinels and transforms (DELETE_FIELD, Increment, ...) -> null
+#   GeoPoint                                  -> {"lat": ..., "lng": ...}, like listing coordinates
+#   DocumentReference                         -> its path
+
+
+def encode_value(value):
+    """JSON-friendly form of a value the serialiser does not handle natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc).isoformat()
+    if isinstance(value, Sentinel) or type(value).__module__ == transforms.__name__:
+        return None
+    if isinstance(value, GeoPoint):
+        return {"lat": value.latitude, "lng": value.longitude}
+    if isinstance(value, DocumentReference):
+        return value.path
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FirestoreJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson that understands Firestore value types."""
+
+    # orjson keeps insertion order; sorting keys costs more than it is worth here
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            # Datetime subclasses and sets go through encode_value
+            return orjson.dumps(obj, default=encode_value, option=orjson.OPT_NON_STR_KEYS).decode()
+        kwargs.setdefault('default', encode_value)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=encode_value, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = self.dumps(obj) + "\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,273 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from utils.property_catalog import price_value
+from utils.search_index import TOKEN_RE, tokenize
+
+# Percolator for standing queries: active property requests and users'
+# saved searches are held in memory so a new or updated listing can be
+# matched against all of them without reading Firestore.
+#
+# Queries are partitioned by property type (None for "any type") and by a
+# key taken from their text (the longest word of the request's location or
+# the saved search's query, cut to MAX_KEY_LENGTH; None when there is none).
+# Text conditions are substring tests, so a word of the query ("mum", the
+# "6" of "sec 6") lies somewhere inside a word of every listing it matches:
+# a listing visits the groups for its own type and "any", crossed with every
+# substring of its title and location words of a length some key has, plus
+# None. Inside a group, queries are sorted by minimum price so
+# the ones whose range can contain the listing's price are a prefix found by
+# bisection; maximum price and bedroom thresholds are checked on that prefix
+# with NumPy. Candidates are then verified with the exact text condition.
+
+# Without write-through from this process, reload after this many seconds
+MAX_STALENESS = int(os.getenv('PERCOLATOR_MAX_STALENESS', '300'))
+
+REQUEST = 'request'
+SAVED_SEARCH = 'saved_search'
+ANY_TYPES = {'', 'any', 'all'}
+# Longer keys split queries more finely but make listings look up more substrings
+MAX_KEY_LENGTH = 8
+# Subject used for property request notifications
+REQUEST_MATCH_NAME = "Property Request Match"
+
+
+def _number(value, default):
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+class StandingQuery:
+    __slots__ = ('id', 'kind', 'owner', 'name', 'min_price', 'max_price', 'bedrooms', 'type', 'text', 'text_fields')
+
+    def __init__(self, query_id, kind, owner, name, min_price, max_price, bedrooms, prop_type, text, text_fields):
+        self.id = query_id
+        self.kind = kind
+        self.owner = owner
+        self.name = name
+        self.min_price = min_price
+        self.max_price = max_price
+        self.bedrooms = bedrooms
+        self.type = None if prop_type is None or str(prop_type).strip().lower() in ANY_TYPES else prop_type
+        self.text = (text or '').strip().lower()
+        self.text_fields = text_fields
+
+    @classmethod
+    def from_request(cls, request_id, data):
+        """A property_requests document: criteria {minPrice, maxPrice, bedrooms, location, type}."""
+        criteria = data.get('criteria') or {}
+        return cls(request_query_id(request_id), REQUEST, data.get('user_id'), REQUEST_MATCH_NAME,
+                   _number(criteria.get('minPrice'), 0), _number(criteria.get('maxPrice'), 1000000000),
+                   _number(criteria.get('bedrooms'), 0), criteria.get('type'), criteria.get('location'),
+                   ('location',))
+
+    @classmethod
+    def from_saved_search(cls, user_id, search_id, data):
+        """A users/{uid}/savedSearches document: {name, filters {minPrice, maxPrice, bedrooms, propertyType, searchQuery}}."""
+        filters = data.get('filters') or {}
+        return cls(saved_search_query_id(user_id, search_id), SAVED_SEARCH, user_id, data.get('name') or 'Saved search',
+                   _number(filters.get('minPrice'), 0), _number(filters.get('maxPrice'), float('inf')),
+                   _number(filters.get('bedrooms'), 0), filters.get('propertyType'), filters.get('searchQuery'),
+                   ('title', 'location'))
+
+    def key_token(self):
+        tokens = tokenize(self.text)
+        return max(tokens, key=len)[:MAX_KEY_LENGTH] if tokens else None
+
+    def matches(self, prop_data):
+        """The full condition, evaluated directly (used to verify candidates)."""
+        price = price_value(prop_data)
+        if not self.min_price <= price <= self.max_price:
+            return False
+        if _number(prop_data.get('bedrooms'), 0) < self.bedrooms:
+            return False
+        if self.type is not None and self.type != prop_data.get('type'):
+            return False
+        return self.text_matches(prop_data)
+
+    def text_matches(self, prop_data):
+        if not self.text:
+            return True
+        return any(self.text in str(prop_data.get(field) or '').lower() for field in self.text_fields)
+
+
+def request_query_id(request_id):
+    return f"{REQUEST}:{request_id}"
+
+
+def saved_search_query_id(user_id, search_id):
+    return f"{SAVED_SEARCH}:{user_id}/{search_id}"
+
+
+class _Group:
+    """Queries sharing a (type, token) key, with arrays sorted by minimum price."""
+
+    def __init__(self):
+        self.queries = {}
+        self._arrays = None
+
+    def add(self, query):
+        self.queries[query.id] = query
+        self._arrays = None
+
+    def discard(self, query_id):
+        self.queries.pop(query_id, None)
+        self._arrays = None
+
+    def _build(self):
+        queries = sorted(self.queries.values(), key=lambda q: q.min_price)
+        self._arrays = (
+            queries,
+            np.array([q.min_price for q in queries], dtype=np.float64),
+            np.array([q.max_price for q in queries], dtype=np.float64),
+            np.array([q.bedrooms for q in queries], dtype=np.float64),
+        )
+        return self._arrays
+
+    def candidates(self, price, bedrooms):
+        queries, mins, maxs, beds = self._arrays or self._build()
+        end = int(np.searchsorted(mins, price, side='right'))
+        if not end:
+            return []
+        hits = np.flatnonzero((maxs[:end] >= price) & (beds[:end] <= bedrooms))
+        return [queries[i] for i in hits]
+
+
+class Percolator:
+    def __init__(self, max_staleness=MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._lock = threading.RLock()
+        self._queries = {}
+        self._groups = defaultdict(_Group)
+        self._key_lengths = defaultdict(int)
+        self._loaded = False
+        self._last_sync = None
+        self.matches = 0
+        self.reloads = 0
+
+    def __len__(self):
+        return len(self._queries)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    # --- Loading ---
+
+    def ensure_loaded(self, db):
+        if self._loaded and time.time() - self._last_sync <= self.max_staleness:
+            return
+        with self._lock:
+            if self._loaded and time.time() - self._last_sync <= self.max_staleness:
+                return
+            self.load(standing_queries(db))
+
+    def load(self, queries):
+        with self._lock:
+            self._queries = {}
+            self._groups = defaultdict(_Group)
+            self._key_lengths = defaultdict(int)
+            for query in queries:
+                self._add(query)
+            self._loaded = True
+            self._last_sync = time.time()
+            self.reloads += 1
+
+    # --- Write-through hooks ---
+    # Before the first load these are no-ops; the load reads the current state.
+
+    def add(self, query):
+        if not self._loaded:
+            return
+        with self._lock:
+            self._add(query)
+
+    def remove(self, query_id):
+        if not self._loaded:
+            return
+        with self._lock:
+            self._remove(query_id)
+
+    def _add(self, query):
+        self._remove(query.id)
+        key = (query.type, query.key_token())
+        self._queries[query.id] = (query, key)
+        self._groups[key].add(query)
+        if key[1] is not None:
+            self._key_lengths[len(key[1])] += 1
+
+    def _remove(self, query_id):
+        entry = self._queries.pop(query_id, None)
+        if entry is None:
+            return
+        query, key = entry
+        if key[1] is not None:
+            self._key_lengths[len(key[1])] -= 1
+            if not self._key_lengths[len(key[1])]:
+                del self._key_lengths[len(key[1])]
+        group = self._groups[key]
+        group.discard(query_id)
+        if not group.queries:
+            del self._groups[key]
+
+    # --- Matching ---
+
+    def _lookup_keys(self, prop_data):
+        """Substrings of the listing's title and location words that some query key could be."""
+        words = set(TOKEN_RE.findall(f"{prop_data.get('title') or ''} {prop_data.get('location') or ''}".lower()))
+        keys = {None}
+        for length in self._key_lengths:
+            for word in words:
+                keys.update(word[i:i + length] for i in range(len(word) - length + 1))
+        return keys
+
+    def match(self, prop_data):
+        """Standing queries the listing satisfies."""
+        price = price_value(prop_data)
+        bedrooms = _number(prop_data.get('bedrooms'), 0)
+        types = {prop_data.get('type'), None}
+        with self._lock:
+            keys = self._lookup_keys(prop_data)
+            matched = []
+            for prop_type in types:
+                for token in keys:
+                    group = self._groups.get((prop_type, token))
+                    if group is None:
+                        continue
+                    matched += [q for q in group.candidates(price, bedrooms) if q.text_matches(prop_data)]
+            self.matches += 1
+            return matched
+
+    def stats(self):
+        with self._lock:
+            kinds = defaultdict(int)
+            for query, _ in self._queries.values():
+                kinds[query.kind] += 1
+            return {
+                "loaded": self._loaded,
+                "queries": len(self._queries),
+                "by_kind": dict(kinds),
+                "groups": len(self._groups),
+                "largest_group": max((len(g.queries) for g in self._groups.values()), default=0),
+                "matches": self.matches,
+                "reloads": self.reloads,
+            }
+
+
+def standing_queries(db):
+    """Streams every active property request and saved search."""
+    for doc in db.collection('property_requests').where('status', '==', 'active').stream():
+        yield StandingQuery.from_request(doc.id, doc.to_dict())
+    for doc in db.collection_group('savedSearches').stream():
+        user_ref = doc.reference.parent.parent
+        if user_ref is not None:
+            yield StandingQuery.from_saved_search(user_ref.id, doc.id, doc.to_dict())
+
+
+percolator = Percolator()
@@ -0,0 +1,52 @@
+# Fetches many property documents in one Firestore round trip instead of
+# one get() per id.
+
+# Upper bound on ids per batch request
+MAX_BATCH_IDS = 100
+# Documents per get_all call; larger lists (admin screens) take a few calls
+GET_ALL_CHUNK = 300
+
+
+def fetch_properties(db, property_ids, fields=None):
+    """
+    Reads properties by id with one db.get_all call per GET_ALL_CHUNK ids.
+
+    Returns (properties, missing): properties keeps the order of the
+    requested ids (duplicates collapsed) and carries each document's id;
+    missing lists the ids that do not exist. fields optionally limits the
+    document fields that are read.
+    """
+    ids = list(dict.fromkeys(pid for pid in property_ids if pid))
+    if not ids:
+        return [], []
+
+    collection = db.collection('properties')
+    field_paths = list(fields) if fields else None
+    found = {}
+    for start in range(0, len(ids), GET_ALL_CHUNK):
+        refs = [collection.document(pid) for pid in ids[start:start + GET_ALL_CHUNK]]
+        # get_all streams results in arbitrary order
+        for doc in db.get_all(refs, field_paths=field_paths):
+            if doc.exists:
+                prop_data = doc.to_dict()
+                prop_data['id'] = doc.id
+                found[doc.id] = prop_data
+
+    properties = [found[pid] for pid in ids if pid in found]
+    missing = [pid for pid in ids if pid not in found]
+    return properties, missing
+
+
+def fetch_properties_by_id(db, property_ids, fields=None):
+    """Same as fetch_properties, as a {property_id: property} mapping."""
+    properties, _ = fetch_properties(db, property_ids, fields)
+    return {p['id']: p for p in properties}
+
+
+def property_summary(prop_data):
+    """Title and cover image shown next to inquiries and appointments."""
+    images = prop_data.get('images')
+    return {
+        'property_title': prop_data.get('title', 'Unknown Property'),
+        'property_image': images[0] if images else prop_data.get('imageUrl')
+    }
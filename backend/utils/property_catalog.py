@@ -0,0 +1,349 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from utils.search_index import SearchIndex, text_matches, tokenize
+from utils.property_store import ColumnarStore
+
+# Process-wide, in-memory copy of the 'properties' collection.
+# Loaded once, then kept current by a Firestore snapshot listener and by
+# write-through calls from the property write handlers.
+CACHE_ENABLED = os.getenv('PROPERTY_CACHE_ENABLED', 'True') == 'True'
+USE_LISTENER = os.getenv('PROPERTY_CACHE_LISTENER', 'True') == 'True'
+# Without a live listener, reload after this many seconds
+MAX_STALENESS = int(os.getenv('PROPERTY_CACHE_MAX_STALENESS', '300'))
+LISTENER_TIMEOUT = 30
+
+
+def created_timestamp(prop_data):
+    """
+    Returns the createdAt of a property as epoch seconds (0 if unknown).
+    createdAt may be a Firestore timestamp, an ISO string or missing.
+    """
+    created = prop_data.get('createdAt')
+    if isinstance(created, datetime):
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return created.timestamp()
+    if isinstance(created, str):
+        try:
+            return created_timestamp({'createdAt': datetime.fromisoformat(created)})
+        except ValueError:
+            return 0
+    return 0
+
+
+def parse_price(price_str):
+    try:
+        return int(float(str(price_str).replace('₹', '').replace(',', '').strip()))
+    except:
+        return 0
+
+def price_value(prop_data):
+    """
+    Returns the canonical integer price of a property, falling back to
+    parsing the display string for documents written before priceValue.
+    """
+    value = prop_data.get('priceValue')
+    if isinstance(value, int):
+        return value
+    return parse_price(prop_data.get('price'))
+
+
+class PropertyCatalog:
+    def __init__(self, collection_ref, enabled=CACHE_ENABLED, use_listener=USE_LISTENER,
+                 max_staleness=MAX_STALENESS):
+        # collection_ref is a callable so tests can patch the module level db
+        self._collection_ref = collection_ref
+        self.enabled = enabled
+        self.use_listener = use_listener
+        self.max_staleness = max_staleness
+
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._loaded = False
+        self._watch = None
+        self._last_sync = None
+        # Optional callback(property_ids) for changes that arrive from Firestore;
+        # None means everything may have changed
+        self.on_change = None
+        self.search_index = SearchIndex()
+        self.store = ColumnarStore(price_value, created_timestamp)
+
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.listener_events = 0
+
+    # --- Loading ---
+
+    @property
+    def listening(self):
+        return self._watch is not None and getattr(self._watch, 'is_active', True)
+
+    def _is_stale(self):
+        if not self._loaded:
+            return True
+        if self.listening:
+            return False
+        return time.time() - self._last_sync > self.max_staleness
+
+    def ensure_loaded(self):
+        if not self._is_stale():
+            self.hits += 1
+            return
+        with self._lock:
+            if not self._is_stale():
+                self.hits += 1
+                return
+            self.misses += 1
+            self.reload()
+
+    def reload(self):
+        """
+        (Re)builds the catalog. Prefers a snapshot listener, whose first
+        snapshot carries the whole collection; falls back to a full stream.
+        """
+        with self._lock:
+            self._stop_listener()
+            if not (self.use_listener and self._start_listener()):
+                docs = {}
+                for doc in self._collection_ref().stream():
+                    docs[doc.id] = self._prepare(doc.id, doc.to_dict())
+                self._replace_all(docs)
+            self.reloads += 1
+
+    def _start_listener(self):
+        first_snapshot = threading.Event()
+        initial = {}
+
+        def on_snapshot(col_snapshot, changes, read_time):
+            # Runs on the watch thread; the first snapshot is handed back to
+            # reload(), which still holds the lock
+            if not first_snapshot.is_set():
+                initial['docs'] = {doc.id: self._prepare(doc.id, doc.to_dict()) for doc in col_snapshot}
+                first_snapshot.set()
+                return
+            self._apply_changes(changes)
+
+        try:
+            self._watch = self._collection_ref().on_snapshot(on_snapshot)
+        except Exception as e:
+            print(f"Property catalog listener unavailable: {e}")
+            self._watch = None
+            return False
+
+        if not first_snapshot.wait(LISTENER_TIMEOUT):
+            print("Property catalog listener timed out, falling back to stream")
+            self._stop_listener()
+            return False
+        self._replace_all(initial['docs'])
+        return True
+
+    def _stop_listener(self):
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                print(f"Error stopping property catalog listener: {e}")
+            self._watch = None
+
+    def _apply_changes(self, changes):
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                if change.type.name == 'REMOVED':
+                    self._docs.pop(doc.id, None)
+                    self.search_index.remove(doc.id)
+                    self.store.remove(doc.id)
+                else:
+                    self._store(self._prepare(doc.id, doc.to_dict()))
+                self.listener_events += 1
+            self._touch()
+        self._notify([change.document.id for change in changes])
+
+    def _replace_all(self, docs):
+        with self._lock:
+            self._docs = docs
+            self.search_index.rebuild(docs.items())
+            self.store.rebuild(docs)
+            was_loaded = self._loaded
+            self._loaded = True
+            self._touch()
+        if was_loaded:
+            self._notify(None)
+
+    def _notify(self, property_ids):
+        if self.on_change is not None:
+            try:
+                self.on_change(property_ids)
+            except Exception as e:
+                print(f"Property catalog change callback failed: {e}")
+
+    def _touch(self):
+        self.version += 1
+        self._last_sync = time.time()
+
+    def _store(self, prop_data):
+        self._docs[prop_data['id']] = prop_data
+        self.search_index.add(prop_data['id'], prop_data)
+        self.store.upsert(prop_data['id'], prop_data)
+
+    def _prepare(self, property_id, prop_data):
+        prop_data = dict(prop_data or {})
+        prop_data['id'] = property_id
+        return prop_data
+
+    # --- Write-through hooks ---
+
+    def upsert(self, property_id, prop_data):
+        """Adds or replaces a property after a successful write."""
+        if not self._loaded:
+            return
+        prop_data = dict(prop_data)
+        # Placeholder until the listener delivers the server value
+        if prop_data.get('createdAt') is not None and not isinstance(prop_data['createdAt'], (datetime, str)):
+            prop_data['createdAt'] = datetime.now(timezone.utc)
+        with self._lock:
+            self._store(self._prepare(property_id, prop_data))
+            self._touch()
+
+    def patch(self, property_id, changes):
+        """Merges a partial update into a cached property."""
+        if not self._loaded:
+            return
+        with self._lock:
+            current = self._docs.get(property_id)
+            if current is None:
+                return
+            updated = dict(current)
+            updated.update(changes)
+            self._store(self._prepare(property_id, updated))
+            self._touch()
+
+    def remove(self, property_id):
+        if not self._loaded:
+            return
+        with self._lock:
+            if self._docs.pop(property_id, None) is not None:
+                self.search_index.remove(property_id)
+                self.store.remove(property_id)
+                self._touch()
+
+    # --- Reads ---
+
+    def query(self, min_price=None, max_price=None, bedrooms=None, prop_types=None, statuses=None,
+              amenities=None, search=None, bbox=None, near=None, sort_by='newest', cursor=None,
+              offset=0, limit=9):
+        """
+        Filters, sorts and pages the catalog on its columns and bitmaps.
+
+        Returns (properties, total, has_more, last_key) where last_key is the
+        (value, id) sort key of the last property on the page. With near set,
+        properties carry their distance_km.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            store = self.store
+            scores, candidates = self._search_rows(search)
+            rows = store.filter_rows(min_price=min_price, max_price=max_price, bedrooms=bedrooms,
+                                     prop_types=prop_types, statuses=statuses, amenities=amenities,
+                                     candidates=candidates, bbox=bbox, near=near)
+
+            if sort_by == 'distance' and near:
+                values = store.distances(rows, near[0], near[1])
+            elif sort_by == 'relevance' and scores is not None:
+                values = np.array([scores[store.id_of(row)] for row in rows], dtype=np.float64)
+            elif sort_by in ('price_asc', 'price_desc'):
+                values = store.columns['price'][rows]
+            else:
+                values = store.columns['created'][rows]
+
+            page_rows, page_values, has_more = store.select(
+                rows, values, descending=sort_by not in ('price_asc', 'distance'), cursor=cursor,
+                offset=offset, limit=limit)
+
+            properties = [store.payload(row) for row in page_rows]
+            if near:
+                # Copies, the cached dicts are shared between requests
+                distances = store.distances(page_rows, near[0], near[1])
+                properties = [dict(p, distance_km=round(float(d), 3)) for p, d in zip(properties, distances)]
+            last_key = (page_values[-1].item(), properties[-1]['id']) if properties else None
+            return properties, len(rows), has_more, last_key
+
+    def _search_rows(self, search):
+        """(scores, candidate rows) for a search query; (None, None) without one."""
+        if not search:
+            return None, None
+        if not tokenize(search):
+            # Nothing to look up, match it as text like the Firestore path does
+            rows = self.store.filter_rows()
+            return None, rows[np.array([text_matches(self.store.payload(row), search) for row in rows.tolist()], dtype=bool)]
+        # Ranked lookup in the inverted index instead of scanning every listing
+        scores = self.search_index.search(search)
+        return scores, self.store.rows_for(scores)
+
+    def match_query(self, query, limit=10, exclude_statuses=('sold',)):
+        """
+        Newest listings that satisfy a standing query (see utils.percolator),
+        narrowed through the bitmaps and price column before the exact check,
+        so it does not walk the catalog. The location text is a substring
+        test, which the token index cannot narrow without losing matches.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            store = self.store
+            max_price = query.max_price if math.isfinite(query.max_price) else None
+            rows = store.filter_rows(min_price=query.min_price or None, max_price=max_price,
+                                     bedrooms=int(query.bedrooms) or None,
+                                     prop_types=[query.type] if query.type else None)
+
+            order = np.argsort(-store.columns['created'][rows], kind='stable')
+            matches = []
+            for row in rows[order]:
+                prop_data = store.payload(row)
+                if prop_data.get('status') in exclude_statuses or not query.matches(prop_data):
+                    continue
+                matches.append(prop_data)
+                if len(matches) == limit:
+                    break
+            return matches
+
+    def facets(self, min_price=None, max_price=None, bedrooms=None, prop_types=None, statuses=None,
+               amenities=None, search=None, bbox=None, near=None, price_buckets=10):
+        """
+        Counts per type, bedroom count and locality plus a price histogram for
+        the properties matching a listing query; see ColumnarStore.facets.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            store = self.store
+            _, candidates = self._search_rows(search)
+            return store.facets(min_price=min_price, max_price=max_price, bedrooms=bedrooms, prop_types=prop_types,
+                                statuses=statuses, amenities=amenities, candidates=candidates, bbox=bbox, near=near,
+                                price_buckets=price_buckets)
+
+    def clusters(self, bbox, zoom):
+        """Pre-aggregated map markers for a viewport; see ColumnarStore.cluster_view."""
+        self.ensure_loaded()
+        return self.store.cluster_view(bbox, zoom)
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "loaded": self._loaded,
+            "listening": self.listening,
+            "size": len(self._docs),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            "reloads": self.reloads,
+            "listener_events": self.listener_events,
+            "last_sync": datetime.fromtimestamp(self._last_sync, timezone.utc).isoformat() if self._last_sync else None,
+            "staleness_seconds": round(time.time() - self._last_sync, 3) if self._last_sync else None
+        }
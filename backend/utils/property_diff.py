@@ -0,0 +1,40 @@
+from utils.property_catalog import price_value
+
+# Field-level diffs between a stored listing and an update to it, used for
+# history entries and to decide which downstream events an update raises.
+
+# Derived from other fields; they change with them and are not reported
+DERIVED_FIELDS = {'priceValue'}
+# Fields a property request's criteria look at
+MATCH_FIELDS = {'price', 'priceValue', 'bedrooms', 'type', 'location'}
+FIELD_LABELS = {'title': 'Title', 'type': 'Type', 'status': 'Status', 'price': 'Price'}
+
+
+def diff_fields(old_data, changes):
+    """Returns [{"field", "old", "new"}] for every field the update changes."""
+    diff = []
+    for field, new in changes.items():
+        if field in DERIVED_FIELDS:
+            continue
+        old = old_data.get(field)
+        if old != new:
+            diff.append({"field": field, "old": old, "new": new})
+    return diff
+
+
+def field_label(field):
+    return FIELD_LABELS.get(field, field)
+
+
+def price_change(old_data, new_data):
+    """(old, new) integer prices when the update changes the price, else None."""
+    if 'price' not in new_data:
+        return None
+    old_price, new_price = price_value(old_data), price_value(new_data)
+    if old_price == new_price:
+        return None
+    return old_price, new_price
+
+
+def touches_match_fields(diff):
+    return any(change['field'] in MATCH_FIELDS for change in diff)
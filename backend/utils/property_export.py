@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.json_provider import encode_value
+from utils.property_catalog import price_value
+from utils.streaming import in_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is unavailable without pyarrow
+    pa = pq = None
+
+# Full-catalogue export for reporting jobs. Listings arrive as a stream and
+# leave as one: history counts are fetched per chunk of listings, CSV is
+# written per chunk and Parquet per row group, so memory stays bounded by
+# EXPORT_CHUNK rows whatever the catalogue size.
+#
+# CSV uses the same columns import_properties.py reads, so an export can be
+# re-imported as is: amenities keep their original names, types and
+# distances (a JSON array in CSV, structs in Parquet).
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+EXPORT_CHUNK = 500
+HISTORY_COUNT_WORKERS = 8
+
+COLUMNS = ['id', 'title', 'type', 'status', 'price', 'priceValue', 'location', 'bedrooms', 'bathrooms',
+           'area', 'lat', 'lng', 'amenities', 'images', 'views', 'historyCount', 'createdAt']
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _history_count(collection, property_id):
+    try:
+        return collection.document(property_id).collection('history').count().get()[0][0].value
+    except Exception as e:
+        print(f"Error counting history for {property_id}: {e}")
+        return None
+
+
+def with_history_counts(collection, properties, chunk_size=EXPORT_CHUNK):
+    """Adds historyCount to each property; counts run concurrently per chunk."""
+    with ThreadPoolExecutor(max_workers=HISTORY_COUNT_WORKERS) as pool:
+        for chunk in in_chunks(properties, chunk_size):
+            counts = pool.map(lambda p: _history_count(collection, p['id']), chunk)
+            for prop_data, count in zip(chunk, counts):
+                prop_data['historyCount'] = count
+                yield prop_data
+
+
+def flat_record(prop_data):
+    """One listing as a flat row of COLUMNS."""
+    coordinates = prop_data.get('coordinates') or {}
+    created = prop_data.get('createdAt')
+    return {
+        'id': prop_data.get('id'),
+        'title': prop_data.get('title'),
+        'type': prop_data.get('type'),
+        'status': prop_data.get('status'),
+        'price': None if prop_data.get('price') is None else str(prop_data.get('price')),
+        'priceValue': price_value(prop_data),
+        'location': prop_data.get('location'),
+        'bedrooms': _number(prop_data.get('bedrooms')),
+        'bathrooms': _number(prop_data.get('bathrooms')),
+        'area': _number(prop_data.get('area')),
+        'lat': _number(coordinates.get('lat')) if isinstance(coordinates, dict) else None,
+        'lng': _number(coordinates.get('lng')) if isinstance(coordinates, dict) else None,
+        'amenities': _amenities(prop_data),
+        'images': [str(i) for i in prop_data.get('images') or []],
+        'views': int(prop_data.get('views') or 0),
+        'historyCount': prop_data.get('historyCount'),
+        'createdAt': encode_value(created) if created is not None and not isinstance(created, str) else created,
+    }
+
+
+def _amenities(prop_data):
+    """Amenities as stored: {name, type, distance} objects or, on older listings, plain names."""
+    amenities = prop_data.get('amenities')
+    if not isinstance(amenities, list):
+        return []
+    return [a for a in amenities if isinstance(a, (dict, str))]
+
+
+def _amenity_struct(amenity):
+    if isinstance(amenity, str):
+        return {'name': amenity, 'type': None, 'distance': None}
+    return {field: None if amenity.get(field) is None else str(amenity.get(field))
+            for field in ('name', 'type', 'distance')}
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None and value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _csv_value(column, value):
+    if column == 'amenities':
+        # JSON keeps each amenity's type and distance; the importer reads it back as is
+        return json.dumps(value, ensure_ascii=False, default=str) if value else ''
+    if isinstance(value, list):
+        return '|'.join(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def csv_chunks(properties, chunk_size=EXPORT_CHUNK):
+    """Yields CSV text, header first, one chunk per chunk_size listings."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for chunk in in_chunks(properties, chunk_size):
+        for prop_data in chunk:
+            writer.writerow({k: _csv_value(k, v) for k, v in flat_record(prop_data).items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def parquet_schema():
+    string, number = pa.string(), pa.float64()
+    return pa.schema([
+        ('id', string), ('title', string), ('type', string), ('status', string), ('price', string),
+        ('priceValue', pa.int64()), ('location', string), ('bedrooms', number), ('bathrooms', number),
+        ('area', number), ('lat', number), ('lng', number),
+        ('amenities', pa.list_(pa.struct([('name', string), ('type', string), ('distance', string)]))),
+        ('images', pa.list_(string)), ('views', pa.int64()), ('historyCount', pa.int64()),
+        ('createdAt', string),
+    ])
+
+
+class _Drain:
+    """Write-only sink whose bytes are handed out as they are produced."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(properties, chunk_size=EXPORT_CHUNK):
+    """Yields a Parquet file as bytes, one row group per chunk_size listings."""
+    schema = parquet_schema()
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for chunk in in_chunks(properties, chunk_size):
+            records = [flat_record(p) for p in chunk]
+            for record in records:
+                record['amenities'] = [_amenity_struct(a) for a in record['amenities']]
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.take()
@@ -0,0 +1,77 @@
+# Sparse fieldsets for property responses. A client asks for fields=a,b or
+# a named preset; Firestore reads are narrowed with select() and cached
+# documents are projected before serialising.
+
+CARD_FIELDS = ['title', 'price', 'priceValue', 'location', 'type', 'status', 'bedrooms', 'bathrooms',
+               'area', 'imageUrl', 'images', 'createdAt']
+MAP_FIELDS = ['title', 'price', 'priceValue', 'location', 'type', 'coordinates', 'imageUrl', 'images']
+
+# preset -> (fields, images kept); None fields means the whole document
+PRESETS = {
+    'card': (CARD_FIELDS, 1),
+    'map': (MAP_FIELDS, 1),
+    'detail': (None, None)
+}
+
+# Computed by the server, never stored on the document
+COMPUTED_FIELDS = {'id', 'distance_km'}
+
+
+class FieldSet:
+    def __init__(self, fields=None, max_images=None):
+        self.fields = list(dict.fromkeys(fields)) if fields is not None else None
+        self.max_images = max_images
+
+    @property
+    def is_full(self):
+        return self.fields is None and self.max_images is None
+
+    def select_paths(self, extra=()):
+        """Document field paths to read from Firestore, or None for all fields."""
+        if self.fields is None:
+            return None
+        return [f for f in dict.fromkeys(self.fields + list(extra)) if f not in COMPUTED_FIELDS]
+
+    def project(self, prop_data):
+        """Returns a trimmed copy of a property; the input is never modified."""
+        if self.is_full:
+            return prop_data
+        if self.fields is None:
+            projected = dict(prop_data)
+        else:
+            projected = {f: prop_data[f] for f in self.fields if f in prop_data}
+            for field in COMPUTED_FIELDS:
+                if field in prop_data:
+                    projected[field] = prop_data[field]
+        images = projected.get('images')
+        if self.max_images is not None and isinstance(images, list):
+            projected['images'] = images[:self.max_images]
+        return projected
+
+
+def parse_fields(spec):
+    """
+    Parses a fields= value: a preset name (card, map, detail), a comma
+    separated list of document fields, or both ("card,description").
+    Empty means the whole document.
+    """
+    names = [n.strip() for n in (spec or '').split(',') if n.strip()]
+    if not names:
+        return FieldSet()
+
+    fields = []
+    max_images = None
+    for name in names:
+        if name in PRESETS:
+            preset_fields, preset_images = PRESETS[name]
+            if preset_fields is None:
+                # detail wins over any narrower request
+                return FieldSet()
+            fields += preset_fields
+            max_images = preset_images
+        else:
+            fields.append(name)
+            if name == 'images':
+                # Asking for images explicitly returns all of them
+                max_images = None
+    return FieldSet(fields, max_images)
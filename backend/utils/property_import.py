@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from firebase_admin import firestore
+
+from utils.property_catalog import parse_price
+
+# Bulk listing import from CSV or NDJSON. Rows are read one at a time,
+# validated, and written with batched writes: each listing is a set() on
+# properties/{id} plus its "Property Created" history entry, so one batch
+# carries BATCH_ROWS listings within Firestore's 500 writes per batch.
+# Several batches commit concurrently; that is where an import spends its
+# time, validation is cheap next to the round trips.
+
+MAX_BATCH_OPS = 500
+OPS_PER_ROW = 2
+BATCH_ROWS = MAX_BATCH_OPS // OPS_PER_ROW
+COMMIT_WORKERS = int(os.getenv('IMPORT_COMMIT_WORKERS', '8'))
+# Row errors kept in the report; the counts stay exact past this
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ('csv', 'ndjson')
+# CSV columns holding lists, written as "a|b|c" or a JSON array
+LIST_COLUMNS = ('images', 'amenities')
+NUMBER_COLUMNS = ('bedrooms', 'bathrooms', 'area', 'views')
+# Columns of an export that are derived or set on write, not imported
+DERIVED_COLUMNS = ('priceValue', 'historyCount', 'createdAt')
+
+
+def detect_format(filename=None, content_type=None):
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return None
+
+
+def _split_list(value):
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith('['):
+        return json.loads(value)
+    return [v.strip() for v in value.split('|') if v.strip()]
+
+
+def _number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def normalize_csv_row(row):
+    """Turns a CSV record's strings into the shape create_property stores."""
+    data = {k.strip(): v for k, v in row.items()
+            if k and k.strip() not in DERIVED_COLUMNS and v is not None and v.strip() != ''}
+    # A JSON array (as exports write) is taken as is; "a|b" names become facility objects
+    plain_amenities = 'amenities' in data and not data['amenities'].strip().startswith('[')
+    for column in LIST_COLUMNS:
+        if column in data:
+            data[column] = _split_list(data[column])
+    if plain_amenities:
+        data['amenities'] = [a if isinstance(a, dict) else {"name": a, "type": "facility", "distance": ""}
+                             for a in data['amenities']]
+    for column in NUMBER_COLUMNS:
+        if column in data:
+            data[column] = _number(data[column])
+    lat, lng = data.pop('lat', None), data.pop('lng', None)
+    if lat is not None and lng is not None:
+        data['coordinates'] = {"lat": float(lat), "lng": float(lng)}
+    if 'images' in data and 'imageUrl' not in data and data['images']:
+        data['imageUrl'] = data['images'][0]
+    return data
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (row_number, data, error) for a binary stream. Row numbers are
+    1-based data rows (the CSV header is not counted).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            try:
+                yield number, normalize_csv_row(row), None
+            except (ValueError, TypeError) as e:
+                yield number, None, f"Invalid value: {e}"
+    else:
+        number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(data, dict):
+                yield number, None, "Each line must be a JSON object"
+                continue
+            yield number, data, None
+
+
+class PropertyImporter:
+    def __init__(self, db, validate, workers=COMMIT_WORKERS, batch_rows=BATCH_ROWS,
+                 dry_run=False, on_committed=None, user_id="system"):
+        self.db = db
+        self.validate = validate
+        self.workers = workers
+        self.batch_rows = min(batch_rows, BATCH_ROWS)
+        self.dry_run = dry_run
+        # Called with [(property_id, data), ...] for every committed batch
+        self.on_committed = on_committed
+        self.user_id = user_id
+
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+
+    def _error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def _prepare(self, data):
+        data = dict(data)
+        property_id = str(data.pop('id', '') or '').strip() or None
+        data['createdAt'] = firestore.SERVER_TIMESTAMP
+        data['priceValue'] = parse_price(data.get('price'))
+        return property_id, data
+
+    def _commit(self, chunk):
+        collection = self.db.collection('properties')
+        batch = self.db.batch()
+        written = []
+        for _, property_id, data in chunk:
+            ref = collection.document(property_id) if property_id else collection.document()
+            batch.set(ref, data)
+            batch.set(ref.collection('history').document(), {
+                "action": "Property Created",
+                "details": "Bulk import",
+                "timestamp": firestore.SERVER_TIMESTAMP,
+                "userId": self.user_id
+            })
+            written.append((ref.id, data))
+        batch.commit()
+        return written
+
+    def _collect(self, future, chunk):
+        try:
+            written = future.result()
+        except Exception as e:
+            for row, _, _ in chunk:
+                self._error(row, f"Batch write failed: {e}")
+            return
+        self.imported += len(written)
+        self.batches += 1
+        if self.on_committed is not None:
+            try:
+                self.on_committed(written)
+            except Exception as e:
+                print(f"Error after committing import batch: {e}")
+
+    def run(self, rows):
+        """Imports (row_number, data, error) tuples; returns the report."""
+        pending = {}
+        chunk = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def submit(chunk):
+                # Bound the batches held in memory to a couple per worker
+                while len(pending) >= self.workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(future, pending.pop(future))
+                pending[pool.submit(self._commit, chunk)] = chunk
+
+            for row, data, error in rows:
+                self.rows += 1
+                if error is None:
+                    _, error = self.validate(data)
+                if error is not None:
+                    self._error(row, error)
+                    continue
+                if self.dry_run:
+                    self.imported += 1
+                    continue
+                property_id, data = self._prepare(data)
+                chunk.append((row, property_id, data))
+                if len(chunk) >= self.batch_rows:
+                    submit(chunk)
+                    chunk = []
+            if chunk:
+                submit(chunk)
+            for future in list(pending):
+                self._collect(future, pending.pop(future))
+        return self.report()
+
+    def report(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "batches": self.batches,
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
@@ -0,0 +1,392 @@
+import bisect
+import threading
+
+import numpy as np
+
+from utils.bitmap_index import BitmapIndex, rows_to_words, words_to_rows
+from utils.cluster_index import ClusterIndex, cluster_markers
+from utils.geo_index import GeoGrid, haversine_km, radius_bbox
+
+# Struct-of-arrays view of the property catalog. Every property owns a row;
+# range filters become boolean masks over the columns, categorical filters
+# are answered from per-value bitmaps, geo filters from a coordinate grid,
+# and sorts become argpartition/lexsort
+# over the matching rows. Property dicts are only touched for the rows on
+# the returned page.
+
+INITIAL_CAPACITY = 1024
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def normalize_label(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def amenity_names(prop_data):
+    """Lower-cased amenity names; amenities are strings or {name, ...} objects."""
+    amenities = prop_data.get('amenities')
+    if not isinstance(amenities, list):
+        return set()
+    names = (a.get('name') if isinstance(a, dict) else a for a in amenities)
+    return {normalize_label(n) for n in names if isinstance(n, str) and n.strip()}
+
+
+def locality(prop_data):
+    """The locality part of a 'Locality, City' location string."""
+    location = prop_data.get('location')
+    if not isinstance(location, str) or not location.strip():
+        return None
+    return location.split(',')[0].strip()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+class ColumnarStore:
+    COLUMNS = {
+        'price': np.int64,
+        'created': np.float64,
+        'bedrooms': np.int16,
+        'bathrooms': np.int16,
+        'area': np.float32,
+        'lat': np.float64,
+        'lng': np.float64,
+        'type': np.int32,
+        'locality': np.int32,
+        'alive': np.bool_
+    }
+
+    def __init__(self, price_of, created_of, capacity=INITIAL_CAPACITY):
+        # price_of/created_of map a property dict to its sort values, so the
+        # store agrees with the rest of the listing code
+        self._price_of = price_of
+        self._created_of = created_of
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._ids = []
+        self._payload = []
+        self._free = []
+        # Dictionary encoding for string columns: value -> code, code -> value
+        self._codes = {'type': {}, 'locality': {}}
+        self._values = {'type': [], 'locality': []}
+        self._sorted_ids = None
+        self._id_rank = None
+        self._rebuilding = False
+        self._allocate(capacity)
+        self._reset_bitmaps()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # --- Storage ---
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+
+    def _reset_bitmaps(self):
+        # type values match exactly, status and amenities ignore case
+        self.bitmaps = {name: BitmapIndex(self.capacity) for name in ('type', 'bedrooms', 'status', 'amenities')}
+        self.geo = GeoGrid()
+        self.clusters = ClusterIndex()
+
+    def _grow(self):
+        old = self.columns
+        self._allocate(self.capacity * 2)
+        for name, column in old.items():
+            self.columns[name][:len(column)] = column
+        for bitmap in self.bitmaps.values():
+            bitmap.resize(self.capacity)
+
+    def _code(self, column, value):
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = len(self._values[column])
+            codes[value] = code
+            self._values[column].append(value)
+        return code
+
+    def upsert(self, property_id, prop_data):
+        with self._lock:
+            row = self._rows.get(property_id)
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    row = len(self._ids)
+                    if row >= self.capacity:
+                        self._grow()
+                    self._ids.append(None)
+                    self._payload.append(None)
+                self._rows[property_id] = row
+                self._ids[row] = property_id
+                self._sorted_ids = None
+
+            coordinates = prop_data.get('coordinates')
+            if not isinstance(coordinates, dict):
+                coordinates = {}
+            columns = self.columns
+            columns['price'][row] = self._price_of(prop_data)
+            columns['created'][row] = self._created_of(prop_data)
+            columns['bedrooms'][row] = _to_int(prop_data.get('bedrooms'))
+            columns['bathrooms'][row] = _to_int(prop_data.get('bathrooms'))
+            columns['area'][row] = _to_float(prop_data.get('area'))
+            columns['lat'][row] = _to_float(coordinates.get('lat'))
+            columns['lng'][row] = _to_float(coordinates.get('lng'))
+            columns['type'][row] = self._code('type', prop_data.get('type'))
+            columns['locality'][row] = self._code('locality', locality(prop_data))
+            columns['alive'][row] = True
+            self._payload[row] = prop_data
+
+            bitmaps = self.bitmaps
+            bitmaps['type'].add(row, [prop_data.get('type')])
+            bitmaps['bedrooms'].add(row, [int(columns['bedrooms'][row])])
+            status = normalize_label(prop_data.get('status'))
+            bitmaps['status'].add(row, [status] if status else [])
+            bitmaps['amenities'].add(row, amenity_names(prop_data))
+            lat, lng = columns['lat'][row], columns['lng'][row]
+            if np.isfinite(lat) and np.isfinite(lng):
+                self.geo.add(row, float(lat), float(lng))
+                if not self._rebuilding:
+                    self.clusters.add(row, float(lat), float(lng), int(columns['price'][row]))
+            else:
+                self.geo.discard(row)
+                self.clusters.discard(row)
+
+    def remove(self, property_id):
+        with self._lock:
+            row = self._rows.pop(property_id, None)
+            if row is None:
+                return
+            self.columns['alive'][row] = False
+            for bitmap in self.bitmaps.values():
+                bitmap.discard(row)
+            self.geo.discard(row)
+            self.clusters.discard(row)
+            self._ids[row] = None
+            self._payload[row] = None
+            self._free.append(row)
+            self._sorted_ids = None
+
+    def rebuild(self, docs):
+        """Replaces every row from a {property_id: prop_data} mapping."""
+        with self._lock:
+            self._rows = {}
+            self._ids = []
+            self._payload = []
+            self._free = []
+            capacity = INITIAL_CAPACITY
+            while capacity < len(docs):
+                capacity *= 2
+            self._allocate(capacity)
+            self._reset_bitmaps()
+            self._sorted_ids = None
+            # Clusters are built bottom-up once every row is in place
+            self._rebuilding = True
+            try:
+                for property_id, prop_data in docs.items():
+                    self.upsert(property_id, prop_data)
+            finally:
+                self._rebuilding = False
+            n = len(self._ids)
+            lats, lngs, prices = self.columns['lat'][:n], self.columns['lng'][:n], self.columns['price'][:n]
+            located = np.flatnonzero(np.isfinite(lats) & np.isfinite(lngs))
+            self.clusters.build(located, lats[located], lngs[located], prices[located])
+
+    # --- Lookups ---
+
+    def id_of(self, row):
+        return self._ids[row]
+
+    def payload(self, row):
+        return self._payload[row]
+
+    def rows_for(self, property_ids):
+        rows = [self._rows[pid] for pid in property_ids if pid in self._rows]
+        return np.array(rows, dtype=np.int64)
+
+    def _rank(self):
+        """Lexical rank of each row's id, used to break sort ties by id."""
+        if self._sorted_ids is None:
+            live = [(pid, row) for row, pid in enumerate(self._ids) if pid is not None]
+            live.sort()
+            rank = np.zeros(self.capacity, dtype=np.int64)
+            if live:
+                rank[np.array([row for _, row in live], dtype=np.int64)] = np.arange(len(live))
+            self._sorted_ids = [pid for pid, _ in live]
+            self._id_rank = rank
+        return self._sorted_ids, self._id_rank
+
+    # --- Queries ---
+
+    def filter_rows(self, min_price=None, max_price=None, bedrooms=None, prop_types=None,
+                    statuses=None, amenities=None, candidates=None, bbox=None, near=None):
+        """
+        Returns the sorted row ids of live properties matching the filters.
+
+        prop_types and statuses match any of the given values, amenities must
+        all be present and bedrooms is a minimum. bbox is (south, west,
+        north, east) and near is (lat, lng, radius_km). candidates optionally
+        restricts the result to a set of rows (e.g. search hits).
+        """
+        n = len(self._ids)
+        bitmaps = self.bitmaps
+        words = None
+
+        def restrict(bits):
+            return bits if words is None else words & bits
+
+        if candidates is not None:
+            words = rows_to_words(candidates, self.capacity)
+        if prop_types:
+            words = restrict(bitmaps['type'].union(prop_types))
+        if statuses:
+            words = restrict(bitmaps['status'].union(normalize_label(s) for s in statuses))
+        if amenities:
+            words = restrict(bitmaps['amenities'].intersection(normalize_label(a) for a in amenities))
+        if bedrooms:
+            words = restrict(bitmaps['bedrooms'].union(v for v in bitmaps['bedrooms'].values() if v >= bedrooms))
+
+        boxes = [bbox] if bbox else []
+        if near:
+            boxes.append(radius_bbox(*near))
+        for box in boxes:
+            geo_rows = self.geo.rows_in_bbox(*box)
+            if geo_rows is not None:
+                words = restrict(rows_to_words(geo_rows, self.capacity))
+
+        if words is None:
+            rows = np.flatnonzero(self.columns['alive'][:n])
+        else:
+            # Bitmaps only hold live rows
+            rows = words_to_rows(words, n)
+
+        if min_price is not None or max_price is not None:
+            prices = self.columns['price'][rows]
+            keep = np.ones(len(rows), dtype=np.bool_)
+            if min_price is not None:
+                keep &= prices >= min_price
+            if max_price is not None:
+                keep &= prices <= max_price
+            rows = rows[keep]
+
+        if boxes:
+            lats, lngs = self.columns['lat'][rows], self.columns['lng'][rows]
+            keep = np.ones(len(rows), dtype=np.bool_)
+            for south, west, north, east in boxes:
+                keep &= (lats >= south) & (lats <= north) & (lngs >= west) & (lngs <= east)
+            if near:
+                keep &= self.distances(rows, near[0], near[1]) <= near[2]
+            rows = rows[keep]
+        return rows
+
+    def cluster_view(self, bbox, zoom):
+        """
+        Marker clusters for a map viewport. Returns (clusters, level); a
+        cluster of one listing also carries its property id.
+        """
+        with self._lock:
+            aggregates, level = self.clusters.clusters(*bbox, zoom)
+            return cluster_markers(aggregates, self._ids.__getitem__), level
+
+    def distances(self, rows, lat, lng):
+        """Distance in km from (lat, lng) to each row; NaN without coordinates."""
+        return haversine_km(lat, lng, self.columns['lat'][rows], self.columns['lng'][rows])
+
+    def counts(self, rows, column):
+        """Returns {value: count} of a dictionary-encoded or integer column over rows."""
+        data = self.columns[column][rows]
+        if column in self._values:
+            values = self._values[column]
+            tally = np.bincount(data, minlength=len(values))
+            return {values[code]: int(n) for code, n in enumerate(tally) if n and values[code] is not None}
+        values, tally = np.unique(data, return_counts=True)
+        return {v.item(): int(n) for v, n in zip(values, tally)}
+
+    def price_histogram(self, rows, buckets=10):
+        """Equal-width price buckets over the prices of rows."""
+        prices = self.columns['price'][rows]
+        prices = prices[prices > 0]
+        if not len(prices):
+            return []
+        low, high = int(prices.min()), int(prices.max())
+        if low == high:
+            return [{'min': low, 'max': high, 'count': int(len(prices))}]
+        tally, edges = np.histogram(prices, bins=buckets, range=(low, high))
+        return [{'min': int(edges[i]), 'max': int(edges[i + 1]), 'count': int(n)}
+                for i, n in enumerate(tally)]
+
+    def facets(self, price_buckets=10, **filters):
+        """
+        Counts per type, bedroom count and locality plus a price histogram for
+        the rows matching filter_rows(**filters).
+
+        A facet ignores its own filter, so every option of a multi-select
+        still shows how many results picking it would add.
+        """
+        filters = dict(dict.fromkeys(('min_price', 'max_price', 'bedrooms', 'prop_types')), **filters)
+        rows = self.filter_rows(**filters)
+
+        def rows_without(*names):
+            if not any(filters[name] for name in names):
+                return rows
+            return self.filter_rows(**dict(filters, **dict.fromkeys(names)))
+
+        return {
+            "total": len(rows),
+            "type": self.counts(rows_without('prop_types'), 'type'),
+            "bedrooms": self.counts(rows_without('bedrooms'), 'bedrooms'),
+            "locality": self.counts(rows, 'locality'),
+            "price": self.price_histogram(rows_without('min_price', 'max_price'), price_buckets)
+        }
+
+    def select(self, rows, values, descending, cursor=None, offset=0, limit=9):
+        """
+        Orders candidate rows by (value, id) and returns one page.
+
+        rows/values are parallel arrays. cursor is a (value, id) key; only
+        rows strictly after it are kept. Returns (page_rows, page_values,
+        has_more).
+        """
+        sorted_ids, id_rank = self._rank()
+        ranks = id_rank[rows]
+
+        if cursor is not None:
+            value, property_id = cursor
+            if descending:
+                position = bisect.bisect_left(sorted_ids, property_id)
+                keep = (values < value) | ((values == value) & (ranks < position))
+            else:
+                position = bisect.bisect_right(sorted_ids, property_id)
+                keep = (values > value) | ((values == value) & (ranks >= position))
+            rows, values, ranks = rows[keep], values[keep], ranks[keep]
+
+        # Only the first offset + limit + 1 rows matter; partition before sorting
+        k = offset + limit + 1
+        if len(rows) > k:
+            if descending:
+                boundary = -np.partition(-values, k - 1)[k - 1]
+                top = values >= boundary
+            else:
+                boundary = np.partition(values, k - 1)[k - 1]
+                top = values <= boundary
+            rows, values, ranks = rows[top], values[top], ranks[top]
+
+        order = np.lexsort((ranks, values))
+        if descending:
+            order = order[::-1]
+        order = order[offset:k]
+        has_more = len(order) > limit
+        order = order[:limit]
+        return rows[order], values[order], has_more
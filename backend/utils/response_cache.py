@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import request, make_response
+
+from utils.compression import compressed_variants, negotiate, set_encoded_body
+from utils.singleflight import SingleFlight
+
+# Process-wide cache of rendered GET responses. Entries are keyed by path plus
+# normalised query string and tagged with what they depend on (e.g.
+# 'properties:list', 'property:<id>', 'blogs'); write handlers invalidate
+# by tag. Bounded by entry count and body bytes, evicting least recently used.
+# Misses are coalesced per key, and an expired entry can keep being served
+# for a grace period while one request re-renders it. Compressible bodies are
+# stored with their gzip/brotli variants so hits are not compressed again.
+CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2000'))
+MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_MB', '64')) * 2**20
+# Upper bound on staleness for data changed outside this process's write handlers
+DEFAULT_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+# How long past its TTL an entry may be served while it is being refreshed
+DEFAULT_STALE_TTL = int(os.getenv('RESPONSE_CACHE_STALE_TTL', '0'))
+# Comma separated endpoint names (e.g. "blogs.get_blogs") served uncached
+DISABLED_ROUTES = {r.strip() for r in os.getenv('RESPONSE_CACHE_DISABLED_ROUTES', '').split(',') if r.strip()}
+
+# Set per request by Flask/extensions after the view returns
+_SKIPPED_HEADERS = {'content-length', 'set-cookie'}
+
+
+class CacheEntry:
+    __slots__ = ('route', 'body', 'status', 'headers', 'tags', 'size', 'expires', 'stale_until', 'variants')
+
+    def __init__(self, route, body, status, headers, tags, expires, stale_until=None, variants=None):
+        self.route = route
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.tags = tags
+        self.variants = variants or {}
+        self.size = len(body) + sum(len(v) for v in self.variants.values())
+        self.expires = expires
+        self.stale_until = stale_until if stale_until is not None else expires
+
+    @property
+    def fresh(self):
+        return time.time() <= self.expires
+
+    def to_response(self):
+        """The stored response with its identity body; see encode()."""
+        response = make_response(self.body, self.status)
+        for name, value in self.headers:
+            response.headers[name] = value
+        return response
+
+    def encode(self, response):
+        """Swaps in the stored variant for the request's Accept-Encoding."""
+        encoding = negotiate() if self.variants else None
+        if encoding in self.variants:
+            set_encoded_body(response, encoding, self.variants[encoding])
+        return response
+
+
+class ResponseCache:
+    def __init__(self, enabled=CACHE_ENABLED, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, disabled_routes=DISABLED_ROUTES):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.flights = SingleFlight()
+        self.disabled_routes = set(disabled_routes)
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._tags = defaultdict(set)
+        # Bumped by every invalidation; a response rendered across one is not stored
+        self._generation = 0
+        self.bytes = 0
+
+        self.route_stats = defaultdict(lambda: {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0})
+        self.evictions = 0
+        self.invalidations = 0
+
+    # --- Storage ---
+
+    def get(self, key):
+        """Returns the entry for key, fresh or within its stale window."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, generation=None):
+        if entry.size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            for tag in entry.tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        """Drops every entry carrying any of tags; returns how many."""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._drop(key)
+            self._generation += 1
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def tags(self):
+        with self._lock:
+            return list(self._tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generation += 1
+            self.bytes = 0
+
+    # --- Routes ---
+
+    def route_enabled(self, route):
+        return self.enabled and route not in self.disabled_routes
+
+    def set_route_enabled(self, route, enabled):
+        if enabled:
+            self.disabled_routes.discard(route)
+        else:
+            self.disabled_routes.add(route)
+            self.invalidate_route(route)
+
+    def invalidate_route(self, route):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.route == route]:
+                self._drop(key)
+            self._generation += 1
+
+    @staticmethod
+    def key_for(req):
+        """Path plus query parameters in a canonical order."""
+        query = urlencode(sorted(req.args.items(multi=True)))
+        return f"{req.path}?{query}"
+
+    def cached(self, tags, ttl=None, stale_ttl=None, on_hit=None):
+        """
+        Caches a GET view's successful responses.
+
+        tags is a list of tags or a callable taking the view's keyword
+        arguments. Within stale_ttl seconds after the TTL, the old entry is
+        served while one request re-renders it. on_hit(response, **kwargs)
+        runs for side effects the view must keep doing on every request
+        (e.g. view counters).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                route = request.endpoint
+                if request.method != 'GET' or not self.route_enabled(route):
+                    return view(*args, **kwargs)
+
+                stats = self.route_stats[route]
+                key = self.key_for(request)
+
+                def serve(entry):
+                    response = entry.to_response()
+                    # Hooks read the uncompressed body
+                    if on_hit is not None:
+                        on_hit(response, **kwargs)
+                    entry.encode(response)
+                    # Honour If-None-Match against the stored ETag
+                    return response.make_conditional(request)
+
+                entry = self.get(key)
+                if entry is not None and entry.fresh:
+                    stats['hits'] += 1
+                    return serve(entry)
+                if entry is not None and self.flights.in_flight(key):
+                    # Someone is already refreshing it
+                    stats['stale_hits'] += 1
+                    return serve(entry)
+
+                def render():
+                    generation = self._generation
+                    response = make_response(view(*args, **kwargs))
+                    if response.direct_passthrough or response.is_streamed:
+                        return response, None
+                    entry_tags = tags(**kwargs) if callable(tags) else tags
+                    headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS]
+                    expires = time.time() + (ttl or self.ttl)
+                    body = response.get_data()
+                    variants = compressed_variants(body, response.mimetype) if response.status_code == 200 else None
+                    rendered = CacheEntry(route, body, response.status_code, headers, tuple(entry_tags),
+                                          expires, expires + (stale_ttl or self.stale_ttl), variants)
+                    if response.status_code == 200 and self.put(key, rendered, generation):
+                        stats['stores'] += 1
+                    return response, rendered
+
+                # Concurrent misses for the same key wait for a single render
+                (response, rendered), shared = self.flights.do(key, render)
+                if not shared:
+                    stats['misses'] += 1
+                    return rendered.encode(response) if rendered is not None else response
+                if rendered is None or rendered.status != 200:
+                    # Errors, 304s for the leader's validators and streams are not shareable
+                    return view(*args, **kwargs)
+                stats['coalesced'] += 1
+                return serve(rendered)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            hits = sum(s['hits'] + s['stale_hits'] + s['coalesced'] for s in self.route_stats.values())
+            misses = sum(s['misses'] for s in self.route_stats.values())
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "disabled_routes": sorted(self.disabled_routes),
+                "singleflight": self.flights.stats(),
+                "routes": {route: dict(s) for route, s in self.route_stats.items()}
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,190 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+# In-memory inverted index over property text, ranked with BM25.
+# Postings map token -> {property_id: weighted term frequency}.
+# The sorted vocabulary used for prefix matching is rebuilt lazily, and only
+# when a token appears or disappears.
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {'a', 'an', 'and', 'at', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+# Matches in the title count for more than matches deep in the description
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'location': 2.0,
+    'amenities': 1.5,
+    'description': 1.0
+}
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _field_text(prop_data, field):
+    value = prop_data.get(field)
+    if field == 'amenities' and isinstance(value, list):
+        # Amenities are either plain strings or {name, type, distance} objects
+        names = [a.get('name', '') if isinstance(a, dict) else a for a in value]
+        return ' '.join(n for n in names if isinstance(n, str))
+    if field == 'location' and isinstance(value, dict):
+        return ' '.join(str(v) for v in value.values())
+    return value
+
+
+def text_matches(prop_data, query):
+    """
+    Whether a property matches a search query the way the index does: every
+    term appears as a token of an indexed field, the last one as a prefix.
+    A query with no terms (only stopwords or punctuation) falls back to a
+    substring test on title and location.
+    """
+    terms = tokenize(query)
+    if not terms:
+        query = (query or '').lower()
+        return any(query in str(_field_text(prop_data, field) or '').lower() for field in ('title', 'location'))
+    tokens = set()
+    for field in FIELD_WEIGHTS:
+        tokens.update(tokenize(_field_text(prop_data, field)))
+    *words, last = terms
+    return all(word in tokens for word in words) and any(token.startswith(last) for token in tokens)
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._doc_lengths = {}
+        self._total_length = 0.0
+        self._vocabulary = None
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def add(self, property_id, prop_data):
+        """Indexes (or re-indexes) a property."""
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(prop_data, field)):
+                weights[token] += weight
+
+        with self._lock:
+            # Non-text updates (e.g. view counters) leave the index untouched
+            if self._doc_tokens.get(property_id) == weights:
+                return
+            self._remove(property_id)
+            for token, tf in weights.items():
+                if token not in self._postings:
+                    self._vocabulary = None
+                self._postings[token][property_id] = tf
+            self._doc_tokens[property_id] = weights
+            length = sum(weights.values())
+            self._doc_lengths[property_id] = length
+            self._total_length += length
+
+    def remove(self, property_id):
+        with self._lock:
+            self._remove(property_id)
+
+    def _remove(self, property_id):
+        tokens = self._doc_tokens.pop(property_id, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(property_id, None)
+                if not posting:
+                    del self._postings[token]
+                    self._vocabulary = None
+        self._total_length -= self._doc_lengths.pop(property_id)
+
+    def rebuild(self, properties):
+        """Replaces the whole index from an iterable of (id, data) pairs."""
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            self._doc_lengths = {}
+            self._total_length = 0.0
+            self._vocabulary = None
+            for property_id, prop_data in properties:
+                self.add(property_id, prop_data)
+
+    def _expand_prefix(self, prefix):
+        """Tokens starting with prefix, so partially typed words still match."""
+        vocabulary = self._vocabulary
+        if vocabulary is None:
+            vocabulary = sorted(self._postings)
+            self._vocabulary = vocabulary
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + '\uffff')
+        return vocabulary[start:end]
+
+    def _intersect(self, terms):
+        """(term_postings, candidate ids) for documents containing every term."""
+        # One list of postings per term (a prefix may expand to several tokens)
+        term_postings = []
+        for i, term in enumerate(terms):
+            tokens = self._expand_prefix(term) if i == len(terms) - 1 else [term]
+            postings = [self._postings[t] for t in tokens if t in self._postings]
+            if not postings:
+                return [], set()
+            term_postings.append(postings)
+
+        # Intersect starting from the rarest term
+        term_postings.sort(key=lambda postings: sum(len(p) for p in postings))
+        candidates = None
+        for postings in term_postings:
+            ids = set().union(*postings) if len(postings) > 1 else set(postings[0])
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return [], set()
+        return term_postings, candidates
+
+    def search(self, query):
+        """
+        Returns {property_id: score} for properties matching every query term.
+        The last term is treated as a prefix.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return {}
+
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs:
+                return {}
+
+            # Score only the documents that contain every term
+            term_postings, candidates = self._intersect(terms)
+            if not candidates:
+                return {}
+
+            avg_length = self._total_length / n_docs
+            lengths = self._doc_lengths
+            scale = B / avg_length
+            base = 1 - B
+            scores = dict.fromkeys(candidates, 0.0)
+            for postings in term_postings:
+                for posting in postings:
+                    idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                    boost = idf * (K1 + 1)
+                    # Walk whichever side is smaller
+                    if len(posting) <= len(candidates):
+                        matches = ((pid, tf) for pid, tf in posting.items() if pid in candidates)
+                    else:
+                        matches = ((pid, posting[pid]) for pid in candidates if pid in posting)
+                    for pid, tf in matches:
+                        scores[pid] += boost * tf / (tf + K1 * (base + scale * lengths[pid]))
+            return scores
@@ -0,0 +1,64 @@
+import threading
+
+# Request coalescing: concurrent callers asking for the same key share one
+# computation. The first caller (the leader) runs it; the rest block until
+# it finishes and receive the same result or exception.
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        """
+        Runs fn() once per key at a time. Returns (result, shared) where
+        shared is True when this caller waited on another caller's run.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,94 @@
+from itertools import chain, islice
+
+from flask import current_app, request, stream_with_context
+
+# Large admin listings are streamed as documents come off Firestore's
+# stream() instead of being collected into a list and serialised at the end.
+# The default body is still a JSON array, written in chunks; clients that ask
+# for NDJSON (?format=ndjson or Accept: application/x-ndjson) get one object
+# per line and can process rows as they arrive.
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Encoded bytes buffered before a chunk is handed to the server
+FLUSH_BYTES = 64 * 1024
+
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    accept = request.accept_mimetypes
+    return accept[NDJSON_MIMETYPE] > accept['application/json']
+
+
+def in_chunks(iterable, size):
+    """Yields lists of up to size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def document_items(docs):
+    """Document snapshots as dicts carrying their id."""
+    for doc in docs:
+        data = doc.to_dict()
+        data['id'] = doc.id
+        yield data
+
+
+def primed(items):
+    """
+    Iterator over items with the first one already pulled, so a failing
+    query (missing index, permissions) raises inside the view and becomes
+    the usual 500 rather than a truncated 200.
+    """
+    iterator = iter(items)
+    first = list(islice(iterator, 1))
+    return chain(first, iterator)
+
+
+def stream_response(chunks, mimetype, filename=None):
+    """Streamed response for an iterable of str/bytes chunks."""
+    response = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_json(items, ndjson=None, filename=None):
+    """Returns a streamed JSON array (or NDJSON) of JSON-serialisable items."""
+    if ndjson is None:
+        ndjson = wants_ndjson()
+    items = primed(items)
+    dumps = current_app.json.dumps
+
+    def generate():
+        buffer = [] if ndjson else ['[']
+        size = count = 0
+        try:
+            for item in items:
+                encoded = dumps(item)
+                if ndjson:
+                    buffer.append(encoded + '\n')
+                else:
+                    buffer.append(',' + encoded if count else encoded)
+                count += 1
+                size += len(encoded)
+                if size >= FLUSH_BYTES:
+                    yield ''.join(buffer)
+                    buffer, size = [], 0
+        except Exception as e:
+            # The status line is already sent; leave the array unterminated so
+            # clients fail to parse it rather than trust a partial listing
+            print(f"Streaming response aborted after {count} items: {e}")
+            if ndjson:
+                buffer.append(dumps({"error": str(e)}) + '\n')
+            yield ''.join(buffer)
+            return
+        if not ndjson:
+            buffer.append(']')
+        yield ''.join(buffer)
+
+    return stream_response(generate(), NDJSON_MIMETYPE if ndjson else 'application/json', filename)